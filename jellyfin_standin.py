@@ -0,0 +1,1172 @@
+"""
+Offline stand-in for the Jellyfin endpoints used by test_connection.py and the Orsay TV app.
+Serves System/Info/Public, AuthenticateByName, Sessions (capabilities, remote commands fanned
+out over /emby/socket), QuickConnect, SyncPlay, a synthetic Items library with Trickplay
+metadata, HLS transcodes that share a fixed transcoding capacity and optional Live TV channels
+with guide data. Latency, jitter, error rate and library size are configurable and the library is
+generated from a seed, so benchmark runs are reproducible without network access.
+
+JSON responses honour EnableImages/EnableUserData and are gzip-compressed when the client
+accepts it (there is no Brotli in the standard library, so "br" alone gets identity).
+
+Standard library only (asyncio HTTP/1.1 with keep-alive and a minimal RFC 6455 WebSocket).
+
+Usage:
+    python3 jellyfin_standin.py --port 8096
+    python3 jellyfin_standin.py --port 8096 --latency 20 --jitter 10 --error-rate 0.01 --items 80000
+    python3 jellyfin_standin.py --port 8096 --channels 300
+    python3 test_connection.py --standin --username demo
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import struct
+import threading
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+SERVER_NAME = "Orsay Stand-in"
+SERVER_VERSION = "10.10.7"
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+STATUS_TEXT = {
+    101: "Switching Protocols", 200: "OK", 204: "No Content", 400: "Bad Request",
+    401: "Unauthorized", 404: "Not Found", 500: "Internal Server Error",
+}
+
+
+class StandinConfig:
+    """Tunables for the stand-in; latency and jitter are in milliseconds."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, items=500, seed=1, resize_cost=20.0,
+                 transcode_capacity=4.0, write_cost=0.5, channels=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.items = items
+        self.seed = seed
+        self.resize_cost = resize_cost  # ms per output megapixel, paid once per image size
+        self.transcode_capacity = transcode_capacity  # media seconds transcoded per second, shared by all jobs
+        self.write_cost = write_cost  # ms per playback report; reports are applied one at a time
+        self.channels = channels  # Live TV channels with a synthetic guide; 0 leaves Live TV disabled
+
+
+def add_arguments(parser, prefix=""):
+    """Register the stand-in tunables on an argparse parser (prefix e.g. "standin-")."""
+    parser.add_argument(f"--{prefix}latency", type=float, default=0.0,
+                        help="Mean added latency per HTTP request in ms (default 0)")
+    parser.add_argument(f"--{prefix}jitter", type=float, default=0.0,
+                        help="Standard deviation of the added latency in ms (default 0)")
+    parser.add_argument(f"--{prefix}error-rate", type=float, default=0.0,
+                        help="Fraction of HTTP requests answered with HTTP 500 (default 0)")
+    parser.add_argument(f"--{prefix}items", type=int, default=500,
+                        help="Number of movies and episodes in the synthetic library (default 500)")
+    parser.add_argument(f"--{prefix}seed", type=int, default=1,
+                        help="Seed for the library contents and injected faults (default 1)")
+    parser.add_argument(f"--{prefix}resize-cost", type=float, default=20.0,
+                        help="Image resize time in ms per output megapixel, first request only (default 20)")
+    parser.add_argument(f"--{prefix}transcode-capacity", type=float, default=4.0,
+                        help="Total transcode speed in multiples of realtime, shared by concurrent streams (default 4)")
+    parser.add_argument(f"--{prefix}write-cost", type=float, default=0.5,
+                        help="Session store write time in ms per playback report, serialised (default 0.5)")
+    parser.add_argument(f"--{prefix}channels", type=int, default=0,
+                        help="Live TV channels with guide data; 0 disables Live TV (default 0)")
+
+
+def config_from_args(args, prefix=""):
+    attr = prefix.replace("-", "_")
+    return StandinConfig(
+        latency=getattr(args, f"{attr}latency"),
+        jitter=getattr(args, f"{attr}jitter"),
+        error_rate=getattr(args, f"{attr}error_rate"),
+        items=getattr(args, f"{attr}items"),
+        seed=getattr(args, f"{attr}seed"),
+        resize_cost=getattr(args, f"{attr}resize_cost"),
+        transcode_capacity=getattr(args, f"{attr}transcode_capacity"),
+        write_cost=getattr(args, f"{attr}write_cost"),
+        channels=getattr(args, f"{attr}channels"),
+    )
+
+
+def iso_time(moment):
+    """Jellyfin's UTC timestamp format, with seven fractional digits."""
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.%f") + "0Z"
+
+
+def stable_id(*parts):
+    """Jellyfin-style 32-hex-digit id that is the same on every run."""
+    return hashlib.md5("/".join(str(p) for p in parts).encode()).hexdigest()
+
+
+# --- Synthetic library ---
+
+EPISODES_PER_SEASON = 10  # library entries per season; a series has SEASONS_PER_SERIES seasons
+SEASONS_PER_SERIES = 3
+VIEWS = (("Movies", "movies"), ("TV Shows", "tvshows"))
+
+
+class Library:
+    """Movies and episodes generated from a seed; item dicts are built on demand so large
+    libraries cost little memory. Episodes are grouped into synthetic series and seasons by index."""
+
+    def __init__(self, size, seed):
+        rng = random.Random(seed)
+        self.seed = seed
+        self.entries = []  # (id, type, runtime_ticks, has_trickplay)
+        for i in range(size):
+            item_type = "Episode" if i % 3 else "Movie"
+            minutes = rng.randint(20, 60) if item_type == "Episode" else rng.randint(80, 160)
+            self.entries.append((stable_id("item", seed, i), item_type, minutes * 60 * 10_000_000, i % 2 == 0))
+        self.by_id = {entry[0]: index for index, entry in enumerate(self.entries)}
+        self.matches = {}  # frozenset(types) -> indexes, so paging a big library stays cheap
+        seasons = (size + EPISODES_PER_SEASON - 1) // EPISODES_PER_SEASON
+        self.folders = {self.season_id(n): ("Season", n) for n in range(seasons)}
+        self.folders.update({self.series_id(n): ("Series", n)
+                             for n in range((seasons + SEASONS_PER_SERIES - 1) // SEASONS_PER_SERIES)})
+
+    def names(self):
+        """Lower-cased item names in library order, for the search scan."""
+        if not hasattr(self, "_names"):
+            self._names = [f"{entry[1]} {i + 1}".lower() for i, entry in enumerate(self.entries)]
+        return self._names
+
+    def season_id(self, number):
+        return stable_id("season", self.seed, number)
+
+    def series_id(self, number):
+        return stable_id("series", self.seed, number)
+
+    def folder(self, item_id):
+        folder_type, number = self.folders[item_id]
+        series = number if folder_type == "Series" else number // SEASONS_PER_SERIES
+        folder = {
+            "Name": f"Series {series + 1}" if folder_type == "Series" else f"Season {number % SEASONS_PER_SERIES + 1}",
+            "ServerId": stable_id("server"),
+            "Id": item_id,
+            "Type": folder_type,
+            "IsFolder": True,
+            "ImageTags": {"Primary": stable_id("Primary", item_id)},
+            "BackdropImageTags": [stable_id("backdrop", item_id)],
+            "UserData": {"PlaybackPositionTicks": 0, "PlayCount": 0, "IsFavorite": False, "Played": False},
+        }
+        if folder_type == "Series":
+            folder["ChildCount"] = SEASONS_PER_SERIES
+        else:
+            folder.update(SeriesId=self.series_id(series), SeriesName=f"Series {series + 1}",
+                          IndexNumber=number % SEASONS_PER_SERIES + 1, ParentId=self.series_id(series))
+        return folder
+
+    def item(self, index, fields=()):
+        item_id, item_type, ticks, has_trickplay = self.entries[index]
+        item = {
+            "Name": f"{item_type} {index + 1}",
+            "ServerId": stable_id("server"),
+            "Id": item_id,
+            "Type": item_type,
+            "MediaType": "Video",
+            "IsFolder": False,
+            "RunTimeTicks": ticks,
+            "ProductionYear": 1980 + index % 45,
+            "ImageTags": {image_type: stable_id(image_type, item_id)
+                          for image_type, every in (("Primary", 1), ("Thumb", 3), ("Logo", 4), ("Banner", 5))
+                          if index % every == 0},
+            "BackdropImageTags": [stable_id("backdrop", item_id)],
+            "UserData": {"PlaybackPositionTicks": 0, "PlayCount": 0, "IsFavorite": False, "Played": False},
+        }
+        if item_type == "Episode":
+            season = index // EPISODES_PER_SEASON
+            item["SeriesName"] = f"Series {season // SEASONS_PER_SERIES + 1}"
+            item["SeriesId"] = item["ParentBackdropItemId"] = self.series_id(season // SEASONS_PER_SERIES)
+            item["SeasonId"] = item["ParentId"] = self.season_id(season)
+            item["ParentIndexNumber"] = season % SEASONS_PER_SERIES + 1
+            item["IndexNumber"] = index % EPISODES_PER_SEASON + 1
+        else:
+            item["LocalTrailerCount"] = 0
+        if "genres" in fields:
+            item["Genres"] = ["Drama", "Comedy", "Documentary", "Animation"][index % 4:index % 4 + 2]
+        if "overview" in fields:
+            item["Overview"] = f"Synthetic {item_type.lower()} number {index + 1} for load testing. " * 4
+        if "mediasources" in fields:
+            item["MediaSources"] = self.media_sources(index)
+        if "trickplay" in fields and has_trickplay:
+            interval = 10_000
+            item["Trickplay"] = {item_id: {"320": {
+                "Width": 320, "Height": 180, "TileWidth": 10, "TileHeight": 10,
+                "ThumbnailCount": ticks // 10_000 // interval, "Interval": interval, "Bandwidth": 48_000,
+            }}}
+        return item
+
+    # (weight, container, video codec, profile, level, width, height, fps, Mbit/s)
+    VIDEO_FORMATS = (
+        (40, "mkv", "h264", "High", 41, 1920, 1080, 23.976, 10),
+        (12, "mp4", "h264", "Main", 40, 1280, 720, 25, 4),
+        (4, "mp4", "h264", "High", 41, 1920, 1080, 29.97, 8),
+        (4, "mkv", "h264", "High", 42, 1920, 1080, 59.94, 20),
+        (5, "mkv", "h264", "High 10", 51, 1920, 1080, 23.976, 12),
+        (3, "mkv", "h264", "High", 51, 3840, 2160, 25, 70),
+        (10, "mkv", "hevc", "Main 10", 150, 3840, 2160, 23.976, 40),
+        (6, "mkv", "hevc", "Main", 120, 1920, 1080, 25, 6),
+        (5, "avi", "mpeg4", "Advanced Simple Profile", 5, 720, 400, 25, 2),
+        (4, "ts", "mpeg2video", "Main", 8, 1920, 1080, 29.97, 15),
+        (3, "mkv", "vc1", "Advanced", 3, 1920, 1080, 23.976, 25),
+        (2, "wmv", "wmv3", "Main", 0, 1280, 720, 29.97, 5),
+        (2, "mkv", "av1", "Main", 8, 1920, 1080, 24, 5),
+    )
+    # (weight, audio codec, channels)
+    AUDIO_FORMATS = ((40, "aac", 2), (25, "ac3", 6), (12, "dts", 6), (8, "eac3", 6), (8, "truehd", 8),
+                     (4, "aac", 6), (3, "mp3", 2))
+
+    def media_sources(self, index):
+        """One version per item, two for every 25th, with a reproducible spread of formats."""
+        rng = random.Random(f"{self.seed}/sources/{index}")
+        item_id, _, ticks, _ = self.entries[index]
+        sources = []
+        for version in range(2 if index % 25 == 0 else 1):
+            _, container, codec, profile, level, width, height, fps, mbits = rng.choices(
+                self.VIDEO_FORMATS, [fmt[0] for fmt in self.VIDEO_FORMATS])[0]
+            streams = [{"Type": "Video", "Index": 0, "Codec": codec, "Profile": profile, "Level": level,
+                        "Width": width, "Height": height, "AverageFrameRate": fps, "RealFrameRate": fps,
+                        "BitRate": mbits * 1_000_000, "IsDefault": True}]
+            languages = ["eng", "ger", "fre"][:rng.choice((1, 1, 1, 2, 3))]
+            rng.shuffle(languages)  # the default (English) track is not always the first one
+            for language in languages:
+                _, audio_codec, channels = rng.choices(self.AUDIO_FORMATS, [fmt[0] for fmt in self.AUDIO_FORMATS])[0]
+                streams.append({"Type": "Audio", "Index": len(streams), "Codec": audio_codec, "Channels": channels,
+                                "Language": language, "IsDefault": language == "eng"})
+            for language, subtitle_codec in (("eng", "subrip"), ("eng", "PGSSUB"), ("ger", "ass"))[:rng.randrange(4)]:
+                text = subtitle_codec != "PGSSUB"
+                streams.append({"Type": "Subtitle", "Index": len(streams), "Codec": subtitle_codec,
+                                "Language": language, "IsTextSubtitleStream": text,
+                                "IsForced": not text and rng.random() < 0.3, "IsDefault": False})
+            sources.append({"Id": item_id if version == 0 else stable_id("source", item_id, version),
+                            "Name": f"Version {version + 1}", "Protocol": "File", "Container": container,
+                            "RunTimeTicks": ticks, "Bitrate": mbits * 1_000_000 + 640_000, "MediaStreams": streams})
+        return sources
+
+    def query(self, types, start, limit, fields, parent_id=None):
+        if parent_id in self.folders:
+            return self.children(parent_id, start, limit, fields)
+        if types == {"Series"}:
+            matches = sorted(item_id for item_id, (kind, _) in self.folders.items() if kind == "Series")
+            page = matches[start:start + limit] if limit is not None else matches[start:]
+            return {"Items": [self.folder(i) for i in page], "TotalRecordCount": len(matches), "StartIndex": start}
+        key = frozenset(types)
+        if key not in self.matches:
+            self.matches[key] = [i for i, entry in enumerate(self.entries) if not types or entry[1] in types]
+        matches = self.matches[key]
+        page = matches[start:start + limit] if limit is not None else matches[start:]
+        return {
+            "Items": [self.item(i, fields) for i in page],
+            "TotalRecordCount": len(matches),
+            "StartIndex": start,
+        }
+
+    def children(self, parent_id, start, limit, fields):
+        folder_type, number = self.folders[parent_id]
+        if folder_type == "Series":
+            items = [self.folder(self.season_id(n))
+                     for n in range(number * SEASONS_PER_SERIES, (number + 1) * SEASONS_PER_SERIES)
+                     if self.season_id(n) in self.folders]
+        else:
+            first = number * EPISODES_PER_SEASON
+            items = [self.item(i, fields) for i in range(first, min(first + EPISODES_PER_SEASON, len(self.entries)))
+                     if self.entries[i][1] == "Episode"]
+        page = items[start:start + limit] if limit is not None else items[start:]
+        return {"Items": page, "TotalRecordCount": len(items), "StartIndex": start}
+
+
+class Guide:
+    """Live TV channels, each repeating a fixed cycle of programme lengths from its own offset.
+    Programmes are generated for the queried window only, so long windows cost what they return."""
+
+    DURATIONS = (30, 60, 30, 90, 60, 120, 30, 45)  # minutes; one cycle, rotated per channel
+    FLAGS = (None, "IsNews", "IsSports", None, "IsKids", "IsMovie")
+    EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self, count, seed):
+        self.ids = [stable_id("channel", seed, c) for c in range(count)]
+        self.by_id = {channel_id: c for c, channel_id in enumerate(self.ids)}
+
+    def channel(self, c):
+        return {"Name": f"Channel {c + 1}", "Number": str(c + 1), "Id": self.ids[c], "Type": "TvChannel",
+                "ChannelType": "TV", "MediaType": "Video", "ServerId": stable_id("server"),
+                "ImageTags": {"Primary": stable_id("Primary", self.ids[c])} if c % 2 == 0 else {}}
+
+    def programs(self, c, min_end, max_start):
+        """Programmes of channel c that end after min_end and start no later than max_start."""
+        cycle = timedelta(minutes=sum(self.DURATIONS))
+        anchor = self.EPOCH + timedelta(minutes=c * 15 % 60)
+        start = anchor + cycle * ((min_end - anchor) // cycle)
+        programs = []
+        k = 0
+        while start <= max_start:
+            end = start + timedelta(minutes=self.DURATIONS[(k + c) % len(self.DURATIONS)])
+            if end > min_end:
+                program_id = stable_id("program", self.ids[c], int(start.timestamp()))
+                program = {"Name": f"Programme {(k + c) % 97 + 1}", "Id": program_id, "Type": "Program",
+                           "ChannelId": self.ids[c], "ChannelName": f"Channel {c + 1}",
+                           "StartDate": iso_time(start), "EndDate": iso_time(end),
+                           "RunTimeTicks": int((end - start).total_seconds()) * 10_000_000,
+                           "Overview": "Synthetic guide entry. " * 8, "ServerId": stable_id("server"),
+                           "ImageTags": {}, "IsSeries": k % 3 == 0}
+                flag = self.FLAGS[(k + c) % len(self.FLAGS)]
+                if flag:
+                    program[flag] = True
+                programs.append(program)
+            start = end
+            k += 1
+        return programs
+
+
+# --- Server state ---
+
+class DeviceSession:
+    """A device's server-side session: what Sessions/* and the socket fan-out operate on."""
+
+    def __init__(self, device_id, device_name, client, version, user_id, user_name):
+        self.id = uuid.uuid4().hex
+        self.token = uuid.uuid4().hex
+        self.device_id = device_id
+        self.device_name = device_name
+        self.client = client
+        self.version = version
+        self.user_id = user_id
+        self.user_name = user_name
+        self.capabilities = None
+        self.now_playing = None
+        self.sockets = set()
+        self.syncplay_group = None
+        self.syncplay_ping = 0.0
+
+    def info(self):
+        return {
+            "Id": self.id,
+            "UserId": self.user_id,
+            "UserName": self.user_name,
+            "Client": self.client,
+            "DeviceName": self.device_name,
+            "DeviceId": self.device_id,
+            "ApplicationVersion": self.version,
+            "SupportsRemoteControl": bool(self.capabilities and self.capabilities.get("SupportsMediaControl")),
+            "PlayableMediaTypes": (self.capabilities or {}).get("PlayableMediaTypes", []),
+            "SupportedCommands": (self.capabilities or {}).get("SupportedCommands", []),
+            "NowPlayingItem": self.now_playing and {"Id": self.now_playing.get("ItemId")},
+            "PlayState": self.now_playing and {
+                "PositionTicks": self.now_playing.get("PositionTicks", 0),
+                "IsPaused": self.now_playing.get("IsPaused", False),
+                "PlayMethod": self.now_playing.get("PlayMethod"),
+            },
+        }
+
+
+HLS_SEGMENT_SECONDS = 6
+TS_PACKET = b"\x47" + bytes(187)
+
+
+class TranscodeJob:
+    """An HLS transcode: media seconds produced so far, advanced by StandinServer.advance_transcodes()."""
+
+    def __init__(self, device_id, play_session_id, duration, bitrate, start=0.0):
+        self.device_id = device_id
+        self.play_session_id = play_session_id
+        self.duration = duration
+        self.bitrate = bitrate
+        self.start = start
+        self.produced = start
+        self.stopped = False
+
+    @property
+    def active(self):
+        return not self.stopped and self.produced < self.duration
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        parts = urlsplit(target)
+        path = parts.path
+        if path.lower().startswith("/emby/"):
+            path = path[5:]
+        self.method = method
+        self.path = path
+        self.params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        # Jellyfin treats query keys case-insensitively; the TV mixes "Fields" and "fields".
+        self.query = {k.lower(): v for k, v in self.params.items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b"{}")
+
+    def auth_fields(self):
+        """Key/value pairs of the MediaBrowser Authorization header built by make_headers()."""
+        header = self.headers.get("authorization") or self.headers.get("x-emby-authorization") or ""
+        return dict(re.findall(r'(\w+)="([^"]*)"', header))
+
+    def token(self):
+        return (self.headers.get("x-mediabrowser-token") or self.headers.get("x-emby-token")
+                or self.query.get("api_key") or self.auth_fields().get("Token"))
+
+
+class StandinServer:
+    """HTTP + WebSocket stand-in. Routes are (method, path regex, handler, needs_auth)."""
+
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.library = Library(config.items, config.seed)
+        self.guide = Guide(config.channels, config.seed)
+        self.sessions_by_device = {}
+        self.sessions_by_token = {}
+        self.sessions_by_id = {}
+        self.syncplay_groups = {}
+        self.quick_connect = {}
+        self.resized_images = set()
+        self.transcodes = {}  # (device_id, play_session_id, item_id) -> TranscodeJob
+        self.transcode_clock = None
+        self.session_store = asyncio.Lock()
+        self.routes = [
+            ("GET", r"/System/Info/Public", self.system_info, False),
+            ("POST", r"/Users/AuthenticateByName", self.authenticate, False),
+            ("POST", r"/Sessions/Capabilities/Full", self.capabilities, True),
+            ("GET", r"/Sessions", self.list_sessions, True),
+            ("POST", r"/Sessions/Playing", self.playback_start, True),
+            ("POST", r"/Sessions/Playing/Progress", self.playback_progress, True),
+            ("POST", r"/Sessions/Playing/Stopped", self.playback_stopped, True),
+            ("POST", r"/Sessions/(?P<sid>\w+)/Playing", self.play_command, True),
+            ("POST", r"/Sessions/(?P<sid>\w+)/Playing/(?P<command>\w+)", self.playstate_command, True),
+            ("POST", r"/Sessions/(?P<sid>\w+)/Command", self.general_command, True),
+            ("POST", r"/Sessions/(?P<sid>\w+)/Command/(?P<command>\w+)", self.general_command, True),
+            ("GET", r"/QuickConnect/Enabled", self.quick_connect_enabled, False),
+            ("POST", r"/QuickConnect/Initiate", self.quick_connect_initiate, False),
+            ("GET", r"/QuickConnect/Connect", self.quick_connect_state, False),
+            ("GET", r"/SyncPlay/List", self.syncplay_list, True),
+            ("POST", r"/SyncPlay/New", self.syncplay_new, True),
+            ("POST", r"/SyncPlay/Join", self.syncplay_join, True),
+            ("POST", r"/SyncPlay/Leave", self.syncplay_leave, True),
+            ("POST", r"/SyncPlay/Pause", self.syncplay_pause, True),
+            ("POST", r"/SyncPlay/Unpause", self.syncplay_unpause, True),
+            ("POST", r"/SyncPlay/Seek", self.syncplay_seek, True),
+            ("POST", r"/SyncPlay/Ready", self.syncplay_ready, True),
+            ("POST", r"/SyncPlay/Ping", self.syncplay_ping, True),
+            ("GET", r"/Users/(?P<uid>\w+)", self.user, True),
+            ("GET", r"/Users/(?P<uid>\w+)/Views", self.views, True),
+            ("GET", r"/Users/(?P<uid>\w+)/Items", self.items, True),
+            ("GET", r"/Users/(?P<uid>\w+)/Items/Latest", self.latest, True),
+            ("GET", r"/Users/(?P<uid>\w+)/Items/(?P<item_id>\w+)", self.item, True),
+            ("GET", r"/Users/(?P<uid>\w+)/Items/(?P<item_id>\w+)/LocalTrailers", self.local_trailers, True),
+            ("GET", r"/Shows/NextUp", self.next_up, True),
+            ("GET", r"/Search/Hints", self.search_hints, True),
+            ("GET", r"/LiveTV/Info", self.live_tv_info, True),
+            ("GET", r"/LiveTV/Recordings", self.empty_list, True),
+            ("GET", r"/LiveTV/Channels", self.channels, True),
+            ("GET", r"/LiveTV/Programs", self.programs, True),
+            ("GET", r"/Channels", self.empty_list, True),
+            ("GET", r"/Movies/(?P<item_id>\w+)/Similar", self.similar, True),
+            ("GET", r"/Videos/(?P<item_id>\w+)/Trickplay/(?P<width>\d+)/(?P<index>\d+)\.jpg", self.trickplay_tile, True),
+            ("GET", r"/Videos/(?P<item_id>\w+)/master\.m3u8", self.hls_master, True),
+            ("GET", r"/Videos/(?P<item_id>\w+)/main\.m3u8", self.hls_playlist, True),
+            ("GET", r"/Videos/(?P<item_id>\w+)/hls1/main/(?P<segment>\d+)\.ts", self.hls_segment, True),
+            ("POST", r"/Videos/ActiveEncodings", self.stop_encodings, True),
+            ("DELETE", r"/Videos/ActiveEncodings", self.stop_encodings, True),
+            ("GET", r"/Items/(?P<item_id>\w+)/Images/(?P<image_type>\w+)(?:/(?P<index>\d+))?", self.image, False),
+        ]
+        self.routes = [(m, re.compile(p + r"/?$", re.IGNORECASE), h, a) for m, p, h, a in self.routes]
+
+    # --- Connection handling ---
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                body = await reader.readexactly(length) if length else b""
+                request = Request(method.upper(), target, headers, body)
+
+                if request.path.lower() == "/socket" and headers.get("upgrade", "").lower() == "websocket":
+                    await self.handle_socket(request, reader, writer)
+                    break
+                status, payload, extra = await self.dispatch(request)
+                await self.write_response(writer, status, payload, extra, headers.get("accept-encoding", ""))
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        """Returns (status, body, extra headers); body is JSON-serialisable or bytes."""
+        delay = self.rng.gauss(self.config.latency, self.config.jitter) if self.config.jitter else self.config.latency
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            return 500, {"Message": "Injected fault"}, {}
+
+        path_matched = False
+        for method, pattern, handler, needs_auth in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            path_matched = True
+            if method != request.method:
+                continue
+            session = self.sessions_by_token.get(request.token())
+            if needs_auth and session is None:
+                return 401, None, {}
+            result = handler(request, session, **match.groupdict())
+            if asyncio.iscoroutine(result):
+                result = await result
+            status, payload, extra = result if len(result) == 3 else (*result, {})
+            return status, self.apply_dto_options(request, payload), extra
+        return (405 if path_matched else 404), None, {}
+
+    @staticmethod
+    def apply_dto_options(request, payload):
+        """EnableImages=false / EnableUserData=false leave image tags / user data out of every item."""
+        drop = set()
+        if request.query.get("enableimages", "").lower() == "false":
+            drop |= {"ImageTags", "BackdropImageTags", "PrimaryImageTag"}
+        if request.query.get("enableuserdata", "").lower() == "false":
+            drop.add("UserData")
+        if not drop or not isinstance(payload, (dict, list)):
+            return payload
+
+        def trim(item):
+            return {key: value for key, value in item.items() if key not in drop} if isinstance(item, dict) else item
+
+        if isinstance(payload, list):
+            return [trim(item) for item in payload]
+        if isinstance(payload.get("Items"), list):
+            return dict(payload, Items=[trim(item) for item in payload["Items"]])
+        return trim(payload)
+
+    async def write_response(self, writer, status, payload, extra, accept_encoding=""):
+        if payload is None:
+            body, content_type = b"", None
+        elif isinstance(payload, bytes):
+            body, content_type = payload, extra.pop("Content-Type", "application/octet-stream")
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json; charset=utf-8"
+            extra = dict(extra, Vary="Accept-Encoding")
+            if "gzip" in {coding.split(";")[0].strip().lower() for coding in accept_encoding.split(",")}:
+                # Fastest level, like ASP.NET Core's response compression default.
+                compressor = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+                body = compressor.compress(body) + compressor.flush()
+                extra["Content-Encoding"] = "gzip"
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Unknown')}", f"Content-Length: {len(body)}"]
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        lines += [f"{name}: {value}" for name, value in extra.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    # --- WebSocket (/emby/socket) ---
+
+    async def handle_socket(self, request, reader, writer):
+        session = self.sessions_by_token.get(request.token())
+        if session is None:
+            await self.write_response(writer, 401, None, {})
+            return
+        accept = base64.b64encode(hashlib.sha1((request.headers["sec-websocket-key"] + WS_GUID).encode()).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        session.sockets.add(writer)
+        try:
+            send_frame(writer, {"MessageType": "ForceKeepAlive", "Data": 60})
+            await writer.drain()
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(encode_frame(0x8, payload[:2]))
+                    await writer.drain()
+                    break
+                if opcode == 0x9:  # ping
+                    writer.write(encode_frame(0xA, payload))
+                elif opcode == 0x1:
+                    message = json.loads(payload)
+                    if message.get("MessageType") == "KeepAlive":
+                        send_frame(writer, {"MessageType": "KeepAlive"})
+                await writer.drain()
+        finally:
+            session.sockets.discard(writer)
+
+    def send_to_session(self, session, message_type, data):
+        for socket_writer in list(session.sockets):
+            send_frame(socket_writer, {"MessageType": message_type, "Data": data})
+
+    # --- Endpoints ---
+
+    def system_info(self, request, session):
+        return 200, {
+            "LocalAddress": "http://127.0.0.1",
+            "ServerName": SERVER_NAME,
+            "Version": SERVER_VERSION,
+            "ProductName": "Jellyfin Server",
+            "OperatingSystem": "",
+            "Id": stable_id("server"),
+            "StartupWizardCompleted": True,
+        }
+
+    def authenticate(self, request, session):
+        body = request.json()
+        username = body.get("Username") or ""
+        if not username:
+            return 401, None
+        auth = request.auth_fields()
+        device_id = auth.get("DeviceId") or uuid.uuid4().hex
+        user_id = stable_id("user", username)
+        session = self.sessions_by_device.get(device_id)
+        if session is None or session.user_id != user_id:
+            session = DeviceSession(device_id, auth.get("Device", ""), auth.get("Client", ""),
+                                    auth.get("Version", ""), user_id, username)
+            self.sessions_by_device[device_id] = session
+            self.sessions_by_token[session.token] = session
+            self.sessions_by_id[session.id] = session
+        return 200, {
+            "User": {"Name": username, "ServerId": stable_id("server"), "Id": user_id, "HasPassword": True},
+            "SessionInfo": session.info(),
+            "AccessToken": session.token,
+            "ServerId": stable_id("server"),
+        }
+
+    def capabilities(self, request, session):
+        session.capabilities = request.json()
+        return 204, None
+
+    def list_sessions(self, request, session):
+        device_id = request.query.get("deviceid")
+        return 200, [s.info() for s in self.sessions_by_id.values() if not device_id or s.device_id == device_id]
+
+    def target_session(self, sid):
+        return self.sessions_by_id.get(sid)
+
+    def play_command(self, request, session, sid):
+        target = self.target_session(sid)
+        if target is None:
+            return 404, None
+        self.send_to_session(target, "Play", {
+            "ItemIds": request.query.get("itemids", "").split(","),
+            "StartPositionTicks": int(request.query.get("startpositionticks") or 0),
+            "PlayCommand": request.query.get("playcommand", "PlayNow"),
+            "ControllingUserId": session.user_id,
+        })
+        return 204, None
+
+    def playstate_command(self, request, session, sid, command):
+        target = self.target_session(sid)
+        if target is None:
+            return 404, None
+        data = {"Command": command, "ControllingUserId": session.user_id}
+        if "seekpositionticks" in request.query:
+            data["SeekPositionTicks"] = int(request.query["seekpositionticks"])
+        self.send_to_session(target, "Playstate", data)
+        return 204, None
+
+    def general_command(self, request, session, sid, command=None):
+        target = self.target_session(sid)
+        if target is None:
+            return 404, None
+        if command is None:
+            body = request.json()
+            command, arguments = body.get("Name"), body.get("Arguments", {})
+        else:
+            arguments = {key: value for key, value in request.params.items() if key.lower() != "api_key"}
+        self.send_to_session(target, "GeneralCommand",
+                             {"Name": command, "Arguments": arguments, "ControllingUserId": session.user_id})
+        return 204, None
+
+    async def write_playback(self, request, session, now_playing):
+        """Apply a playback report through the single-writer session store."""
+        try:
+            report = request.json()
+        except ValueError:
+            return 400, {"Message": "Invalid JSON"}
+        if not isinstance(report, dict) or not report.get("ItemId"):
+            return 400, {"Message": "ItemId is required"}
+        async with self.session_store:
+            if self.config.write_cost:
+                await asyncio.sleep(self.config.write_cost / 1000)
+            session.now_playing = report if now_playing else None
+        return 204, None
+
+    async def playback_start(self, request, session):
+        return await self.write_playback(request, session, True)
+
+    async def playback_progress(self, request, session):
+        return await self.write_playback(request, session, True)
+
+    async def playback_stopped(self, request, session):
+        return await self.write_playback(request, session, False)
+
+    def quick_connect_enabled(self, request, session):
+        return 200, True
+
+    def quick_connect_initiate(self, request, session):
+        secret = uuid.uuid4().hex + uuid.uuid4().hex
+        code = f"{self.rng.randrange(1_000_000):06d}"
+        state = {"Authenticated": False, "Secret": secret, "Code": code,
+                 "DeviceId": request.auth_fields().get("DeviceId", ""), "DateAdded": "2024-01-01T00:00:00Z"}
+        self.quick_connect[secret] = state
+        return 200, state
+
+    def quick_connect_state(self, request, session):
+        state = self.quick_connect.get(request.query.get("secret"))
+        return (200, state) if state else (404, None)
+
+    def syncplay_group_info(self, group):
+        return {
+            "GroupId": group["GroupId"],
+            "GroupName": group["GroupName"],
+            "State": group["State"],
+            "Participants": [s.user_name for s in group["members"]],
+            "LastUpdatedAt": "2024-01-01T00:00:00Z",
+        }
+
+    def syncplay_broadcast(self, group, update_type, data):
+        for member in group["members"]:
+            self.send_to_session(member, "SyncPlayGroupUpdate",
+                                 {"GroupId": group["GroupId"], "Type": update_type, "Data": data})
+
+    def syncplay_list(self, request, session):
+        return 200, [self.syncplay_group_info(g) for g in self.syncplay_groups.values()]
+
+    def syncplay_new(self, request, session):
+        self.syncplay_leave(request, session)
+        group_id = uuid.uuid4().hex
+        group = {"GroupId": group_id, "GroupName": request.json().get("GroupName", "Group"),
+                 "State": "Idle", "members": [session], "PositionTicks": 0, "waiting_for": set(), "resume": "Paused"}
+        self.syncplay_groups[group_id] = group
+        session.syncplay_group = group
+        self.syncplay_broadcast(group, "GroupJoined", self.syncplay_group_info(group))
+        return 204, None
+
+    def syncplay_join(self, request, session):
+        group = self.syncplay_groups.get(request.json().get("GroupId"))
+        if group is None:
+            return 400, {"Message": "Unknown group"}
+        self.syncplay_leave(request, session)
+        group["members"].append(session)
+        session.syncplay_group = group
+        self.send_to_session(session, "SyncPlayGroupUpdate",
+                             {"GroupId": group["GroupId"], "Type": "GroupJoined", "Data": self.syncplay_group_info(group)})
+        self.syncplay_broadcast(group, "UserJoined", session.user_name)
+        return 204, None
+
+    def syncplay_leave(self, request, session):
+        group = session.syncplay_group
+        if group is None:
+            return 204, None
+        group["members"].remove(session)
+        group["waiting_for"].discard(session.id)
+        session.syncplay_group = None
+        self.send_to_session(session, "SyncPlayGroupUpdate",
+                             {"GroupId": group["GroupId"], "Type": "GroupLeft", "Data": group["GroupId"]})
+        if group["members"]:
+            self.syncplay_broadcast(group, "UserLeft", session.user_name)
+        else:
+            del self.syncplay_groups[group["GroupId"]]
+        return 204, None
+
+    def syncplay_command(self, group, command, delay=0.0):
+        """SyncPlayCommand to every member; When is `delay` seconds ahead so members act together."""
+        now = datetime.now(timezone.utc)
+        data = {"GroupId": group["GroupId"], "PlaylistItemId": "0", "Command": command,
+                "PositionTicks": group["PositionTicks"], "When": iso_time(now + timedelta(seconds=delay)),
+                "EmittedAt": iso_time(now)}
+        for member in group["members"]:
+            self.send_to_session(member, "SyncPlayCommand", data)
+
+    def syncplay_state(self, group, state):
+        group["State"] = state
+        self.syncplay_broadcast(group, "StateUpdate", {"State": state, "Reason": "Ready"})
+
+    def syncplay_pause(self, request, session):
+        group = session.syncplay_group
+        if group is None:
+            return 400, {"Message": "Not in a group"}
+        group["resume"] = "Paused"
+        if group["State"] != "Waiting":
+            group["State"] = "Paused"
+            self.syncplay_command(group, "Pause")
+        return 204, None
+
+    def syncplay_unpause(self, request, session):
+        group = session.syncplay_group
+        if group is None:
+            return 400, {"Message": "Not in a group"}
+        group["resume"] = "Playing"
+        if group["State"] != "Waiting":
+            group["State"] = "Playing"
+            # Jellyfin schedules the unpause far enough ahead for the slowest member to receive it.
+            self.syncplay_command(group, "Unpause", delay=max(0.1, 2 * max(
+                (m.syncplay_ping for m in group["members"]), default=0) / 1000))
+        return 204, None
+
+    def syncplay_seek(self, request, session):
+        group = session.syncplay_group
+        if group is None:
+            return 400, {"Message": "Not in a group"}
+        group["PositionTicks"] = int(request.json().get("PositionTicks") or 0)
+        group["waiting_for"] = {member.id for member in group["members"]}
+        group["State"] = "Waiting"
+        self.syncplay_command(group, "Seek")
+        return 204, None
+
+    def syncplay_ready(self, request, session):
+        group = session.syncplay_group
+        if group is None:
+            return 400, {"Message": "Not in a group"}
+        group["waiting_for"].discard(session.id)
+        if group["State"] == "Waiting" and not group["waiting_for"]:
+            self.syncplay_state(group, group["resume"])
+        return 204, None
+
+    def syncplay_ping(self, request, session):
+        session.syncplay_ping = float(request.json().get("Ping") or 0)
+        return 204, None
+
+    def user(self, request, session, uid):
+        return 200, {"Name": session.user_name, "ServerId": stable_id("server"), "Id": session.user_id,
+                     "HasPassword": True, "Configuration": {"PlayDefaultAudioTrack": True, "SubtitleMode": "Default"},
+                     "Policy": {"IsAdministrator": False}}
+
+    def views(self, request, session, uid):
+        return 200, {"Items": [{"Name": name, "Id": stable_id("view", kind), "Type": "CollectionFolder",
+                                "CollectionType": kind, "IsFolder": True} for name, kind in VIEWS],
+                     "TotalRecordCount": len(VIEWS)}
+
+    @staticmethod
+    def list_args(request):
+        query = request.query
+        types = {t for t in query.get("includeitemtypes", "").split(",") if t}
+        fields = {f.lower() for f in query.get("fields", "").split(",") if f}
+        limit = int(query["limit"]) if query.get("limit") else None
+        return types, int(query.get("startindex") or 0), limit, fields
+
+    def items(self, request, session, uid):
+        types, start, limit, fields = self.list_args(request)
+        if {"isfavorite", "isresumable"} & {f.lower() for f in request.query.get("filters", "").split(",")}:
+            # Nothing is favourited or part-watched in the synthetic library.
+            return 200, {"Items": [], "TotalRecordCount": 0, "StartIndex": start}
+        return 200, self.library.query(types, start, limit, fields, request.query.get("parentid"))
+
+    def latest(self, request, session, uid):
+        # Jellyfin returns a bare array here, newest first.
+        types, _, limit, fields = self.list_args(request)
+        page = self.library.query(types or {"Movie", "Episode"}, 0, None, fields)["Items"]
+        return 200, page[::-1][:limit or 20]
+
+    def next_up(self, request, session):
+        _, start, limit, fields = self.list_args(request)
+        return 200, self.library.query({"Episode"}, start, limit, fields)
+
+    def similar(self, request, session, item_id):
+        _, _, limit, fields = self.list_args(request)
+        index = self.library.by_id.get(item_id, 0)
+        page = self.library.query({"Movie"}, 0, None, fields)["Items"]
+        return 200, {"Items": page[index % max(len(page), 1):][:limit or 12], "TotalRecordCount": len(page)}
+
+    def item(self, request, session, uid, item_id):
+        if item_id in self.library.folders:
+            return 200, self.library.folder(item_id)
+        index = self.library.by_id.get(item_id)
+        if index is None:
+            return 404, None
+        return 200, self.library.item(index, {"overview", "trickplay"})
+
+    def local_trailers(self, request, session, uid, item_id):
+        return 200, []
+
+    def search_hints(self, request, session):
+        # A linear scan of every name, so the work per query grows with --items like an unindexed search.
+        term = request.query.get("searchterm", "").lower()
+        limit = int(request.query.get("limit") or 20)
+        matches = [i for i, name in enumerate(self.library.names()) if term and term in name]
+        hints = []
+        for i in matches[:limit]:
+            item = self.library.item(i)
+            hints.append({"ItemId": item["Id"], "Id": item["Id"], "Name": item["Name"], "Type": item["Type"],
+                          "MatchedTerm": term, "RunTimeTicks": item["RunTimeTicks"],
+                          "PrimaryImageTag": item["ImageTags"].get("Primary")})
+        return 200, {"SearchHints": hints, "TotalRecordCount": len(matches)}
+
+    def live_tv_info(self, request, session):
+        enabled = bool(self.guide.ids)
+        return 200, {"Services": [], "IsEnabled": enabled, "EnabledUsers": [session.user_id] if enabled else []}
+
+    def channels(self, request, session):
+        _, start, limit, _ = self.list_args(request)
+        count = len(self.guide.ids)
+        page = range(start, min(count, start + limit) if limit is not None else count)
+        return 200, {"Items": [self.guide.channel(c) for c in page], "TotalRecordCount": count, "StartIndex": start}
+
+    def programs(self, request, session):
+        def parse(name, default):
+            value = request.query.get(name)
+            if not value:
+                return default
+            return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+
+        now = datetime.now(timezone.utc)
+        min_end = parse("minenddate", now)
+        max_start = parse("maxstartdate", min_end + timedelta(days=1))
+        wanted = [c for c in request.query.get("channelids", "").split(",") if c]
+        channels = [self.guide.by_id[c] for c in wanted if c in self.guide.by_id] if wanted \
+            else range(len(self.guide.ids))
+        items = [program for c in channels for program in self.guide.programs(c, min_end, max_start)]
+        items.sort(key=lambda program: program["StartDate"])
+        return 200, {"Items": items, "TotalRecordCount": len(items), "StartIndex": 0}
+
+    def empty_list(self, request, session):
+        return 200, {"Items": [], "TotalRecordCount": 0, "StartIndex": 0}
+
+    async def image(self, request, session, item_id, image_type, index=None):
+        if item_id not in self.library.by_id:
+            return 404, None
+        width = int(request.query.get("maxwidth") or 1920)
+        height = int(request.query.get("maxheight") or 1080)
+        key = (item_id, image_type, index, width, height)
+        if key not in self.resized_images:
+            # Like Jellyfin's image processor: resize once, then serve from its cache.
+            await asyncio.sleep(self.config.resize_cost * width * height / 1_000_000 / 1000)
+            self.resized_images.add(key)
+        seed = hashlib.sha256(repr(key).encode()).digest()
+        size = max(512, width * height // 12)
+        body = b"\xff\xd8\xff\xe0" + (seed * (size // len(seed) + 1))[:size - 4]
+        return 200, body, {"Content-Type": "image/jpeg", "Cache-Control": "public, max-age=31536000"}
+
+    def trickplay_tile(self, request, session, item_id, width, index):
+        item_index = self.library.by_id.get(item_id)
+        if item_index is None:
+            return 404, None
+        meta = self.library.item(item_index, {"trickplay"}).get("Trickplay", {}).get(item_id, {}).get(width)
+        tiles = meta and meta["TileWidth"] * meta["TileHeight"]
+        if not meta or int(index) * tiles >= meta["ThumbnailCount"]:
+            return 404, None
+        thumbnails = min(tiles, meta["ThumbnailCount"] - int(index) * tiles)
+        size = thumbnails * meta["Width"] * meta["Height"] // 20
+        seed = hashlib.sha256(f"{item_id}/{width}/{index}".encode()).digest()
+        return 200, b"\xff\xd8\xff\xe0" + (seed * (size // len(seed) + 1))[:size - 4], {"Content-Type": "image/jpeg"}
+
+
+    # --- HLS transcoding ---
+
+    def advance_transcodes(self):
+        """Share transcode_capacity equally between the active jobs for the time since the last call."""
+        now = asyncio.get_running_loop().time()
+        active = [job for job in self.transcodes.values() if job.active]
+        if active and self.transcode_clock is not None:
+            step = (now - self.transcode_clock) * self.config.transcode_capacity / len(active)
+            for job in active:
+                job.produced = min(job.duration, job.produced + step)
+        self.transcode_clock = now
+        return len(active)
+
+    def transcode_job(self, request, item_id, start=None):
+        index = self.library.by_id.get(item_id)
+        if index is None:
+            return None
+        self.advance_transcodes()
+        key = (request.query.get("deviceid", ""), request.query.get("playsessionid", ""), item_id)
+        job = self.transcodes.get(key)
+        if job is None or job.stopped or (start is not None and not job.start <= start <= job.produced + 2 * HLS_SEGMENT_SECONDS):
+            # New stream, or a seek outside what is transcoded: Jellyfin restarts ffmpeg at the position.
+            job = TranscodeJob(key[0], key[1], self.library.entries[index][2] / 10_000_000,
+                               int(request.query.get("videobitrate") or 10_000_000), start or 0.0)
+            self.transcodes[key] = job
+        return job
+
+    def hls_master(self, request, session, item_id):
+        job = self.transcode_job(request, item_id)
+        if job is None:
+            return 404, None
+        query = "&".join(f"{key}={value}" for key, value in request.params.items())
+        body = ("#EXTM3U\n"
+                f"#EXT-X-STREAM-INF:PROGRAM-ID=1,BANDWIDTH={job.bitrate + 360_000},RESOLUTION=1920x1080,"
+                'CODECS="avc1.640029,mp4a.40.2"\n'
+                f"main.m3u8?{query}\n")
+        return 200, body.encode(), {"Content-Type": "application/vnd.apple.mpegurl"}
+
+    def hls_playlist(self, request, session, item_id):
+        index = self.library.by_id.get(item_id)
+        if index is None:
+            return 404, None
+        duration = self.library.entries[index][2] / 10_000_000
+        query = "&".join(f"{key}={value}" for key, value in request.params.items())
+        lines = ["#EXTM3U", "#EXT-X-PLAYLIST-TYPE:VOD", "#EXT-X-VERSION:3",
+                 f"#EXT-X-TARGETDURATION:{HLS_SEGMENT_SECONDS}", "#EXT-X-MEDIA-SEQUENCE:0"]
+        for segment in range(int(-(-duration // HLS_SEGMENT_SECONDS))):
+            length = min(HLS_SEGMENT_SECONDS, duration - segment * HLS_SEGMENT_SECONDS)
+            lines += [f"#EXTINF:{length:.6f}, nodesc", f"hls1/main/{segment}.ts?{query}"]
+        lines.append("#EXT-X-ENDLIST")
+        return 200, ("\n".join(lines) + "\n").encode(), {"Content-Type": "application/vnd.apple.mpegurl"}
+
+    async def hls_segment(self, request, session, item_id, segment):
+        start = int(segment) * HLS_SEGMENT_SECONDS
+        job = self.transcode_job(request, item_id, start)
+        if job is None or start >= job.duration:
+            return 404, None
+        end = min(job.duration, start + HLS_SEGMENT_SECONDS)
+        # Like Jellyfin, hold the request until ffmpeg has written the segment.
+        while job.produced < end:
+            if job.stopped:
+                return 404, None
+            active = self.advance_transcodes() or 1
+            await asyncio.sleep(max(0.005, (end - job.produced) * active / self.config.transcode_capacity))
+            self.advance_transcodes()
+        packets = int((end - start) * (job.bitrate + 360_000) / 8 / len(TS_PACKET))
+        return 200, TS_PACKET * packets, {"Content-Type": "video/mp2t"}
+
+    def stop_encodings(self, request, session):
+        device_id = request.query.get("deviceid")
+        play_session_id = request.query.get("playsessionid")
+        if not device_id:
+            return 400, {"Message": "DeviceId is required"}
+        self.advance_transcodes()
+        for key, job in list(self.transcodes.items()):
+            if job.device_id == device_id and (not play_session_id or job.play_session_id == play_session_id):
+                job.stopped = True
+                del self.transcodes[key]
+        return 204, None
+
+
+# --- WebSocket framing (RFC 6455, server side) ---
+
+def encode_frame(opcode, payload):
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+def send_frame(writer, message):
+    writer.write(encode_frame(0x1, json.dumps(message).encode()))
+
+
+async def read_frame(reader):
+    """Read one complete (possibly fragmented) client message; returns (opcode, payload)."""
+    opcode, chunks = None, []
+    while True:
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+        data = await reader.readexactly(length)
+        data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+        frame_opcode = first & 0x0F
+        if frame_opcode >= 0x8:  # control frames may arrive between fragments
+            return frame_opcode, data
+        if frame_opcode:
+            opcode = frame_opcode
+        chunks.append(data)
+        if first & 0x80:
+            return opcode, b"".join(chunks)
+
+
+# --- UDP discovery ---
+
+class DiscoveryProtocol(asyncio.DatagramProtocol):
+    """Answers Jellyfin's "Who is JellyfinServer?" broadcast (UDP 7359) with the server's address."""
+
+    def __init__(self, address):
+        self.address = address
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if b"who is jellyfinserver" in data.lower():
+            reply = {"Address": self.address, "Id": stable_id("server"), "Name": SERVER_NAME, "EndpointAddress": None}
+            self.transport.sendto(json.dumps(reply).encode(), addr)
+
+
+# --- Running ---
+
+async def serve(config, host="127.0.0.1", port=8096, ready=None, discovery_port=None):
+    server = StandinServer(config)
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=1 << 20, backlog=512)
+    if discovery_port:
+        # Broadcasts only reach a socket bound to every interface.
+        address = f"http://{host}:{listener.sockets[0].getsockname()[1]}"
+        await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: DiscoveryProtocol(address), local_addr=("0.0.0.0", discovery_port), allow_broadcast=True)
+    if ready is not None:
+        ready(listener.sockets[0].getsockname()[1], asyncio.get_running_loop(), listener)
+    async with listener:
+        await listener.serve_forever()
+
+
+def start_in_thread(config, host="127.0.0.1", port=0, discovery_port=None):
+    """Run the stand-in on a daemon thread; returns (base_url, stop). port=0 picks a free port."""
+    started = threading.Event()
+    state = {}
+
+    def ready(bound_port, loop, listener):
+        state.update(port=bound_port, loop=loop, listener=listener)
+        started.set()
+
+    def run():
+        try:
+            asyncio.run(serve(config, host, port, ready, discovery_port))
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, name="jellyfin-standin", daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        state["loop"].call_soon_threadsafe(state["listener"].close)
+        thread.join(timeout=5)
+
+    return f"http://{host}:{state['port']}", stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Jellyfin stand-in for test_connection.py benchmarks")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8096, help="Port to listen on (default 8096)")
+    parser.add_argument("--discovery-port", type=int, default=7359,
+                        help="UDP port answering Jellyfin server discovery; 0 disables (default 7359)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    config = config_from_args(args)
+
+    print(f"=== Jellyfin Orsay Stand-in Server ===")
+    print(f"Listening: http://{args.host}:{args.port}")
+    print(f"Library:   {config.items} items (seed {config.seed})")
+    print(f"Faults:    latency {config.latency:g}±{config.jitter:g} ms, error rate {config.error_rate:g}")
+    try:
+        asyncio.run(serve(config, args.host, args.port, discovery_port=args.discovery_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
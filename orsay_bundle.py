@@ -0,0 +1,258 @@
+"""
+Startup payload report and optimized-bundle builder for the Orsay widget template.
+
+The TV's browser fetches and evaluates every <script> in index.html one after another before
+Main.onLoad() runs, so boot time grows with both the number of files and their size. This
+reports the scripts in load order (bytes, lines, comment/whitespace share), the files the
+widget ships but never loads, and an estimated boot cost. With --out it also writes an
+optimized template: the app scripts concatenated in index.html order into one bundle with
+comments and indentation removed (line breaks are kept, so automatic semicolon insertion
+behaves exactly as before), Main.css stripped the same way, and unreferenced scripts and
+images left out. The output directory has the template's layout, so it can be passed to
+orsay_widget_server.py --template.
+
+Standard library only.
+
+Usage:
+    python3 orsay_bundle.py
+    python3 orsay_bundle.py --out build/optimized
+    python3 orsay_widget_server.py --optimize
+"""
+
+import argparse
+import io
+import os
+import re
+import shutil
+import zipfile
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Jellyfin-Orsay-Installer", "Template")
+BUNDLE_PATH = "app/javascript/bundle.js"
+
+# Boot cost model for a 2010-2012 Orsay set (Maple browser on a ~400 MHz MIPS/ARM SoC): a fixed
+# cost per script (flash read + request + evaluation set-up) plus parse/compile time per KiB.
+PER_FILE_MS = 25.0
+PER_KIB_MS = 4.0
+
+SCRIPT_TAG = re.compile(r'<script\s+src="([^"]+)"\s*>\s*</script>', re.IGNORECASE)
+# Characters after which a "/" starts a regular expression literal rather than a division.
+REGEX_PRECEDERS = set("(,=:[!&|?{};~+-*%<>^")
+REGEX_KEYWORD_BEFORE = re.compile(r"\b(?:return|typeof|case|delete|void|in|new|throw)\s*\Z")
+
+
+def strip_js(source):
+    """Remove comments, indentation, trailing spaces and blank lines; strings and regex literals are kept intact."""
+    out = []
+    i, n = 0, len(source)
+    last = ""  # last significant character written, for telling regex literals from division
+    while i < n:
+        c = source[i]
+        if c in "'\"`":
+            end = i + 1
+            while end < n and source[end] != c:
+                end += 2 if source[end] == "\\" else 1
+            out.append(source[i:end + 1])
+            i, last = end + 1, c
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end < 0 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            comment = source[i:n if end < 0 else end + 2]
+            out.append("\n" if "\n" in comment else " ")
+            i += len(comment)
+        elif c == "/" and (not last or last in REGEX_PRECEDERS or REGEX_KEYWORD_BEFORE.search(source, max(0, i - 16), i)):
+            end, in_class = i + 1, False
+            while end < n and source[end] != "\n":
+                if source[end] == "\\":
+                    end += 2
+                    continue
+                if source[end] == "[":
+                    in_class = True
+                elif source[end] == "]":
+                    in_class = False
+                elif source[end] == "/" and not in_class:
+                    break
+                end += 1
+            while end + 1 < n and source[end + 1].isalpha():  # flags
+                end += 1
+            out.append(source[i:end + 1])
+            i, last = end + 1, "/"
+        else:
+            out.append(c)
+            if not c.isspace():
+                last = c
+            i += 1
+    lines = (line.strip() for line in "".join(out).splitlines())
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def strip_css(source):
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.DOTALL)
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def boot_cost_ms(scripts, per_file_ms=PER_FILE_MS, per_kib_ms=PER_KIB_MS):
+    """Modelled script load time for [(path, bytes)] under the PER_FILE_MS / PER_KIB_MS model."""
+    return sum(per_file_ms + size / 1024 * per_kib_ms for _, size in scripts)
+
+
+def zip_size(root, paths):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        for path in paths:
+            archive.write(os.path.join(root, path), path)
+    return len(buffer.getvalue())
+
+
+class TemplateAnalysis:
+    """What the widget in template_root/Jellyfin loads at boot and what it ships without using."""
+
+    def __init__(self, template_root=DEFAULT_TEMPLATE):
+        self.root = os.path.join(template_root, "Jellyfin")
+        with open(os.path.join(self.root, "index.html"), encoding="utf-8") as f:
+            self.index_html = f.read()
+        self.files = sorted(
+            os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+            for directory, _, names in os.walk(self.root) for name in names
+            if name != "config.xml.template")
+        # Firmware-provided scripts ($MANAGER_WIDGET/...) are not in the package and stay as they are.
+        self.platform_scripts = [src for src in SCRIPT_TAG.findall(self.index_html) if src.startswith("$")]
+        app_scripts = [src for src in SCRIPT_TAG.findall(self.index_html) if not src.startswith("$")]
+        # Tags for files the package does not contain cost the TV a failed load and define nothing.
+        self.missing = [src for src in app_scripts if src not in self.files]
+        self.scripts = [src for src in app_scripts if src in self.files]
+        self.sources = {path: self.read(path) for path in self.scripts}
+        self.unused = self.find_unused()
+
+    def read(self, path):
+        with open(os.path.join(self.root, path), encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def size(self, path):
+        return os.path.getsize(os.path.join(self.root, path))
+
+    def find_unused(self):
+        """Scripts index.html never loads and images nothing names. An image counts as used if its path
+        or file name appears in a loaded script, index.html, Main.css or config.xml, or if code builds
+        paths in its directory at run time ("images/menu/" + name)."""
+        text = "\n".join([self.index_html, *self.sources.values(), self.read("Main.css"), self.read("config.xml")])
+        dynamic = set(re.findall(r"""(images/[\w/-]*/)["']\s*\+""", text))
+        unused = []
+        for path in self.files:
+            if path.endswith(".js") and path not in self.scripts:
+                unused.append(path)
+            elif path.startswith("images/") and path not in text and os.path.basename(path) not in text \
+                    and not any(path.startswith(prefix) for prefix in dynamic):
+                unused.append(path)
+        return unused
+
+    def print_report(self, per_file_ms=PER_FILE_MS, per_kib_ms=PER_KIB_MS):
+        print("=== Jellyfin Orsay Template Payload ===")
+        print(f"Template:  {self.root}")
+        total = sum(self.size(path) for path in self.files)
+        print(f"Package:   {len(self.files)} files, {total / 1024:.0f} KiB, "
+              f"{zip_size(self.root, self.files) / 1024:.0f} KiB zipped")
+        print(f"Scripts:   {len(self.platform_scripts)} firmware + {len(self.scripts)} app scripts, loaded in this order:\n")
+        print(f"  {'#':>3}  {'Script':<52}{'lines':>7}{'KiB':>8}{'stripped':>10}{'saved':>7}")
+        original = stripped = 0
+        for index, path in enumerate(self.scripts, 1):
+            source = self.sources[path]
+            size, small = len(source.encode("utf-8")), len(strip_js(source).encode("utf-8"))
+            original, stripped = original + size, stripped + small
+            print(f"  {index:>3}  {path.removeprefix('app/javascript/'):<52}{source.count(chr(10)):>7}"
+                  f"{size / 1024:>8.1f}{small / 1024:>10.1f}{(1 - small / size) * 100:>6.0f}%")
+        print(f"  {'':>3}  {'total':<52}{'':>7}{original / 1024:>8.1f}{stripped / 1024:>10.1f}"
+              f"{(1 - stripped / original) * 100:>6.0f}%")
+
+        if self.missing:
+            print(f"\n  Loaded by index.html but missing from the package (dropped from the bundle):")
+            for path in self.missing:
+                print(f"    {path}")
+        if self.unused:
+            unused_bytes = sum(self.size(path) for path in self.unused)
+            print(f"\n  Shipped but never referenced: {len(self.unused)} files, {unused_bytes / 1024:.0f} KiB")
+            for path in self.unused:
+                print(f"    {path} ({self.size(path) / 1024:.1f} KiB)")
+
+        before = boot_cost_ms([(p, len(self.sources[p].encode("utf-8"))) for p in self.scripts]
+                              + [(p, 0) for p in self.missing], per_file_ms, per_kib_ms)
+        after = boot_cost_ms([(BUNDLE_PATH, stripped)], per_file_ms, per_kib_ms)
+        print(f"\n  Estimated app script load at boot ({per_file_ms:g} ms/file + {per_kib_ms:g} ms/KiB):")
+        print(f"    as shipped:  {len(self.scripts) + len(self.missing)} files, {before:.0f} ms")
+        print(f"    bundled:     1 file, {after:.0f} ms ({before - after:.0f} ms faster)")
+
+    def build(self, out_root):
+        """Write the optimized template to out_root/Jellyfin; returns the list of packaged files."""
+        target = os.path.join(out_root, "Jellyfin")
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        skipped = set(self.unused) | set(self.scripts) | {"index.html", "Main.css"}
+        for path in self.files:
+            if path not in skipped:
+                os.makedirs(os.path.dirname(os.path.join(target, path)), exist_ok=True)
+                shutil.copy2(os.path.join(self.root, path), os.path.join(target, path))
+
+        # Each script is closed with ";" so a file ending without one cannot run into the next.
+        bundle = "".join(f"/* {path} */\n{strip_js(self.sources[path])};\n" for path in self.scripts)
+        os.makedirs(os.path.dirname(os.path.join(target, BUNDLE_PATH)), exist_ok=True)
+        with open(os.path.join(target, BUNDLE_PATH), "w", encoding="utf-8", newline="\n") as f:
+            f.write(bundle)
+        with open(os.path.join(target, "Main.css"), "w", encoding="utf-8", newline="\n") as f:
+            f.write(strip_css(self.read("Main.css")))
+
+        # The first app script tag becomes the bundle; the rest are dropped.
+        first = True
+
+        def replace(match):
+            nonlocal first
+            if match.group(1).startswith("$"):
+                return match.group(0)
+            if first:
+                first = False
+                return f'<script src="{BUNDLE_PATH}"></script>'
+            return ""
+
+        index_html = SCRIPT_TAG.sub(replace, self.index_html)
+        index_html = "\n".join(line for line in index_html.splitlines() if line.strip()) + "\n"
+        with open(os.path.join(target, "index.html"), "w", encoding="utf-8", newline="\n") as f:
+            f.write(index_html)
+
+        template = os.path.join(os.path.dirname(self.root), "Jellyfin", "config.xml.template")
+        if os.path.exists(template):
+            shutil.copy2(template, os.path.join(target, "config.xml.template"))
+        return sorted(os.path.relpath(os.path.join(directory, name), target).replace(os.sep, "/")
+                      for directory, _, names in os.walk(target) for name in names
+                      if name != "config.xml.template")
+
+
+def build_optimized(template_root, out_root):
+    """Analyze template_root and write the optimized template to out_root; returns the TemplateAnalysis."""
+    analysis = TemplateAnalysis(template_root)
+    analysis.build(out_root)
+    return analysis
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the Orsay widget's startup payload and build an optimized template")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Template directory holding Jellyfin/")
+    parser.add_argument("--out", default=None, help="Write the optimized template here (DIR/Jellyfin)")
+    parser.add_argument("--per-file-ms", type=float, default=PER_FILE_MS,
+                        help=f"Modelled fixed cost per script on the TV (default {PER_FILE_MS:g})")
+    parser.add_argument("--per-kib-ms", type=float, default=PER_KIB_MS,
+                        help=f"Modelled parse cost per KiB of script on the TV (default {PER_KIB_MS:g})")
+    args = parser.parse_args()
+
+    analysis = TemplateAnalysis(args.template)
+    analysis.print_report(args.per_file_ms, args.per_kib_ms)
+    if args.out:
+        files = analysis.build(args.out)
+        target = os.path.join(args.out, "Jellyfin")
+        total = sum(os.path.getsize(os.path.join(target, path)) for path in files)
+        print(f"\nOptimized: {target}: {len(files)} files, {total / 1024:.0f} KiB, "
+              f"{zip_size(target, files) / 1024:.0f} KiB zipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Headless widget server for Samsung Orsay TVs: the Python counterpart of the installer's
+OrsayPackager + KestrelOrsayServer. The widget zip and widgetlist.xml are built from
+Template/Jellyfin once at start-up and held in memory (the zip in an anonymous memory-backed
+file, also memory-mapped), then served with ETag, If-None-Match and single-range support. Zip
+bodies go out with sendfile() where the platform allows it, so hundreds of TVs refetching the
+widget after a firmware update cost the server no per-download copies.
+
+Standard library only (asyncio HTTP/1.1 with keep-alive).
+
+Usage:
+    python3 orsay_widget_server.py --port 80
+    python3 orsay_widget_server.py --port 8080 --advertise 192.168.1.20 --app-name Jellyfin
+    python3 orsay_widget_server.py --port 80 --optimize
+    python3 test_connection.py --widget-load 500
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+import socket
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Jellyfin-Orsay-Installer", "Template")
+
+STATUS_TEXT = {
+    200: "OK", 206: "Partial Content", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 416: "Range Not Satisfiable",
+}
+
+
+def template_version(config_xml):
+    """<ver> from the widget's config.xml, with OrsayPackager's fallback."""
+    try:
+        ver = ET.parse(config_xml).getroot().find("{*}ver")
+        if ver is not None and ver.text:
+            return ver.text.strip()
+    except (OSError, ET.ParseError):
+        pass
+    return "1.0.0"
+
+
+def advertised_address():
+    """The LAN address TVs should download from (the interface holding the default route)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        try:
+            probe.connect(("192.0.2.1", 9))  # TEST-NET-1; nothing is sent
+            return probe.getsockname()[0]
+        except OSError:
+            return "127.0.0.1"
+
+
+class ServedFile:
+    """One immutable response body with its validators."""
+
+    def __init__(self, name, content_type, data):
+        self.name = name
+        self.content_type = content_type
+        self.size = len(data)
+        self.etag = f'"{hashlib.sha1(data).hexdigest()[:20]}"'
+        self.last_modified = format_datetime(datetime.now(timezone.utc), usegmt=True)
+        self.data = data
+        self.file = None
+
+    def pin(self):
+        """Move the body into an unlinked temp file (memfd on Linux) so it can be sendfile()d and mmap()ed."""
+        if hasattr(os, "memfd_create"):
+            self.file = os.fdopen(os.memfd_create(self.name), "w+b")
+        else:
+            self.file = tempfile.TemporaryFile()
+        self.file.write(self.data)
+        self.file.flush()
+        self.data = mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ)
+
+
+class WidgetPackage:
+    """The widget zip and widgetlist.xml, built the way OrsayPackager.BuildWidget() does."""
+
+    def __init__(self, template_root=DEFAULT_TEMPLATE, app_name="Jellyfin", address="127.0.0.1", port=80):
+        widget_root = os.path.join(template_root, "Jellyfin")
+        self.version = template_version(os.path.join(widget_root, "config.xml"))
+        date_stamp = datetime.now().strftime("%Y%m%d")
+        self.widget_id = f"{app_name}_{date_stamp}"
+        self.zip_name = f"{app_name}_v{self.version}_{date_stamp}.zip"
+
+        started = time.perf_counter()
+        buffer = io.BytesIO()
+        self.file_count = 0
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            for directory, subdirs, files in os.walk(widget_root):
+                subdirs.sort()
+                for name in sorted(files):
+                    if name == "config.xml.template":
+                        continue
+                    path = os.path.join(directory, name)
+                    archive.write(path, os.path.relpath(path, widget_root).replace(os.sep, "/"))
+                    self.file_count += 1
+        self.build_seconds = time.perf_counter() - started
+        self.zip = ServedFile(self.zip_name, "application/zip", buffer.getvalue())
+        self.zip.pin()
+        self.set_address(address, port)
+
+    def set_address(self, address, port):
+        """(Re)generate widgetlist.xml for the address TVs download from."""
+        download = f"http://{address}/{self.zip_name}" if port == 80 else f"http://{address}:{port}/{self.zip_name}"
+        widgetlist = f"""<?xml version="1.0" encoding="utf-8"?>
+<rsp stat="ok">
+<list>
+<widget id="{self.widget_id}">
+    <title>{self.widget_id}</title>
+    <compression size="{self.zip.size}" type="zip" />
+    <description>Jellyfin Media Player for Samsung Orsay Smart TVs</description>
+    <download>{download}</download>
+</widget>
+</list>
+</rsp>
+"""
+        self.widgetlist = ServedFile("widgetlist.xml", "text/xml; charset=utf-8", widgetlist.encode("utf-8"))
+        self.files = {"/widgetlist.xml": self.widgetlist, f"/{self.zip_name}": self.zip}
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single bytes range, None for no/ignored range, or "invalid" (416)."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if not first:
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return "invalid"
+    return start, end
+
+
+class WidgetServer:
+    """Static HTTP server for one WidgetPackage; counts what it served."""
+
+    def __init__(self, package, log_requests=False):
+        self.package = package
+        self.log_requests = log_requests
+        self.sendfile = True
+        self.counts = {}
+        self.bytes_sent = 0
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                path = unquote(urlsplit(target).path)
+                if self.log_requests:
+                    print(f"{writer.get_extra_info('peername')[0]} {method} {path}")
+                status = await self.respond(writer, method.upper(), path, headers)
+                self.counts[status] = self.counts.get(status, 0) + 1
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, method, path, headers):
+        served = self.package.files.get(path)
+        if served is None or method not in ("GET", "HEAD"):
+            status = 404 if served is None else 405
+            writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Length: 0\r\n\r\n".encode("latin-1"))
+            await writer.drain()
+            return status
+
+        extra = {"ETag": served.etag, "Last-Modified": served.last_modified, "Accept-Ranges": "bytes"}
+        if served.etag in (headers.get("if-none-match") or "") or headers.get("if-none-match") == "*":
+            writer.write(self.head(304, extra))
+            await writer.drain()
+            return 304
+        span = None
+        if headers.get("if-range", served.etag) == served.etag:
+            span = parse_range(headers.get("range"), served.size)
+        if span == "invalid":
+            writer.write(self.head(416, dict(extra, **{"Content-Range": f"bytes */{served.size}"})))
+            await writer.drain()
+            return 416
+        status, (start, end) = (206, span) if span else (200, (0, served.size - 1))
+        if status == 206:
+            extra["Content-Range"] = f"bytes {start}-{end}/{served.size}"
+        extra["Content-Type"] = served.content_type
+        length = end - start + 1
+        writer.write(self.head(status, extra, length))
+        if method == "GET":
+            await self.write_body(writer, served, start, length)
+        else:
+            await writer.drain()
+        return status
+
+    @staticmethod
+    def head(status, extra, length=0):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", f"Content-Length: {length}"]
+        lines += [f"{name}: {value}" for name, value in extra.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def write_body(self, writer, served, start, length):
+        if served.file is not None and self.sendfile:
+            try:
+                # sendfile() takes an explicit offset, so connections can share the one file object.
+                await asyncio.get_running_loop().sendfile(writer.transport, served.file, start, length, fallback=False)
+                self.bytes_sent += length
+                return
+            except (NotImplementedError, RuntimeError):
+                self.sendfile = False  # e.g. no os.sendfile on this platform: serve from the mapping instead
+        writer.write(memoryview(served.data)[start:start + length])
+        await writer.drain()
+        self.bytes_sent += length
+
+
+async def serve(package, host="0.0.0.0", port=80, ready=None, log_requests=False):
+    server = WidgetServer(package, log_requests)
+    listener = await asyncio.start_server(server.handle_connection, host, port, backlog=1024)
+    if ready is not None:
+        ready(listener.sockets[0].getsockname()[1], asyncio.get_running_loop(), listener, server)
+    async with listener:
+        await listener.serve_forever()
+
+
+def start_in_thread(package, host="127.0.0.1", port=0):
+    """Serve package on a daemon thread; returns (base_url, server, stop). port=0 picks a free port
+    and rewrites widgetlist.xml to point at it."""
+    started = threading.Event()
+    state = {}
+
+    def ready(bound_port, loop, listener, server):
+        state.update(port=bound_port, loop=loop, listener=listener, server=server)
+        started.set()
+
+    def run():
+        try:
+            asyncio.run(serve(package, host, port, ready))
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, name="orsay-widget-server", daemon=True)
+    thread.start()
+    started.wait()
+    package.set_address(host, state["port"])
+
+    def stop():
+        state["loop"].call_soon_threadsafe(state["listener"].close)
+        thread.join(timeout=5)
+
+    return f"http://{host}:{state['port']}", state["server"], stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Jellyfin Orsay widget to Samsung TVs")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on (default 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=80, help="Port to listen on (default 80, as the TVs expect)")
+    parser.add_argument("--advertise", default=None,
+                        help="Address written into widgetlist.xml (default: this machine's LAN address)")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Template directory holding Jellyfin/")
+    parser.add_argument("--app-name", default="Jellyfin", help="Widget name used for the id and zip file name")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Serve the optimized template from orsay_bundle.py (one script bundle, unused files left out)")
+    parser.add_argument("--log-requests", action="store_true", help="Print every request, like the installer's log")
+    args = parser.parse_args()
+
+    address = args.advertise or advertised_address()
+    with tempfile.TemporaryDirectory() as build_root:
+        template = args.template
+        if args.optimize:
+            import orsay_bundle
+
+            orsay_bundle.build_optimized(template, build_root)
+            template = build_root
+        package = WidgetPackage(template, args.app_name, address, args.port)
+    print("=== Jellyfin Orsay Widget Server ===")
+    print(f"Widget:    {package.widget_id} v{package.version}, {package.file_count} files, "
+          f"{package.zip.size / 1024:.0f} KiB zip (built in {package.build_seconds * 1000:.0f} ms)")
+    print(f"Listening: {args.host}:{args.port}")
+    print(f"TVs fetch: http://{address}{'' if args.port == 80 else f':{args.port}'}/widgetlist.xml")
+    try:
+        asyncio.run(serve(package, args.host, args.port, log_requests=args.log_requests))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,58 @@ Tests: connection → version check → authentication → capabilities → WebS
 Usage:
     python3 test_connection.py --server https://your-server.com
     python3 test_connection.py --server https://your-server.com --username user --password pass
+    python3 test_connection.py --server https://your-server.com --username user --password pass --parallel
+    python3 test_connection.py --server https://your-server.com --username user --password pass --warm
+    python3 test_connection.py --server https://your-server.com --username user --password pass --clients 50 --ramp 10
+    python3 test_connection.py --server https://your-server.com --username user --password pass --command-bench --bench-rate 50
+    python3 test_connection.py --server https://your-server.com --username user --password pass --report probe.ndjson
+    python3 test_connection.py --server https://your-server.com --username user --password pass --crawl --page-size 100,200,500
+    python3 test_connection.py --server https://your-server.com --username user --password pass --images --image-passes 2
+    python3 test_connection.py --server https://your-server.com --username user --password pass --trickplay-seek --prefetch 0,1,3
+    python3 test_connection.py --server https://your-server.com --username user --password pass --playback --streams 4
+    python3 test_connection.py --server https://your-server.com --username user --password pass --screens --screen-set Limit=50
+    python3 test_connection.py --server https://your-server.com --username user --password pass --search --debounce enter,0,200
+    python3 test_connection.py --server https://your-server.com --username user --password pass --guide --guide-batch 10,50,all
+    python3 test_connection.py --server https://your-server.com --username user --password pass --direct-play-audit --tv-models H,F
+    python3 test_connection.py --server https://your-server.com --username user --password pass --payload-audit --payload-limits 25,100
+    python3 test_connection.py --server https://your-server.com --username user --password pass --progress-soak 300 --duration 600
+    python3 test_connection.py --server https://your-server.com --username user --password pass --socket-soak 2000 --storm-at 60
+    python3 test_connection.py --server https://your-server.com --username user --password pass --syncplay-clients 8
+    python3 test_connection.py --sweep 192.168.1.0/24,media.example.com,https://proxy.example.com --discover
+    python3 test_connection.py --server https://your-server.com --username user --password pass --clients 20 --record site.ndjson.gz
+    python3 test_connection.py --standin --username demo --replay site.ndjson.gz --replay-speed 0
+    python3 test_connection.py --server https://your-server.com --username user --password pass --monitor --interval 30
+    python3 test_connection.py --username user --password pass --monitor https://a.example.com,https://b.example.com
+    python3 test_connection.py --widget-load 500 --widget-rounds 2
+    python3 test_connection.py --widget-load 200 --widget-url http://192.168.1.20
+    python3 test_connection.py --widget-load 500 --widget-optimize
+    python3 test_connection.py --standin --standin-latency 20 --username demo --clients 50
 """
 
 import argparse
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import hashlib
+import io
 import json
+import math
+import os
+import random
+import re
+import socket
+import ssl
 import sys
+import threading
 import uuid
 import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from urllib.parse import parse_qsl, urljoin, urlsplit
 
 # --- Constants matching Main.js and Server.js ---
 APP_VERSION = "v2.2.5b"
@@ -22,13 +67,40 @@ CLIENT_NAME = "Samsung TV"
 SESSION_ID = None  # Set after authentication
 
 
-def make_headers(user_id=None, token=None):
+# Capabilities posted by Server.postCapabilities()
+CAPABILITIES = {
+    "PlayableMediaTypes": ["Audio", "Video"],
+    "SupportsMediaControl": True,
+    "SupportsPersistentIdentifier": False,
+    "SupportedCommands": [
+        "SetAudioStreamIndex", "SetSubtitleStreamIndex",
+        "Mute", "Unmute", "ToggleMute", "SetVolume",
+        "DisplayContent", "DisplayMessage", "GoHome",
+    ],
+}
+
+
+# Step names used in fleet statistics and --report records
+STEP_NAMES = [
+    "step1_connection",
+    "step2_version",
+    "step3_authenticate",
+    "step4_capabilities",
+    "step5_websocket",
+    "step6_remote_commands",
+    "step7_quick_connect",
+    "step8_syncplay",
+    "step9_trickplay",
+]
+
+
+def make_headers(user_id=None, token=None, device_id=None):
     """Build MediaBrowser auth headers matching Server.setRequestHeaders()"""
     uid = user_id or ""
     auth = (
         f'MediaBrowser Client="{CLIENT_NAME}", '
         f'Device="{DEVICE_NAME}", '
-        f'DeviceId="{DEVICE_ID}", '
+        f'DeviceId="{device_id or DEVICE_ID}", '
         f'Version="{APP_VERSION}", '
         f'UserId="{uid}"'
     )
@@ -41,6 +113,12 @@ def make_headers(user_id=None, token=None):
     return headers
 
 
+def socket_url(base_url, token, device_id=None):
+    """WebSocket URL opened by RemoteControl.connect()"""
+    ws_url = base_url.replace("https://", "wss://").replace("http://", "ws://")
+    return ws_url + f"/emby/socket?api_key={token}&deviceId={device_id or DEVICE_ID}"
+
+
 def step1_test_connection(session, base_url):
     """Mimics Server.testConnectionSettings() — GET /emby/System/Info/Public"""
     url = f"{base_url}/emby/System/Info/Public?format=json"
@@ -124,16 +202,7 @@ def step4_post_capabilities(session, base_url, user_id, token):
     """Mimics Server.postCapabilities()"""
     url = f"{base_url}/emby/Sessions/Capabilities/Full"
     headers = make_headers(user_id, token)
-    payload = json.dumps({
-        "PlayableMediaTypes": ["Audio", "Video"],
-        "SupportsMediaControl": True,
-        "SupportsPersistentIdentifier": False,
-        "SupportedCommands": [
-            "SetAudioStreamIndex", "SetSubtitleStreamIndex",
-            "Mute", "Unmute", "ToggleMute", "SetVolume",
-            "DisplayContent", "DisplayMessage", "GoHome",
-        ],
-    })
+    payload = json.dumps(CAPABILITIES)
 
     print(f"\n[Step 4] Posting capabilities: POST {url}")
 
@@ -156,8 +225,7 @@ def step5_test_websocket(base_url, token):
         print(f"\n[Step 5] WebSocket test: SKIPPED (install websockets: pip3 install websockets)")
         return
 
-    ws_url = base_url.replace("https://", "wss://").replace("http://", "ws://")
-    ws_url += f"/emby/socket?api_key={token}&deviceId={DEVICE_ID}"
+    ws_url = socket_url(base_url, token)
     # Mask token in output
     display_url = ws_url.replace(token, token[:8] + "...***")
 
@@ -165,7 +233,7 @@ def step5_test_websocket(base_url, token):
 
     async def test_ws():
         try:
-            async with websockets.connect(ws_url, close_timeout=5) as ws:
+            async with websockets.connect(ws_url, close_timeout=5, **socket_options()) as ws:
                 print(f"  OK — WebSocket connected!")
 
                 # Send keep-alive like the TV app does
@@ -204,28 +272,10 @@ def find_session_id(session, base_url, user_id, token):
     return None
 
 
-def step6_test_remote_commands(http_session, base_url, user_id, token):
-    """Send remote commands via REST API and verify they arrive on the WebSocket.
-    This simulates what the Jellyfin Android app does when controlling the TV."""
-    try:
-        import websockets
-        import asyncio
-    except ImportError:
-        print(f"\n[Step 6] Remote command test: SKIPPED (install websockets: pip3 install websockets)")
-        return
-
-    session_id = find_session_id(http_session, base_url, user_id, token)
-    if not session_id:
-        print(f"\n[Step 6] Remote command test: FAIL — Could not find session ID for this device.")
-        return
-
-    headers = make_headers(user_id, token)
-    ws_url = base_url.replace("https://", "wss://").replace("http://", "ws://")
-    ws_url += f"/emby/socket?api_key={token}&deviceId={DEVICE_ID}"
-
-    # Define all commands to test, grouped by type
-    # Each entry: (description, method, url_path, body_or_none, expected_ws_type)
-    commands = [
+def build_remote_commands(session_id):
+    """Remote commands a phone sends to the TV, grouped by type.
+    Each entry: (description, method, url_path, body_or_none, expected_ws_type)"""
+    return [
         # --- PlaystateCommands (via POST /Sessions/{id}/Playing/{command}) ---
         (
             "Playstate: Pause",
@@ -335,21 +385,45 @@ def step6_test_remote_commands(http_session, base_url, user_id, token):
         ),
     ]
 
+
+def build_play_command(session_id, item):
+    """PlayNow command for a library item, in the same shape as build_remote_commands()."""
+    return (
+        f"PlayCommand: PlayNow ({item.get('Name', 'Unknown')})",
+        "POST",
+        f"/emby/Sessions/{session_id}/Playing?ItemIds={item['Id']}&StartPositionTicks=0&PlayCommand=PlayNow",
+        None,
+        "Play",
+    )
+
+
+def step6_test_remote_commands(http_session, base_url, user_id, token):
+    """Send remote commands via REST API and verify they arrive on the WebSocket.
+    This simulates what the Jellyfin Android app does when controlling the TV."""
+    try:
+        import websockets
+        import asyncio
+    except ImportError:
+        print(f"\n[Step 6] Remote command test: SKIPPED (install websockets: pip3 install websockets)")
+        return
+
+    session_id = find_session_id(http_session, base_url, user_id, token)
+    if not session_id:
+        print(f"\n[Step 6] Remote command test: FAIL — Could not find session ID for this device.")
+        return
+
+    headers = make_headers(user_id, token)
+    ws_url = socket_url(base_url, token)
+
+    commands = build_remote_commands(session_id)
+
     # Get a playable item for the Play command test
     items_url = f"{base_url}/emby/Users/{user_id}/Items?format=json&IncludeItemTypes=Movie,Episode&Recursive=true&Limit=1"
     items_resp = http_session.get(items_url, headers=headers, timeout=10)
     if items_resp.status_code == 200:
         items = items_resp.json().get("Items", [])
         if items:
-            item_id = items[0]["Id"]
-            item_name = items[0].get("Name", "Unknown")
-            commands.insert(0, (
-                f"PlayCommand: PlayNow ({item_name})",
-                "POST",
-                f"/emby/Sessions/{session_id}/Playing?ItemIds={item_id}&StartPositionTicks=0&PlayCommand=PlayNow",
-                None,
-                "Play",
-            ))
+            commands.insert(0, build_play_command(session_id, items[0]))
         else:
             print(f"  (No playable items found — skipping PlayCommand test)")
     else:
@@ -362,7 +436,7 @@ def step6_test_remote_commands(http_session, base_url, user_id, token):
         passed = 0
         failed = 0
 
-        async with websockets.connect(ws_url, close_timeout=5) as ws:
+        async with websockets.connect(ws_url, close_timeout=5, **socket_options()) as ws:
             # Drain any initial messages (ForceKeepAlive, etc.)
             try:
                 while True:
@@ -534,58 +608,4517 @@ def step9_test_trickplay(http_session, base_url, user_id, token):
         print(f"  (Enable trickplay generation in Jellyfin 10.9+ server settings)")
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Test Jellyfin server connection (mimics Samsung Orsay TV app)")
-    parser.add_argument("--server", required=True, help="Jellyfin server URL (e.g. https://your-server.com)")
-    parser.add_argument("--username", default=None, help="Username for authentication (optional)")
-    parser.add_argument("--password", default=None, help="Password for authentication (optional)")
-    args = parser.parse_args()
+# --- Request timing and structured report (--report) ---
+
+PROBE_STEP = contextvars.ContextVar("probe_step", default=None)
+PROBE_DEVICE = contextvars.ContextVar("probe_device", default=None)
+REPORT = None  # ProbeReport when --report is given
+
+
+@contextlib.contextmanager
+def probe_step(name):
+    """Attribute every request made inside the block (and in tasks/threads it starts) to `name`."""
+    token = PROBE_STEP.set(name)
+    try:
+        yield
+    finally:
+        PROBE_STEP.reset(token)
+
+
+def mask_url(url):
+    """Path and query of a URL with any api_key value hidden, for reports."""
+    parts = urlsplit(url)
+    query = "&".join(
+        f"{key}=***" if key.lower() == "api_key" else f"{key}={value}"
+        for key, value in parse_qsl(parts.query, keep_blank_values=True))
+    return parts.path + (f"?{query}" if query else "")
+
+
+class BodyDecoder:
+    """Undoes Content-Encoding a chunk at a time; bodies in an encoding we cannot decode pass through."""
+
+    def __init__(self, encoding):
+        self.encoding = (encoding or "").strip().lower()
+        self.zlib = self.brotli = None
+        self.raw_deflate_possible = self.encoding == "deflate"
+        if self.encoding in ("gzip", "x-gzip"):
+            self.zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == "deflate":
+            self.zlib = zlib.decompressobj()
+        elif self.encoding == "br":
+            try:
+                import brotli
+            except ImportError:
+                return
+            self.brotli = brotli.Decompressor()
 
+    def decode(self, chunk):
+        if self.zlib is not None:
+            try:
+                data = self.zlib.decompress(chunk)
+            except zlib.error:
+                if not self.raw_deflate_possible:
+                    raise
+                self.zlib = zlib.decompressobj(-zlib.MAX_WBITS)  # "deflate" sent without the zlib header
+                data = self.zlib.decompress(chunk)
+            self.raw_deflate_possible = False
+            return data
+        if self.brotli is not None:
+            return self.brotli.process(chunk)
+        return chunk
+
+    def flush(self):
+        return self.zlib.flush() if self.zlib is not None else b""
+
+
+def decode_body(wire, encoding):
+    """Undo Content-Encoding; bodies in an encoding we cannot decode are returned as-is."""
+    decoder = BodyDecoder(encoding)
+    return decoder.decode(wire) + decoder.flush()
+
+
+class TimedBody:
+    """Body of a TimedAdapter response, read from the live connection and decoded as it arrives,
+    so stream=True callers see real first-byte and transfer times. Calls on_done(reusable) once,
+    when the body is exhausted (the connection can be reused) or closed early (it cannot)."""
+
+    def __init__(self, raw, on_done):
+        self.raw = raw
+        self.decoder = BodyDecoder(raw.getheader("Content-Encoding"))
+        self.on_done = on_done
+        self.wire_bytes = self.body_bytes = 0
+        self.done = False
+
+    def _finish(self, reusable):
+        if not self.done:
+            self.done = True
+            self.raw.close()  # read1() leaves a Content-Length body open at its end; the socket stays up
+            self.on_done(reusable)
+
+    def read(self, amt=None):
+        """Up to amt decoded bytes, everything left when amt is None; b"" only at the end."""
+        import http.client
+        import requests
+
+        if amt is None:
+            return b"".join(iter(partial(self.read, 1 << 16), b""))
+        while not self.done:
+            try:
+                wire = self.raw.read1(amt)
+            except (OSError, http.client.HTTPException) as e:
+                self._finish(False)
+                if isinstance(e, socket.timeout):
+                    raise requests.Timeout(e)
+                raise requests.ConnectionError(e)
+            self.wire_bytes += len(wire)
+            if not wire:
+                data = self.decoder.flush()
+                self.body_bytes += len(data)
+                self._finish(True)
+                return data
+            data = self.decoder.decode(wire)
+            self.body_bytes += len(data)
+            if data:  # a compressed chunk can decode to nothing yet
+                return data
+        return b""
+
+    def stream(self, amt=1 << 16, decode_content=True):
+        """What requests' iter_content() calls on a urllib3 body."""
+        while True:
+            chunk = self.read(amt)
+            if not chunk and self.done:
+                return
+            if chunk:
+                yield chunk
+
+    def close(self):
+        self._finish(False)
+
+
+class TimedAdapter:
+    """requests transport built on http.client that splits every request into DNS lookup, TCP
+    connect, TLS handshake, time to first byte and body transfer, and records it in a ProbeReport
+    once the body has been read or closed. Keeps up to pool_size idle keep-alive connections per
+    host. Requests that need a proxy or a client certificate go through requests' own HTTPAdapter
+    and are recorded with their total time only."""
+
+    def __init__(self, report, pool_size=4):
+        self.report = report
+        self.pool_size = pool_size
+        self.idle = {}  # (scheme, host, port) -> [connection]
+        self.lock = threading.Lock()
+        self.fallback = None
+
+    def _connect(self, scheme, host, port, timeout, verify, phases):
+        import http.client
+        import requests
+
+        start = time.perf_counter()
+        family, socktype, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+        resolved = time.perf_counter()
+        sock = socket.socket(family, socktype, proto)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # as urllib3 does
+        sock.settimeout(timeout[0])
+        sock.connect(address)
+        connected = handshaken = time.perf_counter()
+        if scheme == "https":
+            context = ssl.create_default_context(
+                cafile=verify if isinstance(verify, str) else requests.utils.DEFAULT_CA_BUNDLE_PATH)
+            if verify is False:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            sock = context.wrap_socket(sock, server_hostname=host)
+            conn = http.client.HTTPSConnection(host, port, context=context)
+            handshaken = time.perf_counter()
+        else:
+            conn = http.client.HTTPConnection(host, port)
+        sock.settimeout(timeout[1])
+        conn.sock = sock
+        phases.update(dns=resolved - start, connect=connected - resolved, tls=handshaken - connected)
+        return conn
+
+    @staticmethod
+    def _dropped(conn):
+        """True when an idle connection was closed by the server (readable with nothing requested)."""
+        import select
+
+        return conn.sock is None or bool(select.select([conn.sock], [], [], 0)[0])
+
+    def _checkout(self, key):
+        with self.lock:
+            pool = self.idle.get(key, [])
+            while pool:
+                conn = pool.pop()
+                if not self._dropped(conn):
+                    return conn
+                conn.close()
+        return None
+
+    def _release(self, key, conn, reusable):
+        if reusable:
+            with self.lock:
+                pool = self.idle.setdefault(key, [])
+                if len(pool) < self.pool_size:
+                    pool.append(conn)
+                    return
+        conn.close()
+
+    def _send_fallback(self, request, record, stream, timeout, verify, cert, proxies):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        if self.fallback is None:
+            self.fallback = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+        began = time.perf_counter()
+        try:
+            resp = self.fallback.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert,
+                                      proxies=proxies)
+        except requests.RequestException as e:
+            record.update(status=None, error=f"{type(e).__name__}: {e}",
+                          total_ms=round((time.perf_counter() - began) * 1000, 2))
+            self.report.add(record)
+            raise
+        # No per-phase split through HTTPAdapter: the phases stay None and are left out of the means.
+        record.update(dict.fromkeys(ProbeReport.PHASES[:-1]))
+        record.update(status=resp.status_code, via_fallback=True,
+                      total_ms=round((time.perf_counter() - began) * 1000, 2),
+                      content_encoding=resp.headers.get("Content-Encoding"), wire_bytes=None, body_bytes=None)
+        if not stream:
+            content = resp.content  # read first: raw.tell() counts wire bytes consumed so far
+            record.update(wire_bytes=resp.raw.tell(), body_bytes=len(content))
+        self.report.add(record)
+        resp.timing = record
+        return resp
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        import http.client
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers, select_proxy
+
+        parts = urlsplit(request.url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        record = {
+            "step": PROBE_STEP.get(), "device_id": PROBE_DEVICE.get(), "method": request.method,
+            "url": mask_url(request.url), "request_bytes": len(body or b""),
+        }
+        if cert or select_proxy(request.url, proxies or {}):
+            return self._send_fallback(request, record, stream, timeout, verify, cert, proxies)
+
+        conn = self._checkout(key)
+        for attempt in range(2):
+            phases = {"dns": 0.0, "connect": 0.0, "tls": 0.0}
+            reused = conn is not None
+            began = time.perf_counter()
+            request_sent = False
+            try:
+                if conn is None:
+                    conn = self._connect(*key, timeout, verify, phases)
+                sent = time.perf_counter()
+                conn.request(request.method, target, body=body, headers=dict(request.headers))
+                request_sent = True
+                raw = conn.getresponse()
+                first_byte = time.perf_counter()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                if conn is not None:
+                    conn.close()
+                conn = None
+                # A keep-alive connection the server closed after _checkout() looked at it: retry once
+                # on a fresh one, but never resend a request the server may already have acted on.
+                if (reused and attempt == 0 and not isinstance(e, socket.timeout)
+                        and (not request_sent or request.method in ("GET", "HEAD"))):
+                    continue
+                record.update(status=None, error=f"{type(e).__name__}: {e}",
+                              total_ms=round((time.perf_counter() - began) * 1000, 2))
+                self.report.add(record)
+                if isinstance(e, socket.timeout):
+                    raise requests.Timeout(e, request=request)
+                raise requests.ConnectionError(e, request=request)
+
+        record.update(
+            status=raw.status, reused=reused,
+            dns_ms=round(phases["dns"] * 1000, 2), connect_ms=round(phases["connect"] * 1000, 2),
+            tls_ms=round(phases["tls"] * 1000, 2), ttfb_ms=round((first_byte - sent) * 1000, 2),
+            content_encoding=raw.getheader("Content-Encoding"),
+        )
+
+        def done(reusable):
+            finished = time.perf_counter()
+            self._release(key, conn, reusable and not raw.will_close)
+            record.update(transfer_ms=round((finished - first_byte) * 1000, 2),
+                          total_ms=round((finished - began) * 1000, 2),
+                          wire_bytes=timed_body.wire_bytes, body_bytes=timed_body.body_bytes)
+            if not reusable:
+                record["closed_early"] = True
+            self.report.add(record)
+
+        timed_body = TimedBody(raw, done)
+        resp = requests.Response()
+        resp.status_code = raw.status
+        resp.reason = raw.reason
+        resp.headers = CaseInsensitiveDict(raw.getheaders())
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        resp.timing = record  # complete once the body has been read or closed
+        if stream:
+            resp.raw = timed_body
+        else:
+            resp._content = timed_body.read()
+            resp._content_consumed = True
+            resp.raw = io.BytesIO(resp._content)
+        return resp
+
+    def close(self):
+        with self.lock:
+            for pool in self.idle.values():
+                for conn in pool:
+                    conn.close()
+            self.idle.clear()
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+class ProbeReport:
+    """One record per HTTP request plus a per-step summary. A path ending in .ndjson gets one
+    JSON object per line as requests complete; any other path gets a single JSON document."""
+
+    PHASES = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "transfer_ms", "total_ms")
+
+    def __init__(self, path, run_info):
+        self.path = path
+        self.run_info = dict(run_info, started=datetime.now(timezone.utc).isoformat())
+        self.records = []
+        self.lock = threading.Lock()
+        self.stream = open(path, "w", encoding="utf-8") if path.endswith(".ndjson") else None
+        if self.stream:
+            self._write_line(dict(self.run_info, type="run"))
+
+    def _write_line(self, obj):
+        self.stream.write(json.dumps(obj) + "\n")
+        self.stream.flush()
+
+    def add(self, record):
+        record = dict(record, type="request", ts=datetime.now(timezone.utc).isoformat())
+        with self.lock:
+            self.records.append(record)
+            if self.stream:
+                self._write_line(record)
+
+    def summary(self):
+        steps = {}
+        for record in self.records:
+            steps.setdefault(record["step"] or "other", []).append(record)
+        summary = {}
+        order = {name: i for i, name in enumerate(STEP_NAMES)}
+        for step, records in sorted(steps.items(), key=lambda entry: order.get(entry[0], len(order))):
+            ok = [r for r in records if r.get("status") is not None]
+            entry = {
+                "requests": len(records),
+                "errors": sum(1 for r in records if r.get("status") is None or r["status"] >= 400),
+                "new_connections": sum(1 for r in ok if not r.get("reused")),
+                "wire_bytes": sum(r.get("wire_bytes") or 0 for r in ok),
+                "body_bytes": sum(r.get("body_bytes") or 0 for r in ok),
+            }
+            for phase in self.PHASES:
+                timed = [r[phase] for r in ok if r.get(phase) is not None]
+                entry[f"mean_{phase}"] = round(sum(timed) / len(timed), 2) if timed else None
+            entry["total"] = latency_summary([r["total_ms"] / 1000 for r in ok])
+            summary[step] = entry
+        return summary
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n=== Request timing (mean ms per request) ===")
+        print(f"  {'Step':<24}{'reqs':>6}{'new':>5}{'dns':>8}{'connect':>9}{'tls':>8}"
+              f"{'ttfb':>8}{'transfer':>10}{'total':>8}{'wire KB':>10}{'body KB':>10}")
+        for step, entry in summary.items():
+            print(f"  {step:<24}{entry['requests']:>6}{entry['new_connections']:>5}" + "".join(
+                f"{format_ms(entry[f'mean_{phase}']):>{width}}"
+                for phase, width in zip(self.PHASES, (8, 9, 8, 8, 10, 8)))
+                + f"{entry['wire_bytes'] / 1024:>10.1f}{entry['body_bytes'] / 1024:>10.1f}")
+
+    def close(self):
+        summary = self.summary()
+        finished = datetime.now(timezone.utc).isoformat()
+        if self.stream:
+            self._write_line({"type": "summary", "finished": finished, "steps": summary})
+            self.stream.close()
+        else:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"run": dict(self.run_info, finished=finished), "requests": self.records,
+                           "summary": summary}, f, indent=2)
+        print(f"\nReport written to {self.path} ({len(self.records)} requests)")
+
+
+# --- Concurrent step pipeline (--parallel) ---
+
+def make_pooled_session(pool_size):
+    """requests.Session whose keep-alive connections are shared by every step, at most pool_size
+    at once. With --report, requests go through TimedAdapter instead."""
     import requests
+    from requests.adapters import HTTPAdapter
+
     session = requests.Session()
-    base_url = args.server.rstrip("/")
+    if REPORT is not None:
+        adapter = TimedAdapter(REPORT, pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if RECORDER is not None:
+        session.hooks["response"].append(RECORDER.on_response)
+    return session
 
-    print(f"=== Jellyfin Orsay TV App Connection Test ===")
-    print(f"Server:    {base_url}")
-    print(f"Client:    {CLIENT_NAME} {APP_VERSION}")
-    print(f"DeviceId:  {DEVICE_ID}")
 
-    # Step 1: Test connection (public endpoint, no auth needed)
-    info = step1_test_connection(session, base_url)
-    if info is None:
-        print("\nConnection failed. The TV app would show an error and return to the server entry page.")
-        sys.exit(1)
+class _StepOutput:
+    """Stand-in for sys.stdout that buffers print() output per worker thread, so concurrent
+    steps do not interleave. Threads without a buffer write straight through."""
 
-    # Step 2: Check version
-    if not step2_check_version(info):
-        print("\nVersion check failed. The TV app would show: 'Please update it and restart the app'")
-        sys.exit(1)
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def build_pipeline(session, base_url, user_id, token, capabilities_current=False):
+    """Steps 4-9 as {name: (callable, dependencies)}.
+    Quick Connect (7) and Trickplay (9) only need the token. SyncPlay (8) pushes group
+    updates to this device's socket, so it waits until step 6 has finished matching frames.
+    With capabilities_current (--warm), step 4 is skipped."""
+    args = (session, base_url, user_id, token)
+    step4 = partial(step4_post_capabilities, *args)
+    if capabilities_current:
+        step4 = partial(print, "\n[Step 4] Skipped — the server session already has these capabilities (--warm).")
+    return {
+        "step4_capabilities": (step4, []),
+        "step5_websocket": (partial(step5_test_websocket, base_url, token), ["step4_capabilities"]),
+        "step6_remote_commands": (partial(step6_test_remote_commands, *args), ["step5_websocket"]),
+        "step7_quick_connect": (partial(step7_test_quick_connect, *args), []),
+        "step8_syncplay": (partial(step8_test_syncplay, *args), ["step6_remote_commands"]),
+        "step9_trickplay": (partial(step9_test_trickplay, *args), []),
+    }
+
+
+async def run_step_graph(graph, output):
+    """Start each step in a worker thread as soon as its dependencies have finished, and print
+    each step's buffered output in graph order. Returns {name: elapsed seconds}."""
+
+    def run_captured(name, fn):
+        output.local.buffer = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with probe_step(name):
+                fn()
+        except Exception as e:
+            print(f"  FAIL — {e}")
+        finally:
+            elapsed = time.perf_counter() - start
+            text = output.local.buffer.getvalue()
+            output.local.buffer = None
+        return text, elapsed
+
+    async def run(name):
+        fn, deps = graph[name]
+        await asyncio.gather(*(tasks[dep] for dep in deps))
+        return await asyncio.to_thread(run_captured, name, fn)
+
+    tasks = {name: asyncio.ensure_future(run(name)) for name in graph}
+    timings = {}
+    for name, task in tasks.items():
+        text, timings[name] = await task
+        output.stream.write(text)
+    return timings
+
+
+def run_pipeline(session, base_url, user_id, token, capabilities_current=False):
+    """Run steps 4-9 on the dependency graph instead of one after another."""
+    output = _StepOutput(sys.stdout)
+    sys.stdout = output
+    started = time.perf_counter()
+    try:
+        timings = asyncio.run(run_step_graph(build_pipeline(session, base_url, user_id, token, capabilities_current),
+                                             output))
+    finally:
+        sys.stdout = output.stream
+    wall = time.perf_counter() - started
+
+    print(f"\n[Pipeline] Steps 4-9 finished in {wall:.2f}s "
+          f"(sequential would take ~{sum(timings.values()):.2f}s)")
+    print("  " + ", ".join(f"{name}={elapsed:.2f}s" for name, elapsed in timings.items()))
+
+
+# --- Statistics helpers ---
+
+def percentile(values, pct):
+    """Nearest-rank percentile (0-100) of a list of numbers; None when the list is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds):
+    """count/p50/p95/p99/max of a list of durations in seconds, reported in milliseconds."""
+    summary = {"count": len(seconds)}
+    for name, pct in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100)):
+        value = percentile(seconds, pct)
+        summary[name] = None if value is None else round(value * 1000, 1)
+    return summary
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_latency_header(title, indent="  "):
+    print(f"{indent}{title:<44}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+
+
+def print_latency_row(label, seconds, indent="  "):
+    """One `label count p50 p95 p99 max` row under print_latency_header()."""
+    summary = latency_summary(seconds)
+    print(f"{indent}{label:<44}{summary['count']:>7}" + "".join(
+        f"{format_ms(summary[key]):>9}" for key in ("p50", "p95", "p99", "max")))
+
+
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def print_histogram(seconds, indent="  ", width=40):
+    """ASCII histogram of durations over HISTOGRAM_BUCKETS_MS, trimmed to the occupied range."""
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for value in seconds:
+        counts[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, value * 1000)] += 1
+    labels = [f"<={bound}ms" for bound in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+    occupied = [i for i, count in enumerate(counts) if count]
+    if not occupied:
+        return
+    peak = max(counts)
+    for i in range(occupied[0], occupied[-1] + 1):
+        print(f"{indent}{labels[i]:>9} {counts[i]:>7}  {'#' * math.ceil(width * counts[i] / peak)}")
+
+
+# --- Remote command delivery benchmark (--command-bench) ---
+
+# Seek positions carry the correlation tag; offset so they never collide with a real position.
+BENCH_SEEK_BASE = 10_000_000_000
+
+
+def build_bench_command(session_id, tag):
+    """A remote command whose socket message carries `tag` back, so each frame can be matched
+    to the REST call that produced it. Returns (kind, url_path, body_or_none)."""
+    kind = tag % 3
+    if kind == 0:
+        return ("Playstate: Seek",
+                f"/emby/Sessions/{session_id}/Playing/Seek?seekPositionTicks={BENCH_SEEK_BASE + tag}", None)
+    if kind == 1:
+        return ("GeneralCommand: DisplayContent",
+                f"/emby/Sessions/{session_id}/Command/DisplayContent?ItemId=bench-{tag}&ItemName=Bench&ItemType=Movie",
+                None)
+    return ("GeneralCommand: DisplayMessage", f"/emby/Sessions/{session_id}/Command",
+            {"Name": "DisplayMessage", "Arguments": {"Header": "Benchmark", "Text": f"bench-{tag}", "TimeoutMs": "1000"}})
+
+
+def command_bench_tag(message):
+    """Correlation tag carried by a socket message from build_bench_command(), or None."""
+    data = message.get("Data") or {}
+    if message.get("MessageType") == "Playstate" and data.get("Command") == "Seek":
+        tag = int(data.get("SeekPositionTicks") or 0) - BENCH_SEEK_BASE
+        return tag if tag >= 0 else None
+    if message.get("MessageType") == "GeneralCommand":
+        arguments = data.get("Arguments") or {}
+        for key in ("ItemId", "Text"):
+            value = str(arguments.get(key, ""))
+            if value.startswith("bench-") and value[6:].isdigit():
+                return int(value[6:])
+    return None
+
+
+async def command_bench(http_session, base_url, headers, ws, session_id, count, concurrency, rate, timeout=3):
+    """Send `count` commands (closed loop with `concurrency` in flight, or open loop at `rate`/s)
+    while a reader task timestamps every matching socket frame."""
+    sent = {}      # tag -> (kind, start time)
+    arrived = {}   # tag -> arrival time
+    rest_times = []
+    rest_errors = []
+
+    async def reader():
+        async for frame in ws:
+            now = time.perf_counter()
+            tag = command_bench_tag(json.loads(frame))
+            if tag is not None:
+                arrived.setdefault(tag, now)
+
+    async def send(tag, start):
+        kind, path, body = build_bench_command(session_id, tag)
+        sent[tag] = (kind, start)
+        try:
+            resp = await asyncio.to_thread(
+                http_session.post, base_url + path, data=json.dumps(body) if body else None,
+                headers=headers, timeout=5)
+            status = resp.status_code
+        except Exception as e:
+            status = type(e).__name__
+        rest_times.append(time.perf_counter() - start)
+        if status not in (200, 204):
+            rest_errors.append(f"{kind}: {status}")
+            del sent[tag]
+
+    reader_task = asyncio.ensure_future(reader())
+    started = time.perf_counter()
+    if rate:
+        # Open loop: latency counts from the scheduled send time, so client-side queueing
+        # behind slow responses shows up in the numbers instead of hiding it.
+        tasks = []
+        for tag in range(count):
+            scheduled = started + tag / rate
+            await asyncio.sleep(max(0, scheduled - time.perf_counter()))
+            tasks.append(asyncio.ensure_future(send(tag, scheduled)))
+        await asyncio.gather(*tasks)
+    else:
+        tags = iter(range(count))
+
+        async def worker():
+            for tag in tags:
+                await send(tag, time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    send_wall = time.perf_counter() - started
+
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and not all(tag in arrived for tag in sent):
+        await asyncio.sleep(0.02)
+    reader_task.cancel()
+
+    delivery = {}
+    for tag, (kind, start) in sent.items():
+        if tag in arrived:
+            delivery.setdefault(kind, []).append(arrived[tag] - start)
+    return delivery, rest_times, rest_errors, len(sent), send_wall
+
+
+def run_command_bench(base_url, user_id, token, count, concurrency, rate):
+    """Benchmark REST→WebSocket command delivery to this device's RemoteControl socket."""
+    try:
+        import websockets
+    except ImportError:
+        print(f"\n[Command bench] SKIPPED (install websockets: pip3 install websockets)")
+        return
+
+    http_session = make_pooled_session(concurrency)
+    session_id = find_session_id(http_session, base_url, user_id, token)
+    if not session_id:
+        print(f"\n[Command bench] FAIL — Could not find session ID for this device.")
+        return
+
+    mode = f"{rate:g} commands/s (open loop)" if rate else f"{concurrency} in flight (closed loop)"
+    print(f"\n[Command bench] {count} commands, {mode} (Session: {session_id})")
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+        async with websockets.connect(socket_url(base_url, token), close_timeout=5, **socket_options()) as ws:
+            try:
+                while True:  # drain ForceKeepAlive etc.
+                    await asyncio.wait_for(ws.recv(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+            return await command_bench(http_session, base_url, make_headers(user_id, token), ws,
+                                       session_id, count, concurrency, rate)
+
+    with probe_step("command_bench"):
+        delivery, rest_times, rest_errors, accepted, send_wall = asyncio.run(run())
+    all_delivery = [value for values in delivery.values() for value in values]
+    lost = accepted - len(all_delivery)
+
+    print(f"  Sent {count} in {send_wall:.2f}s ({count / send_wall:.1f}/s): "
+          f"{len(all_delivery)} delivered, {lost} lost (no socket message in 3s), {len(rest_errors)} REST errors")
+    for error in rest_errors[:5]:
+        print(f"    REST error — {error}")
+
+    print()
+    print_latency_header("Latency (ms)")
+    print_latency_row("REST round trip", rest_times)
+    for kind in sorted(delivery):
+        print_latency_row(f"REST→socket {kind}", delivery[kind])
+    print_latency_row("REST→socket (all)", all_delivery)
+
+    if all_delivery:
+        print(f"\n  REST→socket delivery histogram:")
+        print_histogram(all_delivery, indent="    ")
+
+
+# --- Streaming library crawl (--crawl) ---
+
+class ItemStreamParser:
+    """Incremental parser for Jellyfin `{"Items": [...], "TotalRecordCount": N}` bodies. feed()
+    returns each item as soon as its closing brace arrives, so only the item being parsed is held
+    in memory however large the page is."""
+
+    ITEMS_KEY = re.compile(rb'"Items"\s*:\s*\[')
+    STRUCTURE = re.compile(rb'[{}\[\]"]')
+    STRING_END = re.compile(rb'["\\]')
+
+    def __init__(self):
+        self.state = "head"  # head -> items -> tail
+        self.head = b""
+        self.tail = b""
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item = bytearray()
+
+    def feed(self, chunk):
+        if self.state == "head":
+            self.head += chunk
+            match = self.ITEMS_KEY.search(self.head)
+            if not match:
+                return []
+            chunk, self.head = self.head[match.end():], self.head[:match.start()]
+            self.state = "items"
+        if self.state == "tail":
+            self.tail += chunk
+            return []
+
+        items = []
+        start = 0 if self.depth else None  # where the current item begins in this chunk
+        pos = 0
+        if self.escaped:
+            pos, self.escaped = 1, False
+        while True:
+            if self.in_string:
+                match = self.STRING_END.search(chunk, pos)
+                if not match:
+                    break
+                pos = match.end()
+                if match.group() == b"\\":
+                    pos += 1  # skip the escaped character, which may be in the next chunk
+                    if pos > len(chunk):
+                        self.escaped = True
+                else:
+                    self.in_string = False
+                continue
+            match = self.STRUCTURE.search(chunk, pos)
+            if not match:
+                break
+            token, pos = match.group(), match.end()
+            if token == b'"':
+                self.in_string = True
+            elif token in (b"{", b"["):
+                if self.depth == 0:
+                    start = match.start()
+                self.depth += 1
+            elif self.depth == 0:  # the "]" closing the Items array
+                self.state = "tail"
+                self.tail = chunk[pos:]
+                return items
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.item += chunk[start:pos]
+                    items.append(json.loads(self.item))
+                    self.item = bytearray()
+                    start = None
+        if start is not None:
+            self.item += chunk[start:]
+        return items
+
+    def total_record_count(self):
+        match = re.search(rb'"TotalRecordCount"\s*:\s*(\d+)', self.head + self.tail)
+        return int(match.group(1)) if match else None
+
+
+def crawl_page_url(base_url, user_id, types, fields, start, limit):
+    """Library listing URL in the shape GuiDisplay_Series pages through: Server.getItemTypeURL()
+    plus "&Limit=<ItemPaging>&StartIndex=<loaded so far>"."""
+    return (f"{base_url}/emby/Users/{user_id}/Items?format=json&SortBy=SortName&SortOrder=Ascending"
+            f"&IncludeItemTypes={types}&Recursive=true&ExcludeLocationTypes=Virtual&fields={fields}"
+            f"&Limit={limit}&StartIndex={start}")
+
+
+def fetch_page_streaming(http_session, url, headers, on_item=None):
+    """GET one page and parse it while it downloads. Returns counters, not the items; on_item, if
+    given, is called with each item as it is parsed."""
+    parser = ItemStreamParser()
+    started = time.perf_counter()
+    first_item = None
+    count = 0
+    body_bytes = 0
+    with http_session.get(url, headers=headers, timeout=60, stream=True) as resp:
+        if resp.status_code != 200:
+            raise ProbeError(f"HTTP {resp.status_code} from {urlsplit(url).path}")
+        for chunk in resp.iter_content(chunk_size=64 * 1024):
+            body_bytes += len(chunk)
+            for item in parser.feed(chunk):
+                if first_item is None:
+                    first_item = time.perf_counter() - started
+                count += 1
+                if on_item is not None:
+                    on_item(item)
+        timing = getattr(resp, "timing", None)  # TimedAdapter (--report) counts the wire bytes itself
+        if timing and timing.get("wire_bytes") is not None:
+            wire_bytes = timing["wire_bytes"]
+        else:
+            wire_bytes = resp.raw.tell() if hasattr(resp.raw, "tell") else body_bytes
+    return {
+        "items": count,
+        "total": parser.total_record_count(),
+        "body_bytes": body_bytes,
+        "wire_bytes": wire_bytes or body_bytes,
+        "first_item": first_item,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def crawl_library(http_session, base_url, user_id, headers, page_size, parallel, types, fields, on_item=None):
+    """Fetch every page: page 0 first for TotalRecordCount, then the rest `parallel` at a time."""
+    first = fetch_page_streaming(http_session, crawl_page_url(base_url, user_id, types, fields, 0, page_size), headers,
+                                 on_item)
+    total = first["total"] if first["total"] is not None else first["items"]
+    starts = range(page_size, total, page_size)
+    pages = [first]
+    errors = []
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = [pool.submit(fetch_page_streaming, http_session,
+                               crawl_page_url(base_url, user_id, types, fields, start, page_size), headers, on_item)
+                   for start in starts]
+        for future in futures:
+            try:
+                pages.append(future.result())
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+    return total, pages, errors
+
+
+def run_crawl(base_url, user_id, token, page_sizes, parallel, types, fields):
+    """Crawl the whole library once per page size and compare."""
+    http_session = make_pooled_session(parallel)
+    headers = make_headers(user_id, token)
+
+    print(f"\n[Crawl] Full library crawl: types={types}, {parallel} pages in flight, page sizes {page_sizes}")
+    results = []
+    for page_size in page_sizes:
+        started = time.perf_counter()
+        with probe_step(f"crawl_{page_size}"):
+            total, pages, errors = crawl_library(http_session, base_url, user_id, headers,
+                                                 page_size, parallel, types, fields)
+        wall = time.perf_counter() - started
+        items = sum(p["items"] for p in pages)
+        body = sum(p["body_bytes"] for p in pages)
+        wire = sum(p["wire_bytes"] for p in pages)
+        results.append((page_size, total, items, len(pages), len(errors), wall, body, wire, pages))
+        print(f"  Page size {page_size}: {items}/{total} items in {len(pages)} pages, {wall:.2f}s"
+              + (f", {len(errors)} failed pages (first: {errors[0]})" if errors else ""))
+
+    print(f"\n  {'page':>6}{'pages':>7}{'items/s':>10}{'bytes/item':>12}{'wire/item':>11}"
+          f"{'page p50':>10}{'page p95':>10}{'1st item p50':>14}  (ms)")
+    for page_size, total, items, page_count, error_count, wall, body, wire, pages in results:
+        page_times = latency_summary([p["elapsed"] for p in pages])
+        first_times = latency_summary([p["first_item"] for p in pages if p["first_item"] is not None])
+        print(f"  {page_size:>6}{page_count:>7}{items / wall:>10.0f}{body / max(items, 1):>12.0f}"
+              f"{wire / max(items, 1):>11.0f}{format_ms(page_times['p50']):>10}"
+              f"{format_ms(page_times['p95']):>10}{format_ms(first_times['p50']):>14}")
+    rss = peak_rss_mb()
+    if rss is not None:
+        print(f"\n  Peak client RSS: {rss:.1f} MB (pages are parsed item by item, never held whole)")
+
+
+# --- Artwork fetch benchmark (--images) ---
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "jellyfin-orsay-probe")
+
+# Image type -> (maxwidth, maxheight) sizes the TV requests (Main.js poster/backdrop sizes and
+# the fixed sizes passed to Server.getImageURL across the Gui pages).
+TV_IMAGE_SIZES = {
+    "Primary": [(473, 267), (180, 270), (235, 350), (224, 224)],
+    "Backdrop": [(1920, 1080), (473, 267)],
+    "Thumb": [(473, 267), (200, 92)],
+    "Logo": [(820, 110), (600, 80)],
+    "Banner": [(473, 267)],
+}
+
+
+def image_url_path(item_id, image_type, max_width, max_height):
+    """Same query string as Server.getImageURL()."""
+    return f"/Items/{item_id}/Images/{image_type}/0?maxwidth={max_width}&maxheight={max_height}&quality=90"
+
+
+class ArtworkCache:
+    """Content-addressed on-disk image cache with size-bounded LRU eviction.
+    Blobs are stored once per SHA-256 of their bytes; an index maps each request key (URL plus
+    image tag, so replaced artwork misses) to its blob, in least- to most-recently-used order."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> sha256
+        self.blob_sizes = {}          # sha256 -> bytes
+        self.refs = {}                # sha256 -> number of keys using it
+        self.size = 0                 # bytes of all blobs
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {"entries": [], "blobs": {}}
+        for key, digest in saved["entries"]:
+            if os.path.exists(self._blob_path(digest)):
+                self._link(key, digest, saved["blobs"][digest])
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _link(self, key, digest, size):
+        self.entries[key] = digest
+        if digest not in self.blob_sizes:
+            self.blob_sizes[digest] = size
+            self.size += size
+        self.refs[digest] = self.refs.get(digest, 0) + 1
+
+    def _unlink(self, key):
+        digest = self.entries.pop(key)
+        self.refs[digest] -= 1
+        if not self.refs[digest]:
+            del self.refs[digest]
+            self.size -= self.blob_sizes.pop(digest)
+            with contextlib.suppress(OSError):
+                os.remove(self._blob_path(digest))
+
+    def get(self, key):
+        with self.lock:
+            digest = self.entries.get(key)
+            if digest is None:
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            with self.lock:
+                if self.entries.get(key) == digest:
+                    self._unlink(key)
+            return None
+
+    def put(self, key, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)
+        evicted = 0
+        with self.lock:
+            if key in self.entries:
+                self._unlink(key)
+            self._link(key, digest, len(data))
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                self._unlink(next(iter(self.entries)))
+                evicted += 1
+        return evicted
+
+    def save(self):
+        with self.lock:
+            saved = {"entries": list(self.entries.items()), "blobs": self.blob_sizes}
+        temp = self.index_path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        os.replace(temp, self.index_path)
+
+
+def image_requests_for(items):
+    """(item_id, image_type, width, height, tag) for every image a TV screen could ask for."""
+    for item in items:
+        tags = dict(item.get("ImageTags") or {})
+        if item.get("BackdropImageTags"):
+            tags["Backdrop"] = item["BackdropImageTags"][0]
+        for image_type, sizes in TV_IMAGE_SIZES.items():
+            if image_type in tags:
+                for width, height in sizes:
+                    yield item["Id"], image_type, width, height, tags[image_type]
+
+
+def fetch_image(http_session, base_url, headers, cache, request):
+    """One image through the cache. Returns (image_type, size label, hit, bytes, ttfb, total, evicted)."""
+    item_id, image_type, width, height, tag = request
+    path = image_url_path(item_id, image_type, width, height)
+    key = f"{path}&tag={tag}"
+    size_label = f"{image_type} {width}x{height}"
+    started = time.perf_counter()
+    data = cache.get(key)
+    if data is not None:
+        return image_type, size_label, True, len(data), None, time.perf_counter() - started, 0
+    resp = http_session.get(base_url + "/emby" + path, headers=headers, timeout=30)
+    if resp.status_code != 200:
+        raise ProbeError(f"HTTP {resp.status_code} for {size_label}")
+    evicted = cache.put(key, resp.content)
+    # resp.elapsed stops when the headers arrive: for a cache miss that is mostly the server's resize.
+    return (image_type, size_label, False, len(resp.content), resp.elapsed.total_seconds(),
+            time.perf_counter() - started, evicted)
 
-    # Step 3+: Authentication (optional)
-    if args.username:
-        password = args.password or ""
-        user_id, token = step3_authenticate(session, base_url, args.username, password)
-        if not token:
-            print("\nAuthentication failed. The TV app would return to the user selection page.")
-            sys.exit(1)
 
-        # Step 4: Post capabilities
-        step4_post_capabilities(session, base_url, user_id, token)
+def run_image_bench(base_url, user_id, token, item_count, workers, passes, cache_dir, cache_mb):
+    """Fetch artwork for a page of items through a worker pool and an on-disk LRU cache."""
+    http_session = make_pooled_session(workers)
+    headers = make_headers(user_id, token)
+    cache = ArtworkCache(cache_dir, cache_mb * 1024 * 1024)
+
+    items_url = (f"{base_url}/emby/Users/{user_id}/Items?format=json&IncludeItemTypes=Movie,Series,Episode"
+                 f"&Recursive=true&SortBy=SortName&Limit={item_count}")
+    with probe_step("images"):
+        resp = http_session.get(items_url, headers=headers, timeout=30)
+    if resp.status_code != 200:
+        print(f"\n[Images] FAIL — Could not fetch items: HTTP {resp.status_code}")
+        return
+    image_requests = list(image_requests_for(resp.json().get("Items", [])))
+
+    print(f"\n[Images] {len(image_requests)} images for {item_count} items, {workers} workers, "
+          f"cache {cache_dir} ({cache.size / 1048576:.1f}/{cache_mb} MB used)")
+
+    for run in range(1, passes + 1):
+        results, errors = [], []
+        started = time.perf_counter()
+        with probe_step(f"images_pass{run}"), ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(fetch_image, http_session, base_url, headers, cache, request)
+                           for request in image_requests]:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+        wall = time.perf_counter() - started
+        cache.save()
+
+        hits = sum(1 for r in results if r[2])
+        downloaded = sum(r[3] for r in results if not r[2])
+        print(f"\n  Pass {run}: {len(results)} images in {wall:.2f}s ({len(results) / wall:.0f}/s), "
+              f"hit ratio {hits / max(len(results), 1):.1%}, downloaded {downloaded / 1048576:.1f} MB "
+              f"({downloaded / 1048576 / wall:.1f} MB/s), evicted {sum(r[6] for r in results)}, errors {len(errors)}")
+        for error in errors[:3]:
+            print(f"    {error}")
+        misses = [r for r in results if not r[2]]
+        if misses:
+            print_latency_header("Server resize latency, misses (ms)", indent="    ")
+            by_size = {}
+            for r in misses:
+                by_size.setdefault(r[1], []).append(r[4])
+            for label in sorted(by_size):
+                print_latency_row(label, by_size[label], indent="    ")
+        if hits:
+            print_latency_row("Cache hit read", [r[5] for r in results if r[2]], indent="    ")
+
+
+# --- Trickplay seek simulation (--trickplay-seek) ---
+
+def select_trickplay(item):
+    """Mirror Trickplay.load(): first media source, smallest width. Returns metadata or None."""
+    sources = item.get("Trickplay") or {}
+    if not sources:
+        return None
+    widths = next(iter(sources.values()))
+    if not widths:
+        return None
+    width = min(widths, key=int)
+    meta = widths[width]
+    if not meta.get("ThumbnailCount"):
+        return None  # nothing to seek through
+    return {
+        "item_id": item["Id"],
+        "name": item.get("Name", "Unknown"),
+        "width": meta.get("Width") or int(width),
+        "height": meta.get("Height") or 0,
+        "tile_width": meta.get("TileWidth") or 1,
+        "tile_height": meta.get("TileHeight") or 1,
+        "interval": meta.get("Interval") or 10000,
+        "count": meta["ThumbnailCount"],
+    }
+
+
+def sprite_index(trickplay, position_ms):
+    """Sprite sheet holding the thumbnail for a position, as in Trickplay.getThumbnailInfo()."""
+    thumb = min(max(int(position_ms // trickplay["interval"]), 0), trickplay["count"] - 1)
+    return thumb // (trickplay["tile_width"] * trickplay["tile_height"])
+
+
+def seek_positions(trickplay, pattern, seeks, step_ms, rng):
+    """Positions a user scrubbing through the item visits, in ms."""
+    duration = trickplay["count"] * trickplay["interval"]
+    if pattern == "random":
+        return [rng.randrange(duration) for _ in range(seeks)]
+    return [(i * step_ms) % duration for i in range(1, seeks + 1)]
+
+
+def read_throttled(resp, kbps):
+    """Read a streamed body no faster than kbps (0 = unthrottled), like a TV on a slow link."""
+    chunks = []
+    started = time.perf_counter()
+    received = 0
+    for chunk in resp.iter_content(chunk_size=16 * 1024):
+        chunks.append(chunk)
+        received += len(chunk)
+        if kbps:
+            ahead = received * 8 / (kbps * 1000) - (time.perf_counter() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+    return b"".join(chunks)
+
+
+class SpriteCache:
+    """In-memory LRU of trickplay sprite sheets with background prefetch of the sheets ahead."""
+
+    def __init__(self, fetch, capacity, pool):
+        self.fetch = fetch
+        self.capacity = capacity
+        self.pool = pool
+        self.sheets = OrderedDict()  # index -> bytes
+        self.pending = {}            # index -> Future
+        self.shown = set()
+        self.prefetched = set()
+        self.bytes = 0
+
+    def _store(self, index, data):
+        self.sheets[index] = data
+        self.sheets.move_to_end(index)
+        self.bytes += len(data)
+        while len(self.sheets) > self.capacity:
+            self.sheets.popitem(last=False)
+
+    def _collect(self):
+        for index, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[index]
+                with contextlib.suppress(Exception):
+                    self._store(index, future.result())
+
+    def get(self, index):
+        """Returns (outcome, data): "hit" if cached, "inflight" if a prefetch was still running, "miss"
+        if fetched now, or "failed" (data None) when the sheet could not be fetched."""
+        self._collect()
+        self.shown.add(index)
+        if index in self.sheets:
+            self.sheets.move_to_end(index)
+            return "hit", self.sheets[index]
+        try:
+            if index in self.pending:
+                data = self.pending.pop(index).result()
+                outcome = "inflight"
+            else:
+                data = self.fetch(index)
+                outcome = "miss"
+        except Exception:
+            return "failed", None  # the TV shows no thumbnail; the next seek tries again
+        self._store(index, data)
+        return outcome, data
+
+    def prefetch(self, indexes):
+        for index in indexes:
+            if index not in self.sheets and index not in self.pending:
+                self.prefetched.add(index)
+                self.pending[index] = self.pool.submit(self.fetch, index)
+
+    def wasted(self):
+        """Prefetched sheets the user never looked at."""
+        return len(self.prefetched - self.shown)
+
+
+def simulate_scrub(http_session, base_url, headers, token, trickplay, positions, prefetch, cache_sheets,
+                   dwell, kbps):
+    sheet_count = math.ceil(trickplay["count"] / (trickplay["tile_width"] * trickplay["tile_height"]))
+
+    def fetch(index):
+        url = (f"{base_url}/emby/Videos/{trickplay['item_id']}/Trickplay/{trickplay['width']}/{index}.jpg"
+               f"?api_key={token}")
+        with http_session.get(url, headers=headers, timeout=30, stream=True) as resp:
+            if resp.status_code != 200:
+                raise ProbeError(f"HTTP {resp.status_code} for sprite {index}")
+            return read_throttled(resp, kbps)
+
+    seeks = []  # (outcome, seconds)
+    previous = 0
+    with ThreadPoolExecutor(max_workers=max(prefetch, 1)) as pool:
+        cache = SpriteCache(fetch, cache_sheets, pool)
+        for position in positions:
+            index = sprite_index(trickplay, position)
+            started = time.perf_counter()
+            outcome, _ = cache.get(index)
+            seeks.append((outcome, time.perf_counter() - started))
+            direction = 1 if position >= previous else -1
+            previous = position
+            cache.prefetch(i for i in (index + direction * k for k in range(1, prefetch + 1)) if 0 <= i < sheet_count)
+            time.sleep(dwell)
+        for future in cache.pending.values():
+            with contextlib.suppress(Exception):
+                future.result()
+        cache._collect()
+    return seeks, cache
+
+
+def run_trickplay_seek(base_url, user_id, token, prefetch_windows, seeks, pattern, step, dwell, cache_sheets, kbps):
+    http_session = make_pooled_session(max(prefetch_windows) + 1)
+    headers = make_headers(user_id, token)
+    items_url = (f"{base_url}/emby/Users/{user_id}/Items?format=json&IncludeItemTypes=Movie,Episode"
+                 f"&Recursive=true&Limit=50&Fields=Trickplay")
+    with probe_step("trickplay_seek"):
+        resp = http_session.get(items_url, headers=headers, timeout=10)
+    if resp.status_code != 200:
+        print(f"\n[Trickplay seek] FAIL — Could not fetch items: HTTP {resp.status_code}")
+        return
+    trickplay = next(filter(None, map(select_trickplay, resp.json().get("Items", []))), None)
+    if trickplay is None:
+        print(f"\n[Trickplay seek] SKIP — No trickplay data in the first 50 video items.")
+        return
+
+    tiles = trickplay["tile_width"] * trickplay["tile_height"]
+    print(f"\n[Trickplay seek] '{trickplay['name']}': {trickplay['width']}x{trickplay['height']}, "
+          f"tiles={trickplay['tile_width']}x{trickplay['tile_height']}, interval={trickplay['interval']}ms, "
+          f"{trickplay['count']} thumbnails in {math.ceil(trickplay['count'] / tiles)} sheets")
+    print(f"  {seeks} {pattern} seeks, step {step:g}s, dwell {dwell * 1000:.0f}ms, cache {cache_sheets} sheets"
+          + (f", link {kbps:g} kbps" if kbps else ""))
+
+    positions = seek_positions(trickplay, pattern, seeks, step * 1000, random.Random(1))
+    print(f"\n  {'prefetch':>8}{'hit':>7}{'inflight':>9}{'miss':>6}{'failed':>8}{'hit%':>7}{'seek p50':>10}{'p95':>9}"
+          f"{'p99':>9}{'max':>9}{'MB':>8}{'wasted':>8}  (ms)")
+    for window in prefetch_windows:
+        with probe_step(f"trickplay_prefetch{window}"):
+            results, cache = simulate_scrub(http_session, base_url, headers, token, trickplay, positions,
+                                            window, cache_sheets, dwell, kbps)
+        counts = {outcome: sum(1 for o, _ in results if o == outcome)
+                  for outcome in ("hit", "inflight", "miss", "failed")}
+        summary = latency_summary([seconds for outcome, seconds in results if outcome != "failed"])
+        print(f"  {window:>8}{counts['hit']:>7}{counts['inflight']:>9}{counts['miss']:>6}{counts['failed']:>8}"
+              f"{100 * counts['hit'] / len(results) if results else 0:>6.1f}%"
+              f"{format_ms(summary['p50']):>10}{format_ms(summary['p95']):>9}{format_ms(summary['p99']):>9}"
+              f"{format_ms(summary['max']):>9}{cache.bytes / 1048576:>8.1f}{cache.wasted():>8}")
+
+
+# --- HLS transcode probe (--playback) ---
+
+# Server.getStreamUrl() parameters, requested as HLS (master.m3u8) rather than a single Stream.ts
+HLS_STREAM_PARAMS = ("VideoCodec=h264&Profile=high&Level=41&MaxVideoBitDepth=8&MaxWidth=1920&VideoBitrate={bitrate}"
+                     "&AudioCodec=aac&audioBitrate=360000&MaxAudioChannels=6")
+
+
+def hls_master_url(base_url, item_id, media_source_id, token, device_id, play_session_id, bitrate):
+    return (f"{base_url}/emby/Videos/{item_id}/master.m3u8?{HLS_STREAM_PARAMS.format(bitrate=bitrate)}"
+            f"&MediaSourceId={media_source_id}&PlaySessionId={play_session_id}&api_key={token}&DeviceId={device_id}")
+
+
+def parse_m3u8(text, playlist_url):
+    """Returns (variants, segments): variant playlist URLs of a master playlist and
+    (duration, url) pairs of a media playlist, resolved against playlist_url."""
+    variants, segments = [], []
+    pending_variant, duration = False, None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF"):
+            pending_variant = True
+        elif line.startswith("#EXTINF:"):
+            duration = float(line[8:].split(",", 1)[0])
+        elif line and not line.startswith("#"):
+            url = urljoin(playlist_url, line)
+            if pending_variant:
+                variants.append(url)
+            elif duration is not None:
+                segments.append((duration, url))
+            pending_variant, duration = False, None
+    return variants, segments
+
+
+def stream_segment(http_session, url, headers):
+    """Download a segment in 64 KB chunks without keeping it. Returns (bytes, first byte, total) in seconds."""
+    started = time.perf_counter()
+    with http_session.get(url, headers=headers, timeout=120, stream=True) as resp:
+        if resp.status_code != 200:
+            raise ProbeError(f"HTTP {resp.status_code} for segment {url.rsplit('/', 1)[-1].split('?')[0]}")
+        first_byte = None
+        received = 0
+        for chunk in resp.iter_content(chunk_size=64 * 1024):
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            received += len(chunk)
+    return received, first_byte or 0.0, time.perf_counter() - started
+
+
+def playout_stalls(durations, arrivals):
+    """Rebuffering a player would see if it started playing as soon as the first segment arrived.
+    arrivals are seconds since the first segment arrived. Returns (stall count, stall seconds)."""
+    stalls, stalled = 0, 0.0
+    needed = 0.0
+    for duration, arrival in zip(durations, arrivals):
+        if arrival > needed + stalled:
+            stalls += 1
+            stalled = arrival - needed
+        needed += duration
+    return stalls, stalled
+
+
+def stop_transcode(http_session, base_url, headers, device_id, play_session_id):
+    """Server.stopHLSTranscode(): POST /Videos/ActiveEncodings; newer servers only accept DELETE."""
+    url = f"{base_url}/emby/Videos/ActiveEncodings?DeviceId={device_id}&PlaySessionId={play_session_id}"
+    resp = http_session.post(url, headers=headers, timeout=10)
+    if resp.status_code in (404, 405):
+        resp = http_session.delete(url, headers=headers, timeout=10)
+    return resp.status_code
+
+
+def play_hls(http_session, base_url, user_id, token, item, segment_limit, bitrate, stream_number):
+    """Start one transcode and pull its segments back to back. Returns a result dict."""
+    device_id = f"{DEVICE_ID}-hls{stream_number}"
+    play_session_id = uuid.uuid4().hex
+    PROBE_DEVICE.set(device_id)
+    headers = make_headers(user_id, token, device_id)
+    sources = item.get("MediaSources") or [{}]
+    master_url = hls_master_url(base_url, item["Id"], sources[0].get("Id", item["Id"]), token, device_id,
+                                play_session_id, bitrate)
+    result = {"name": item.get("Name", "Unknown"), "segments": [], "bytes": 0, "error": None}
+    started = time.perf_counter()
+    try:
+        resp = http_session.get(master_url, headers=headers, timeout=60)
+        if resp.status_code != 200:
+            raise ProbeError(f"HTTP {resp.status_code} for master.m3u8")
+        result["master"] = time.perf_counter() - started
+        variants, _ = parse_m3u8(resp.text, master_url)
+        if not variants:
+            raise ProbeError("master.m3u8 lists no variant playlists")
+
+        playlist_started = time.perf_counter()
+        resp = http_session.get(variants[0], headers=headers, timeout=60)
+        if resp.status_code != 200:
+            raise ProbeError(f"HTTP {resp.status_code} for media playlist")
+        result["playlist"] = time.perf_counter() - playlist_started
+        _, segments = parse_m3u8(resp.text, variants[0])
+        if not segments:
+            raise ProbeError("media playlist lists no segments")
+
+        first_arrival = None
+        for duration, url in segments[:segment_limit]:
+            received, first_byte, total = stream_segment(http_session, url, headers)
+            arrival = time.perf_counter() - started
+            if first_arrival is None:
+                first_arrival = arrival
+                result["startup"] = arrival
+                result["first_byte"] = arrival - total + first_byte
+            result["segments"].append((duration, total, arrival - first_arrival))
+            result["bytes"] += received
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["wall"] = time.perf_counter() - started
+        with contextlib.suppress(Exception):
+            result["stop_status"] = stop_transcode(http_session, base_url, headers, device_id, play_session_id)
+    return result
+
+
+def run_playback(base_url, user_id, token, streams, segment_limit, bitrate):
+    """Run `streams` HLS transcodes at once and report startup, segment timing and realtime headroom."""
+    http_session = make_pooled_session(streams + 1)
+    headers = make_headers(user_id, token)
+    items_url = (f"{base_url}/emby/Users/{user_id}/Items?format=json&IncludeItemTypes=Movie,Episode"
+                 f"&Recursive=true&SortBy=SortName&Limit={streams}&Fields=MediaSources")
+    with probe_step("playback"):
+        resp = http_session.get(items_url, headers=headers, timeout=10)
+    if resp.status_code != 200:
+        print(f"\n[Playback] FAIL — Could not fetch items: HTTP {resp.status_code}")
+        return
+    items = resp.json().get("Items", [])
+    if not items:
+        print(f"\n[Playback] SKIP — No video items in the library.")
+        return
+    items = [items[i % len(items)] for i in range(streams)]
+
+    print(f"\n[Playback] {streams} concurrent HLS transcode(s), h264 @ {bitrate / 1e6:g} Mbps, "
+          f"up to {segment_limit} segments each")
+    with probe_step("playback_hls"), ThreadPoolExecutor(max_workers=streams) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, play_hls, http_session, base_url, user_id, token,
+                               item, segment_limit, bitrate, number)
+                   for number, item in enumerate(items, 1)]
+        results = [future.result() for future in futures]
+
+    print(f"\n  {'#':>3}  {'item':<24}{'startup':>9}{'segs':>6}{'fetch/dur':>11}{'realtime':>10}"
+          f"{'Mbps':>8}{'stalls':>8}{'stop':>6}")
+    kept_up = 0
+    for number, result in enumerate(results, 1):
+        segments = result["segments"]
+        media = sum(duration for duration, _, _ in segments)
+        fetching = sum(total for _, total, _ in segments)
+        # Realtime factor: media seconds delivered per wall second once the first segment was in.
+        steady = segments[-1][2] if len(segments) > 1 else 0
+        realtime = (media - segments[0][0]) / steady if steady else None
+        stalls, stalled = playout_stalls([d for d, _, _ in segments], [a for _, _, a in segments])
+        if segments and not result["error"] and stalls == 0:
+            kept_up += 1
+        print(f"  {number:>3}  {result['name'][:23]:<24}"
+              f"{format_ms(result.get('startup', 0) * 1000 if segments else None):>9}{len(segments):>6}"
+              f"{(f'{fetching / media:.2f}' if media else '-'):>11}"
+              f"{(f'{realtime:.2f}x' if realtime else '-'):>10}"
+              f"{result['bytes'] * 8 / 1e6 / fetching if fetching else 0:>8.1f}"
+              f"{(f'{stalls}/{stalled:.1f}s' if stalls else '0'):>8}{result.get('stop_status', '-'):>6}")
+        if result["error"]:
+            print(f"       {result['error']}")
+
+    ok = [r for r in results if r["segments"]]
+    print()
+    print_latency_header("Playback timings (ms)")
+    print_latency_row("master.m3u8", [r["master"] for r in results if "master" in r])
+    print_latency_row("Media playlist", [r["playlist"] for r in results if "playlist" in r])
+    print_latency_row("Startup: first segment first byte", [r["first_byte"] for r in ok])
+    print_latency_row("Startup: first segment complete", [r["startup"] for r in ok])
+    print_latency_row("Segment fetch", [total for r in ok for _, total, _ in r["segments"]])
+    print(f"\n  {kept_up}/{streams} stream(s) kept up with realtime"
+          + ("" if kept_up == streams else " — the server cannot sustain this many transcodes"))
+
+
+# --- Screen blocking profile (--screens) ---
+
+# Server.getContent() is a synchronous XHR, so each request below blocks the TV's UI thread
+# until its response is parsed. Every screen is a generator mirroring its start() function:
+# it yields (label, path) for each getContent() call in order and receives the parsed JSON,
+# or None on failure, at which point the screen gives up the way the TV page does.
+
+def screen_user_views(ctx):
+    """Server.getUserViews(); the TV calls it again for every get*ViewQueryPart()."""
+    return (yield "Views", f"/Users/{ctx.user_id}/Views?format=json&SortBy=SortName&SortOrder=Ascending")
+
+
+def screen_view_query_part(ctx, collection_type):
+    """Server.getMoviesViewQueryPart() / getTvViewQueryPart()."""
+    views = yield from screen_user_views(ctx)
+    folder_id = None
+    for view in (views or {}).get("Items", []):
+        if view.get("Type") == "UserView" and view.get("CollectionType") == collection_type:
+            folder_id = view["Id"]
+    return f"&ParentId={folder_id}" if folder_id else ""
+
+
+def item_type_path(ctx, params=""):
+    """Server.getItemTypeURL()."""
+    return f"/Users/{ctx.user_id}/Items?format=json{params}"
+
+
+def child_items_path(ctx, parent_id, params=""):
+    """Server.getChildItemsURL()."""
+    return f"/Users/{ctx.user_id}/Items?ParentId={parent_id}&format=json{params}"
+
+
+def item_info_path(ctx, item_id, params=""):
+    """Server.getItemInfoURL()."""
+    return f"/Users/{ctx.user_id}/Items/{item_id}?format=json{params}"
+
+
+def screen_main_menu(ctx):
+    """GuiMainMenu.start(): Support.generateTopMenu(), generateMainMenu(), the user record and
+    Support.initViewUrls(), before the home page loads."""
+    uid = ctx.user_id
+    yield from screen_user_views(ctx)
+    if (yield "Media folders", item_type_path(ctx, "&Limit=0")) is None:
+        return
+    if (yield "Favourites", item_type_path(ctx, "&SortBy=SortName&SortOrder=Ascending&Filters=IsFavorite"
+                                               "&fields=SortName&recursive=true")) is None:
+        return
+    yield from screen_user_views(ctx)
+    # The TV appends "/SortBy=" to "format=json" here, so the server ignores the sort and filters.
+    if (yield "Playlists", item_type_path(ctx, "/SortBy=SortName&SortOrder=Ascending&IncludeItemTypes=Playlist"
+                                               "&Recursive=true&Limit=0")) is None:
+        return
+    if (yield "Live TV info", "/LiveTV/Info?format=json") is None:
+        return
+    if (yield "Recordings", "/LiveTV/Recordings?IsInProgress=false&SortBy=SortName&SortOrder=Ascending"
+                            "&StartIndex=0&fields=SortName&format=json") is None:
+        return
+    if (yield "Channels", f"/Channels?userId={uid}&format=json") is None:
+        return
+    if (yield "Media folders", item_type_path(ctx, "&Limit=0")) is None:
+        return
+    if (yield "User", f"/Users/{uid}?format=json&Fields=PrimaryImageTag") is None:
+        return
+    # Support.initViewUrls() resolves the movie and TV views three times.
+    movies = yield from screen_view_query_part(ctx, "movies")
+    yield from screen_view_query_part(ctx, "tvshows")
+    ctx.latest_movies = (f"/Users/{uid}/Items/Latest?format=json&IncludeItemTypes=Movie{movies}"
+                         f"&IsFolder=false&fields=ParentId,SortName,Overview,Genres,RunTimeTicks")
+    yield from screen_view_query_part(ctx, "movies")
+
+
+def screen_home(ctx):
+    """Support.processHomePageMenu("Home") and GuiPage_HomeTwoItems.start() with the default
+    views: Continue Watching (or Next Up) over Next Up (or Latest Movies)."""
+    uid = ctx.user_id
+    resume = (f"/Users/{uid}/Items?SortBy=DatePlayed&SortOrder=Descending&MediaTypes=Video&Filters=IsResumable"
+              f"&Limit=10&Recursive=true&Fields=PrimaryImageAspectRatio,BasicSyncInfo&CollapseBoxSetItems=false"
+              f"&ExcludeLocationTypes=Virtual&ImageTypeLimit=1&EnableImageTypes=Primary,Backdrop,Banner,Thumb"
+              f"&EnableTotalRecordCount=false")
+    next_up = (f"/Shows/NextUp?format=json&UserId={uid}&IncludeItemTypes=Episode&ExcludeLocationTypes=Virtual"
+               f"&Limit=24&Fields=PrimaryImageAspectRatio,SeriesInfo,DateCreated,SyncInfo,SortName&ImageTypeLimit=1"
+               f"&EnableImageTypes=Primary,Backdrop,Banner,Thumb&EnableTotalRecordCount=false")
+    resume_items = yield "Resume items", resume
+    if resume_items is None:
+        return
+    if resume_items.get("Items"):
+        top, bottom = ("Continue Watching", resume), ("Next Up", next_up)
+    else:
+        top, bottom = ("Next Up", next_up), ("Latest Movies", ctx.latest_movies or (
+            f"/Users/{uid}/Items/Latest?format=json&IncludeItemTypes=Movie&IsFolder=false"
+            f"&fields=ParentId,SortName,Overview,Genres,RunTimeTicks"))
+    if (yield top) is None or (yield bottom) is None:
+        return
+    # The random backdrop request fires from a timeout right after the page draws, still blocking.
+    yield "Random backdrop", item_type_path(ctx, "&SortBy=Random&IncludeItemTypes=Series,Movie&Recursive=true"
+                                                 "&CollapseBoxSetItems=false&Limit=20&EnableTotalRecordCount=false")
+
+
+def screen_library(ctx, item_type):
+    """Support.processHomePageMenu("Movies"/"TV") into GuiDisplay_Series.start(): the first page."""
+    part = yield from screen_view_query_part(ctx, "movies" if item_type == "Movie" else "tvshows")
+    yield f"All {'Movies' if item_type == 'Movie' else 'TV'}", item_type_path(
+        ctx, f"&IncludeItemTypes={item_type}{part}&SortBy=SortName&SortOrder=Ascending"
+             f"&fields=ParentId,SortName,Overview,Genres,RunTimeTicks&recursive=true&Limit={ctx.page_size}")
+
+
+def screen_tv_show(ctx):
+    """GuiTV_Show.start() for a series picked from a list: the series and its seasons."""
+    show = yield "Series", item_info_path(ctx, ctx.series_id)
+    if show is None:
+        return
+    yield "Seasons", child_items_path(ctx, show["Id"], "&IncludeItemTypes=Season")
+
+
+def screen_item_details(ctx, item_id):
+    """GuiPage_ItemDetails.start(): episodes load their series and season, films their trailers
+    and the "similar" row."""
+    item = yield "Item", item_info_path(ctx, item_id)
+    if item is None:
+        return
+    if item.get("Type") == "Episode":
+        if (yield "Series", item_info_path(ctx, item.get("SeriesId"))) is None:
+            return
+        yield "Season episodes", child_items_path(ctx, item.get("SeasonId"),
+                                                  "&IncludeItemTypes=Episode&fields=SortName,Overview")
+        return
+    if item.get("LocalTrailerCount", 0) > 0:
+        if (yield "Local trailers", f"/Users/{ctx.user_id}/Items/{item['Id']}/LocalTrailers?format=json") is None:
+            return
+    yield "Similar", f"/Movies/{item['Id']}/Similar?format=json&IncludeTrailers=false&Limit=5&UserId={ctx.user_id}"
+
+
+# Screen -> (request chain, ScreenContext id it needs, if any)
+SCREENS = {
+    "GuiMainMenu": (screen_main_menu, None),
+    "GuiPage_HomeTwoItems": (screen_home, None),
+    "GuiDisplay_Series (Movies)": (lambda ctx: screen_library(ctx, "Movie"), None),
+    "GuiDisplay_Series (TV)": (lambda ctx: screen_library(ctx, "Series"), None),
+    "GuiTV_Show": (screen_tv_show, "series_id"),
+    "GuiPage_ItemDetails (movie)": (lambda ctx: screen_item_details(ctx, ctx.movie_id), "movie_id"),
+    "GuiPage_ItemDetails (episode)": (lambda ctx: screen_item_details(ctx, ctx.episode_id), "episode_id"),
+}
+
+
+class ScreenContext:
+    """What the TV knows when it opens a screen: the user, its ItemPaging setting, the view URLs
+    built by the main menu and the items picked from the lists."""
+
+    def __init__(self, user_id, page_size):
+        self.user_id = user_id
+        self.page_size = page_size
+        self.latest_movies = None
+        self.movie_id = self.episode_id = self.series_id = None
+
+
+def apply_screen_overrides(path, overrides):
+    """Replace query parameters present in path (drop them when the value is empty), matched
+    case-insensitively like Jellyfin does."""
+    if not overrides:
+        return path
+    for name, value in overrides:
+        pattern = re.compile(rf"([?&]){re.escape(name)}=[^&]*", re.IGNORECASE)
+        path = pattern.sub(lambda m: f"{m.group(1)}{name}={value}" if value else m.group(1), path)
+        path = path.replace("?&", "?").replace("&&", "&")
+    return path
+
+
+def run_screen_chain(http_session, base_url, headers, ctx, screen, overrides):
+    """Drive one screen generator with blocking GETs; returns [(label, seconds, bytes, status)]."""
+    import requests
+
+    calls = []
+    chain = screen(ctx)
+    data = None
+    try:
+        label, path = next(chain)
+        while True:
+            started = time.perf_counter()
+            try:
+                resp = http_session.get(f"{base_url}/emby{apply_screen_overrides(path, overrides)}",
+                                        headers=headers, timeout=30)
+                data = resp.json() if resp.status_code == 200 else None
+                status, size = resp.status_code, len(resp.content)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                data, status, size = None, type(e).__name__, 0
+            calls.append((label, time.perf_counter() - started, size, status))
+            label, path = chain.send(data)
+    except StopIteration:
+        pass
+    return calls
+
+
+def screen_context(http_session, base_url, headers, user_id, page_size):
+    """ScreenContext with ids for the detail screens, picked the way a user would reach them from the lists."""
+    ctx = ScreenContext(user_id, page_size)
+    picks = {}
+    for item_type in ("Movie", "Episode", "Series"):
+        resp = http_session.get(f"{base_url}/emby/Users/{user_id}/Items?format=json&IncludeItemTypes={item_type}"
+                                f"&Recursive=true&SortBy=SortName&Limit=1", headers=headers, timeout=30)
+        items = resp.json().get("Items", []) if resp.status_code == 200 else []
+        picks[item_type] = items[0]["Id"] if items else None
+    ctx.movie_id, ctx.episode_id, ctx.series_id = picks["Movie"], picks["Episode"], picks["Series"]
+    if ctx.series_id is None and ctx.episode_id:
+        resp = http_session.get(f"{base_url}/emby/Users/{user_id}/Items/{ctx.episode_id}?format=json",
+                                headers=headers, timeout=30)
+        ctx.series_id = resp.json().get("SeriesId") if resp.status_code == 200 else None
+    return ctx
+
+
+def run_screen_profile(base_url, user_id, token, passes, page_size, overrides):
+    """Replay each screen's getContent() chain `passes` times and report the UI blocking time it causes."""
+    http_session = make_pooled_session(1)
+    headers = make_headers(user_id, token)
+    print(f"\n[Screens] Blocking request chains per screen: {passes} passes, ItemPaging {page_size}"
+          + (", overrides " + ", ".join(f"{k}={v}" for k, v in overrides) if overrides else ""))
+
+    ctx = screen_context(http_session, base_url, headers, user_id, page_size)
+    results = {}  # screen -> [calls per pass]
+    with probe_step("screens"):
+        for _ in range(passes):
+            for name, (screen, needs) in SCREENS.items():
+                if needs and getattr(ctx, needs) is None:
+                    continue
+                results.setdefault(name, []).append(run_screen_chain(http_session, base_url, headers, ctx,
+                                                                     screen, overrides))
+
+    print(f"\n  {'Screen':<32}{'calls':>6}{'block p50':>11}{'p95':>9}{'KiB':>8}  slowest call (p50 ms)")
+    for name, runs in results.items():
+        totals = latency_summary([sum(call[1] for call in calls) for calls in runs])
+        by_call = {}
+        for calls in runs:
+            for position, (label, seconds, size, status) in enumerate(calls):
+                by_call.setdefault((position, label), []).append(seconds)
+        slowest = max(by_call.items(), key=lambda entry: percentile(entry[1], 50), default=None)
+        failed = sum(1 for calls in runs for call in calls if call[3] != 200)
+        size = sum(call[2] for call in runs[-1]) / 1024
+        print(f"  {name:<32}{len(runs[-1]):>6}{format_ms(totals['p50']):>11}{format_ms(totals['p95']):>9}"
+              f"{size:>8.1f}  " + (f"{slowest[0][1]} ({percentile(slowest[1], 50) * 1000:.1f})" if slowest else "-")
+              + (f"  [{failed} failed]" if failed else ""))
+
+    print(f"\n  Request chains (last pass):")
+    for name, runs in results.items():
+        print(f"    {name}")
+        for label, seconds, size, status in runs[-1]:
+            print(f"      {label:<24}{seconds * 1000:>8.1f} ms{size / 1024:>8.1f} KiB"
+                  + ("" if status == 200 else f"  HTTP {status}"))
+
+
+# --- Type-ahead search (--search) ---
+
+def search_hints_path(user_id, term):
+    """Server.getSearchURL(): Support.parseSearchTerm() only escapes spaces."""
+    return f"/Search/Hints?format=json&UserId={user_id}&SearchTerm={term.replace(' ', '%20')}"
+
+
+def default_search_queries(http_session, base_url, headers, user_id, count, rng):
+    """Titles a user might type: `count` random movie and series names from the library."""
+    resp = http_session.get(f"{base_url}/emby/Users/{user_id}/Items?format=json&IncludeItemTypes=Movie,Series"
+                            f"&Recursive=true&SortBy=SortName&Limit=500&EnableTotalRecordCount=false",
+                            headers=headers, timeout=30)
+    names = sorted({item["Name"] for item in resp.json().get("Items", [])}) if resp.status_code == 200 else []
+    return rng.sample(names, min(count, len(names)))
+
+
+class SearchStats:
+    """Every SearchHints request made under one debounce setting."""
+
+    def __init__(self):
+        self.by_length = {}  # prefix length -> [seconds]
+        self.hits = {}       # prefix length -> [TotalRecordCount]
+        self.keys = self.sent = self.dropped = self.errors = 0
+        self.used_seconds = self.wasted_seconds = 0.0
+        self.final = []      # last key press -> results for the whole query on screen
+
+
+async def type_search_query(http_session, base_url, headers, user_id, query, debounce, key_delay, rng, stats):
+    """Type `query` one character at a time. Each prefix is searched `debounce` seconds after its
+    key press unless another key comes first (debounce None: only the whole query, on ENTER, as the
+    TV does today). Requests overlap; a response is shown only if no newer request was issued
+    since, otherwise it is dropped and the server time it took counts as wasted."""
+    import requests
+
+    issued = 0
+    last_key = time.perf_counter()
+    searches = []
+
+    async def search(seq, prefix):
+        started = time.perf_counter()
+        try:
+            resp = await asyncio.to_thread(http_session.get, f"{base_url}/emby{search_hints_path(user_id, prefix)}",
+                                           headers=headers, timeout=30)
+            hits = resp.json().get("TotalRecordCount") if resp.status_code == 200 else None
+        except (requests.exceptions.RequestException, ValueError):
+            hits = None
+        seconds = time.perf_counter() - started
+        stats.sent += 1
+        stats.by_length.setdefault(len(prefix), []).append(seconds)
+        if hits is None:
+            stats.errors += 1
+        else:
+            stats.hits.setdefault(len(prefix), []).append(hits)
+        if seq != issued:
+            stats.dropped += 1
+            stats.wasted_seconds += seconds
+            return
+        stats.used_seconds += seconds
+        if prefix == query and hits is not None:
+            stats.final.append(time.perf_counter() - last_key)
+
+    def issue(prefix):
+        nonlocal issued
+        issued += 1
+        searches.append(asyncio.ensure_future(search(issued, prefix)))
+
+    async def debounced(prefix):
+        await asyncio.sleep(debounce)
+        issue(prefix)
+
+    pending = None
+    for length in range(1, len(query) + 1):
+        if length > 1:
+            await asyncio.sleep(key_delay * rng.uniform(0.5, 1.5))
+        last_key = time.perf_counter()
+        stats.keys += 1
+        if debounce is None:
+            continue
+        if pending is not None:
+            pending.cancel()
+        if debounce:
+            pending = asyncio.ensure_future(debounced(query[:length]))
+        else:
+            issue(query[:length])
+    if debounce is None:
+        issue(query)
+    elif pending is not None:
+        with contextlib.suppress(asyncio.CancelledError):
+            await pending
+    await asyncio.gather(*searches)
+
+
+def run_search_bench(base_url, user_id, token, queries, query_count, debounces, key_delay, users):
+    """Type-ahead SearchHints benchmark: per prefix length latency and the server work spent on
+    responses a newer keystroke made stale, for each debounce setting."""
+    rng = random.Random(7)
+    http_session = make_pooled_session(users * 8)
+    headers = make_headers(user_id, token)
+    if not queries:
+        queries = default_search_queries(http_session, base_url, headers, user_id, query_count, rng)
+    if not queries:
+        print(f"\n[Search] SKIPPED — no movies or series to take search terms from (pass --search-queries)")
+        return
+    labels = ["enter" if debounce is None else f"{debounce * 1000:g} ms" for debounce in debounces]
+    print(f"\n[Search] Type-ahead SearchHints: {len(queries)} queries x {users} users, "
+          f"key delay {key_delay * 1000:g} ms ±50%, debounce {', '.join(labels)}")
+    print(f"  Queries: {', '.join(queries)}")
+
+    async def run_setting(debounce):
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=users * 8))
+        stats = SearchStats()
+
+        async def user(index):
+            user_rng = random.Random(index)
+            for query in user_rng.sample(queries, len(queries)):
+                await type_search_query(http_session, base_url, headers, user_id, query, debounce,
+                                        key_delay, user_rng, stats)
+
+        await asyncio.gather(*(user(index) for index in range(users)))
+        return stats
+
+    results = {}
+    with probe_step("search"):
+        for label, debounce in zip(labels, debounces):
+            results[label] = asyncio.run(run_setting(debounce))
+
+    print(f"\n  {'Debounce':<10}{'keys':>7}{'requests':>10}{'dropped':>9}{'wasted srv-s':>14}"
+          f"{'final p50':>11}{'p99':>9}  (final: last key press to results on screen, ms)")
+    for label, stats in results.items():
+        total = stats.used_seconds + stats.wasted_seconds
+        final = latency_summary(stats.final)
+        print(f"  {label:<10}{stats.keys:>7}{stats.sent:>10}{stats.dropped:>9}"
+              f"{stats.wasted_seconds:>8.2f} ({stats.wasted_seconds / total * 100 if total else 0:>2.0f}%)"
+              f"{format_ms(final['p50']):>11}{format_ms(final['p99']):>9}"
+              + (f"  [{stats.errors} failed]" if stats.errors else ""))
+
+    for label, stats in results.items():
+        if label == "enter":
+            continue
+        print()
+        print_latency_header(f"Prefix length, debounce {label} (avg hits)")
+        for length in sorted(stats.by_length):
+            hits = stats.hits.get(length)
+            print_latency_row(f"{length} chars" + (f" ({sum(hits) / len(hits):.0f})" if hits else ""),
+                              stats.by_length[length])
+
+
+# --- Live TV guide fetch (--guide) ---
+
+GUIDE_VISIBLE_ROWS = 7  # channel rows GuiPage_TvGuide draws per page
+
+
+def guide_date(moment):
+    """GuiPage_TvGuide's MinEndDate/MaxStartDate format: UTC with the colons escaped."""
+    return moment.strftime("%Y-%m-%dT%H%%3A%M%%3A%S.000Z")
+
+
+def guide_programs_path(user_id, channel_ids, start, window_hours):
+    """The TV's LiveTv/Programs query for programmes overlapping [start, start + window)."""
+    min_end = guide_date(start + timedelta(seconds=1))
+    max_start = guide_date(start + timedelta(hours=window_hours, seconds=-1))
+    return (f"/LiveTv/Programs?UserId={user_id}&MaxStartDate={max_start}&MinEndDate={min_end}"
+            f"&channelIds={','.join(channel_ids)}&ImageTypeLimit=1&EnableImages=false&SortBy=StartDate"
+            f"&EnableTotalRecordCount=false&EnableUserData=false")
+
+
+def fetch_guide_batch(http_session, base_url, headers, path):
+    """One programmes request; returns (seconds, bytes, programmes, status, finished at)."""
+    import requests
+
+    started = time.perf_counter()
+    try:
+        resp = http_session.get(f"{base_url}/emby{path}", headers=headers, timeout=60)
+        programs = len(resp.json().get("Items", [])) if resp.status_code == 200 else 0
+        status, size = resp.status_code, len(resp.content)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        programs, status, size = 0, type(e).__name__, 0
+    finished = time.perf_counter()
+    return finished - started, size, programs, status, finished
+
+
+def run_guide_bench(base_url, user_id, token, batch_sizes, windows, parallel, passes):
+    """Fetch the whole guide grid as channel batches x time window, batches `parallel` at a time,
+    and report request latency, payload and how long until the first page and the full grid are in."""
+    http_session = make_pooled_session(parallel)
+    headers = make_headers(user_id, token)
+    started = time.perf_counter()
+    resp = http_session.get(f"{base_url}/emby/LiveTV/Channels?StartIndex=0&EnableFavoriteSorting=true&UserId={user_id}",
+                            headers=headers, timeout=60)
+    channel_seconds = time.perf_counter() - started
+    channels = resp.json().get("Items", []) if resp.status_code == 200 else []
+    if not channels:
+        print(f"\n[Guide] SKIPPED — LiveTV/Channels returned no channels (HTTP {resp.status_code})")
+        return
+    channel_ids = [channel["Id"] for channel in channels]
+    now = datetime.now(timezone.utc)
+    start = now.replace(minute=now.minute // 30 * 30, second=0, microsecond=0)
+    print(f"\n[Guide] {len(channel_ids)} channels (LiveTV/Channels {channel_seconds * 1000:.1f} ms, "
+          f"{len(resp.content) / 1024:.0f} KiB), guide from {start:%H:%M} UTC, {parallel} requests in flight, "
+          f"{passes} passes")
+    if len(channel_ids) > 100:
+        print(f"  Note: the TV requests Limit=100, so it only ever shows the first 100 of these channels.")
+
+    rows = []
+    with probe_step("guide"), ThreadPoolExecutor(max_workers=parallel) as pool:
+        for window in windows:
+            for batch in batch_sizes:
+                size = batch or len(channel_ids)
+                batches = [channel_ids[i:i + size] for i in range(0, len(channel_ids), size)]
+                first_page = math.ceil(min(GUIDE_VISIBLE_ROWS, len(channel_ids)) / size)
+                latencies, first_times, fill_times = [], [], []
+                for _ in range(passes):
+                    began = time.perf_counter()
+                    results = list(pool.map(
+                        lambda ids: fetch_guide_batch(http_session, base_url, headers,
+                                                      guide_programs_path(user_id, ids, start, window)), batches))
+                    latencies += [result[0] for result in results]
+                    first_times.append(max(result[4] for result in results[:first_page]) - began)
+                    fill_times.append(max(result[4] for result in results) - began)
+                failed = [result[3] for result in results if result[3] != 200]
+                rows.append((batch, window, len(batches), latency_summary(latencies),
+                             sum(result[1] for result in results), sum(result[2] for result in results),
+                             percentile(first_times, 50), percentile(fill_times, 50), failed))
+
+    print(f"\n  {'Batch':>6}{'Window':>8}{'reqs':>6}{'req p50':>9}{'p99':>9}{'KiB':>9}{'programs':>10}"
+          f"{'first page':>12}{'grid fill':>11}  (ms; page/fill are p50 over passes)")
+    for batch, window, requests_made, latency, size, programs, first, fill, failed in rows:
+        today = "  <- TV today" if batch == 0 and window == 24 else ""
+        print(f"  {batch or 'all':>6}{f'{window:g}h':>8}{requests_made:>6}{format_ms(latency['p50']):>9}"
+              f"{format_ms(latency['p99']):>9}{size / 1024:>9.0f}{programs:>10}{first * 1000:>12.1f}"
+              f"{fill * 1000:>11.1f}" + (f"  [{len(failed)} failed: {failed[0]}]" if failed else "") + today)
+
+
+# --- Direct play audit (--direct-play-audit) ---
+
+ORSAY_CONTAINERS = ("asf", "avi", "mkv", "mp4", "3gpp", "mpg", "mpeg", "ts", "m4v", "m2ts", "mov", "vro", "tp", "trp",
+                    "flv", "vob", "svi", "mts", "divx")
+ORSAY_H264_PROFILES = ("Base", "Constrained Baseline", "Baseline", "Main", "High")
+
+
+def orsay_video_table(resolution, containers, h264_resolution, hevc, wmv_resolution, mpeg4_framerate):
+    """One model year of GuiPlayer_TranscodeParams.getParameters() as codec -> (containers, max
+    resolution, max frame rate, max level, profiles); True means the TV does not check it. The
+    per-codec bitrates are left out: checkBitRate() only compares against the Max Bitrate setting."""
+    table = {
+        "mpeg2video": (containers, resolution, 30, True, True),
+        "mpeg4": (containers, resolution, mpeg4_framerate, True, True),
+        "h264": (containers, h264_resolution, 30, 41, ORSAY_H264_PROFILES),
+        "mvc": (containers, resolution, 30, 41, ORSAY_H264_PROFILES),
+        "wmv2": (("asf",), wmv_resolution, 30, True, True),
+        "wmv3": (("asf",), wmv_resolution, 30, True, True),
+        "vc1": (containers, resolution, 30, True, True),
+    }
+    if hevc:
+        table["hevc"] = (containers, resolution, 30, 153, ORSAY_H264_PROFILES)
+        table["h265"] = (containers, resolution, 30, 51, ORSAY_H264_PROFILES)
+    return table
+
+
+# The wmv2/wmv3 entries of the 2013+ tables assign their bitrate to `resolution`, so
+# checkResolution() compares against a number and always fails: the max resolution is kept as
+# that number here to reproduce it. mpeg4 frame rate as (width > 720, otherwise).
+ORSAY_VIDEO_RULES = {
+    "HU": orsay_video_table((3840, 2160), ORSAY_CONTAINERS, (3840, 2160), True, 25600000, (30, 60)),
+    "H": orsay_video_table((1920, 1080), ORSAY_CONTAINERS, (1920, 1080), True, 25600000, (30, 60)),
+    "F": orsay_video_table((1920, 1080), ORSAY_CONTAINERS + ("wmv",), (1920, 1088), False, 30720000, 30),
+    "E": orsay_video_table((1920, 1080), ORSAY_CONTAINERS + ("wmv",), (1920, 1080), False, 30720000, 30),
+    "D": {
+        "mpeg2video": (("mpg", "mkv", "mpeg", "vro", "vob", "ts"), (1920, 1080), 30, True, True),
+        "mpeg4": (("asf", "avi", "mkv", "mp4", "3gpp"), (1920, 1080), 30, True, True),
+        "h264": (("asf", "avi", "mkv", "mp4", "3gpp", "mpg", "mpeg", "ts", "m4v"), (1920, 1080), 30, 41,
+                 ORSAY_H264_PROFILES),
+        "wmv2": (("asf",), (1920, 1080), 30, True, True),
+        "wmv3": (("asf",), (1920, 1080), 30, True, True),
+        "vc1": (("ts",), (1920, 1080), 30, True, True),
+    },
+}
+ORSAY_VIDEO_RULES["B"] = ORSAY_VIDEO_RULES["F"]
+
+# getAudioParameters(): max channels per codec. Only the 2013+ models take 8-channel DTS; B
+# (Blu-ray) players fall through to the D table here, unlike in getParameters().
+ORSAY_AUDIO_CHANNELS = dict.fromkeys(("aac", "mp3", "mp2", "ac3", "wmav2", "wmapro", "wmavoice", "dca", "dts", "eac3"), 6)
+ORSAY_AUDIO_CHANNELS.update(dict.fromkeys(("pcm", "pcm_s16le", "pcm_s24le", "pcm_s32le"), 2))
+ORSAY_AUDIO_RULES = {model: dict(ORSAY_AUDIO_CHANNELS, dca=8, dts=8) for model in ("HU", "H", "F", "E")}
+
+# transcodeStatus -> what the server has to do for it
+ORSAY_PLAYBACK_KINDS = {
+    "Direct Play": "direct",
+    "Stream Copy - Audio Not First Track": "remux",
+    "Transcoding Audio": "audio",
+    "Transcoding Audio & Video": "video",
+    "Transcoding Audio & Video (Subtitle Burn-in)": "video",
+    "Transcode": "video",
+}
+
+
+def orsay_main_streams(streams, config):
+    """GuiPlayer_Versions.getMainStreamIndex(): (video, audio, audio is the first track, subtitle)
+    stream indexes for the user's configuration, or None when no audio track would be chosen."""
+    audio_preference = config.get("AudioLanguagePreference", "none")
+    play_default = config.get("PlayDefaultAudioTrack", False)
+    subtitle_mode = config.get("SubtitleMode", "Default")
+    subtitle_language = config.get("SubtitleLanguagePreference", "eng")
+    first_audio = next((i for i, stream in enumerate(streams) if stream.get("Type") == "Audio"), -1)
+
+    video = audio = -1
+    video_if_no_default = 0
+    for i, stream in enumerate(streams):
+        if stream.get("Type") == "Video":
+            video_if_no_default = video_if_no_default or i
+            if video == -1 and stream.get("IsDefault"):
+                video = i
+        elif stream.get("Type") == "Audio" and audio == -1:
+            if stream.get("IsDefault") if play_default else stream.get("Language") == audio_preference:
+                audio = i
+    video = video_if_no_default if video == -1 else video
+    audio = first_audio if audio == -1 else audio
+    if audio == -1:
+        return None
+
+    def first_subtitle(test):
+        return next((i for i, stream in enumerate(streams) if stream.get("Type") == "Subtitle" and test(stream)), -1)
+
+    subtitle = -1
+    if subtitle_mode != "None":
+        subtitle = first_subtitle(lambda stream: stream.get("IsForced"))
+    if subtitle == -1 and subtitle_mode not in ("None", "OnlyForced"):
+        audio_language = streams[audio].get("Language") or audio_preference
+        if audio_language != subtitle_language:
+            subtitle = first_subtitle(lambda stream: stream.get("Language") == subtitle_language)
+    if subtitle == -1 and subtitle_mode == "Always":
+        subtitle = first_subtitle(lambda stream: stream.get("Language") == subtitle_language)
+        if subtitle == -1:
+            subtitle = first_subtitle(lambda stream: True)
+    return video, audio, audio == first_audio, subtitle
+
+
+def orsay_video_failures(source, stream, model, max_bitrate):
+    """GuiPlayer_Transcoding.checkCodec(): the checks a video stream fails on this model."""
+    codec = (stream.get("Codec") or "").lower()
+    rules = ORSAY_VIDEO_RULES.get(model, ORSAY_VIDEO_RULES["D"]).get(codec)
+    if rules is None:
+        return [f"video codec {codec or '?'}"]
+    containers, resolution, framerate, level, profiles = rules
+    failures = []
+    if (source.get("Container") or "").lower() not in containers:
+        failures.append(f"container {source.get('Container')}")
+    width, height = stream.get("Width"), stream.get("Height")
+    if not isinstance(resolution, tuple):
+        failures.append(f"{codec} resolution (table bug)")
+    elif width is None or height is None or width > resolution[0] or height > resolution[1]:
+        failures.append(f"resolution > {resolution[0]}x{resolution[1]}")
+    if (stream.get("BitRate") or 0) > max_bitrate:
+        failures.append(f"bitrate > {max_bitrate / 1024 / 1024:g} Mb/s")
+    if isinstance(framerate, tuple):
+        framerate = framerate[0] if (width or 0) > 720 else framerate[1]
+    if stream.get("AverageFrameRate") is None or stream["AverageFrameRate"] > framerate:
+        failures.append(f"frame rate > {framerate}")
+    if level is not True:
+        value = stream.get("Level")
+        value = value * 10 if value is not None and value < 10 else value
+        if value is None or not 0 <= value <= level:
+            failures.append(f"{codec} level > {level}")
+    if profiles is not True and stream.get("Profile") not in profiles:
+        failures.append(f"{codec} profile {stream.get('Profile')}")
+    return failures
+
+
+def orsay_playback_method(source, selection, model, max_bitrate, aac_to_dolby):
+    """GuiPlayer_Transcoding.start(): (transcodeStatus, reasons) for one media source."""
+    streams = source["MediaStreams"]
+    video, audio, audio_first, subtitle = selection
+    video_failures = orsay_video_failures(source, streams[video], model, max_bitrate)
+    audio_stream = streams[audio]
+    audio_codec = (audio_stream.get("Codec") or "").lower()
+    max_channels = ORSAY_AUDIO_RULES.get(model, ORSAY_AUDIO_CHANNELS).get(audio_codec)
+    audio_failures = []
+    if max_channels is None:
+        audio_failures.append(f"audio codec {audio_codec or '?'}")
+    elif audio_stream.get("Channels") is None or audio_stream["Channels"] > max_channels:
+        audio_failures.append(f"{audio_codec} {audio_stream.get('Channels')}ch > {max_channels}")
+    to_dolby = aac_to_dolby and audio_codec == "aac"
+    burn_in = subtitle > -1 and not streams[subtitle].get("IsTextSubtitleStream")
+
+    reasons = video_failures + audio_failures + (["AAC to Dolby"] if to_dolby else [])
+    if burn_in:
+        reasons.append(f"{streams[subtitle].get('Codec')} subtitle burn-in")
+    if not video_failures and not audio_failures and not to_dolby:
+        if burn_in:
+            return "Transcoding Audio & Video (Subtitle Burn-in)", reasons
+        if audio_first:
+            return "Direct Play", []
+        return "Stream Copy - Audio Not First Track", ["audio not first track"]
+    if video_failures or burn_in:
+        return ("Transcoding Audio & Video (Subtitle Burn-in)" if burn_in else "Transcoding Audio & Video"), reasons
+    return "Transcoding Audio", reasons
+
+
+def orsay_item_playback(item, config, model, max_bitrate, aac_to_dolby):
+    """GuiPlayer_Versions.start(): the (transcodeStatus, reasons) the TV ends up playing the item with."""
+    sources = item.get("MediaSources") or []
+    if not sources:
+        return "Unplayable", ["no media sources"]
+    if (sources[0].get("Protocol") or "").lower() == "http":
+        return "Transcode", ["HTTP source"]
+    options = []
+    for source in sources:
+        selection = orsay_main_streams(source.get("MediaStreams") or [], config)
+        if selection is not None:
+            options.append(orsay_playback_method(source, selection, model, max_bitrate, aac_to_dolby))
+    if not options:
+        return "Unplayable", ["no audio track"]
+    if len(options) == 1:
+        return options[0]
+    for wanted in ("Direct Play", "Transcoding Audio"):
+        for option in options:
+            if option[0] == wanted:
+                return option
+    # With several versions and none direct or audio-only, Versions.start() passes the empty
+    # MediaSelections[0] to the player, so playback never starts.
+    return "Unplayable", ["several versions, none direct play or audio-only"]
+
+
+def binomial_quantile(n, p, q):
+    """Smallest k with P(X <= k) >= q for X ~ Binomial(n, p)."""
+    cumulative = 0.0
+    for k in range(n + 1):
+        cumulative += math.comb(n, k) * p ** k * (1 - p) ** (n - k)
+        if cumulative >= q:
+            return k
+    return n
+
+
+class PlaybackAudit:
+    """Per model counters filled from crawl threads, plus the items that need a video transcode."""
+
+    def __init__(self, models, config, max_bitrate, aac_to_dolby):
+        self.models = models
+        self.config = config
+        self.max_bitrate = max_bitrate
+        self.aac_to_dolby = aac_to_dolby
+        self.lock = threading.Lock()
+        self.items = self.versions = 0
+        self.runtime = 0
+        self.kinds = {model: {} for model in models}          # model -> kind -> [items, runtime ticks]
+        self.statuses = {model: {} for model in models}       # model -> transcodeStatus -> items
+        self.reasons = {model: {} for model in models}        # model -> reason -> items
+        self.offenders = []  # (models needing video transcode, runtime ticks, name, format, reasons)
+
+    def add(self, item):
+        runtime = item.get("RunTimeTicks") or 0
+        results = {model: orsay_item_playback(item, self.config, model, self.max_bitrate, self.aac_to_dolby)
+                   for model in self.models}
+        with self.lock:
+            self.items += 1
+            self.versions += len(item.get("MediaSources") or [])
+            self.runtime += runtime
+            for model, (status, reasons) in results.items():
+                kind = ORSAY_PLAYBACK_KINDS.get(status, "failed")
+                counts = self.kinds[model].setdefault(kind, [0, 0])
+                counts[0] += 1
+                counts[1] += runtime
+                self.statuses[model][status] = self.statuses[model].get(status, 0) + 1
+                for reason in reasons:
+                    self.reasons[model][reason] = self.reasons[model].get(reason, 0) + 1
+            video_models = [model for model, (status, _) in results.items()
+                            if ORSAY_PLAYBACK_KINDS.get(status) == "video"]
+            if video_models:
+                reasons = sorted({reason for model in video_models for reason in results[model][1]})
+                self.offenders.append((len(video_models), runtime, self.describe(item), reasons))
+
+    @staticmethod
+    def describe(item):
+        name = item.get("Name", "?")
+        if item.get("SeriesName"):
+            name = f"{item['SeriesName']} - {name}"
+        source = (item.get("MediaSources") or [{}])[0]
+        streams = source.get("MediaStreams") or []
+        video = next((stream for stream in streams if stream.get("Type") == "Video"), {})
+        audio = next((stream for stream in streams if stream.get("Type") == "Audio"), {})
+        return (f"{name} ({source.get('Container')} {video.get('Codec')} {video.get('Width')}x{video.get('Height')} "
+                f"{video.get('Profile')}, {audio.get('Codec')} {audio.get('Channels')}ch)")
+
+
+def run_playback_audit(base_url, user_id, token, models, max_bitrate_mbps, aac_to_dolby, page_size, parallel,
+                       viewers, top):
+    """Classify every movie and episode the way the TV picks direct play or a transcode, per model year."""
+    http_session = make_pooled_session(parallel)
+    headers = make_headers(user_id, token)
+    resp = http_session.get(f"{base_url}/emby/Users/{user_id}?format=json", headers=headers, timeout=30)
+    config = resp.json().get("Configuration", {}) if resp.status_code == 200 else {}
+    audit = PlaybackAudit(models, config, max_bitrate_mbps * 1024 * 1024, aac_to_dolby)
+    print(f"\n[Audit] Direct play vs transcode for models {', '.join(models)}: Max Bitrate {max_bitrate_mbps:g} Mb/s, "
+          f"AAC to Dolby {'on' if aac_to_dolby else 'off'}, {parallel} pages of {page_size} in flight")
+
+    started = time.perf_counter()
+    with probe_step("direct_play_audit"):
+        total, pages, errors = crawl_library(http_session, base_url, user_id, headers, page_size, parallel,
+                                             "Movie,Episode", "MediaSources", on_item=audit.add)
+    wall = time.perf_counter() - started
+    print(f"  Classified {audit.items}/{total} items ({audit.versions} versions) in {wall:.2f}s"
+          + (f", {len(errors)} failed pages (first: {errors[0]})" if errors else ""))
+    if not audit.items:
+        return
+
+    print(f"\n  {'Model':<7}{'direct':>8}{'remux':>8}{'audio':>8}{'video':>8}{'failed':>8}"
+          f"{'video share':>13}  concurrent video transcodes with {viewers} viewers")
+    for model in models:
+        kinds = audit.kinds[model]
+        share = kinds.get("video", [0, 0])[1] / audit.runtime if audit.runtime else 0
+        print(f"  {model:<7}" + "".join(f"{kinds.get(kind, [0])[0]:>8}"
+                                        for kind in ("direct", "remux", "audio", "video", "failed"))
+              + f"{share * 100:>12.0f}%  mean {viewers * share:.1f}, p95 {binomial_quantile(viewers, share, 0.95)}")
+    print(f"  (remux: audio re-encoded into TS, video copied; shares are weighted by runtime, i.e. the chance "
+          f"a viewer is watching such an item)")
+
+    for model in models:
+        reasons = sorted(audit.reasons[model].items(), key=lambda entry: -entry[1])
+        if reasons:
+            print(f"\n  Why items do not direct play on {model} (items):")
+            for reason, count in reasons[:8]:
+                print(f"    {count:>7}  {reason}")
+
+    if audit.offenders:
+        audit.offenders.sort(key=lambda entry: (-entry[0], -entry[1]))
+        print(f"\n  Pre-convert first (video transcode on most models, longest first):")
+        for model_count, runtime, description, reasons in audit.offenders[:top]:
+            print(f"    {model_count}/{len(models)}  {runtime / 600_000_000:>4.0f} min  {description}")
+            print(f"               {'; '.join(reasons)}")
+
+
+# --- Response payload audit (--payload-audit) ---
+
+# Each getContent() response is JSON.parse()d on the UI thread as soon as the synchronous XHR
+# returns, so the decompressed size is paid for twice on the TV: transfer and parse. Every
+# request pattern the screens (and this script) send is fetched as sent and rewritten one
+# parameter at a time, with each Accept-Encoding, to see which changes shrink it most.
+
+PAYLOAD_DTO_ENDPOINT = re.compile(r"/(Users/[^/?]+/(Items|Views)|Shows/NextUp|Movies/[^/?]+/Similar)", re.IGNORECASE)
+PAYLOAD_SINGLE_ITEM = re.compile(r"/Users/[^/?]+/Items/(?!Latest\b)[^/?]+\?", re.IGNORECASE)
+
+
+class PayloadTimings:
+    """TimedAdapter sink for the audit: keeps nothing itself and forwards to --report when given."""
+
+    def add(self, record):
+        if REPORT is not None:
+            REPORT.add(record)
+
+
+def with_query_params(path, params):
+    """Set each (name, value) in path, replacing it case-insensitively if present; "" drops it."""
+    for name, value in params:
+        if re.search(rf"[?&]{re.escape(name)}=", path, re.IGNORECASE):
+            path = apply_screen_overrides(path, [(name, value)])
+        elif value:
+            path += f"{'&' if '?' in path else '?'}{name}={value}"
+    return path
+
+
+def payload_patterns(http_session, base_url, headers, ctx, crawl_types, crawl_fields):
+    """(where, label, path) for each distinct request the screens send, in order, then a library
+    page as --crawl fetches it and a SearchHints query."""
+    patterns, seen = [], set()
+
+    def add(where, label, path):
+        if path not in seen:
+            seen.add(path)
+            patterns.append((where, label, path))
+
+    for name, (screen, needs) in SCREENS.items():
+        if needs and getattr(ctx, needs) is None:
+            continue
+        chain = screen(ctx)
+        try:
+            label, path = next(chain)
+            while True:
+                add(name, label, path)
+                resp = http_session.get(f"{base_url}/emby{path}", headers=headers, timeout=30)
+                try:
+                    data = resp.json() if resp.status_code == 200 else None
+                except ValueError:
+                    data = None
+                label, path = chain.send(data)
+        except StopIteration:
+            pass
+    add("--crawl", "Library page", crawl_page_url("", ctx.user_id, crawl_types, crawl_fields, 0, ctx.page_size)[5:])
+    names = default_search_queries(http_session, base_url, headers, ctx.user_id, 1, random.Random(0))
+    if names:
+        add("GuiPage_Search", "Search hints", search_hints_path(ctx.user_id, names[0][:3]))
+    return patterns
+
+
+def payload_variants(path, limits, items):
+    """(change, path) for the request as sent and each rewrite that applies to it; `items` is how
+    many the request returns as sent, so a Limit that would not cut the list is left out."""
+    variants = [("as sent", path)]
+    searching = "/search/hints" in path.lower()  # takes Limit, but none of the DtoOptions
+    if not PAYLOAD_DTO_ENDPOINT.search(path) and not searching:
+        return variants
+    trims = [] if searching else [("EnableImages=false", [("EnableImages", "false")]), ("EnableUserData=false", [("EnableUserData", "false")])]
+    if not searching and re.search(r"[?&]fields=", path, re.IGNORECASE):
+        trims.append(("Fields dropped", [("Fields", "")]))
+    for change, params in trims:
+        variants.append((change, with_query_params(path, params)))
+    if trims:
+        variants.append(("all trims", with_query_params(path, [param for _, params in trims for param in params])))
+    limit = re.search(r"[?&]limit=(\d+)", path, re.IGNORECASE)
+    if PAYLOAD_SINGLE_ITEM.search(path) or (limit and int(limit.group(1)) == 0):
+        return variants  # one item, or Limit=0 asking only for the count
+    for value in limits:
+        if (int(limit.group(1)) != value) if limit else value < items:
+            variants.append((f"Limit={value}", with_query_params(path, [("Limit", str(value))])))
+    return variants
+
+
+def payload_item_count(data):
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        for key in ("Items", "SearchHints"):
+            if isinstance(data.get(key), list):
+                return len(data[key])
+        return 1
+    return 0
+
+
+def measure_payload(http_session, base_url, headers, path, encodings, passes):
+    """Fetch path `passes` times per Accept-Encoding. Returns {"wire": {encoding: bytes or None when
+    the server answered in another encoding}, "body", "items", "parse", "fetch"} (seconds are p50
+    for fetches, best of `passes` for parsing) or None when the request fails."""
+    result = {"wire": {}, "fetch": []}
+    for encoding in encodings:
+        for _ in range(passes):
+            resp = http_session.get(f"{base_url}/emby{path}", timeout=30,
+                                    headers=dict(headers, **{"Accept-Encoding": encoding}))
+            if resp.status_code != 200:
+                return None
+            served = (resp.timing.get("content_encoding") or "identity").lower()
+            result["wire"][encoding] = resp.timing["wire_bytes"] if served == encoding else None
+            result["fetch"].append(resp.timing["total_ms"] / 1000)
+            content = resp.content
+    parse_times = []
+    for _ in range(passes):
+        started = time.perf_counter()
+        data = json.loads(content)
+        parse_times.append(time.perf_counter() - started)
+    result.update(body=len(content), items=payload_item_count(data), parse=min(parse_times),
+                  fetch=percentile(result["fetch"], 50))
+    return result
+
+
+def run_payload_audit(base_url, user_id, token, page_size, limits, passes, crawl_types, crawl_fields):
+    """Measure every request pattern in each variant and rank the parameter changes by bytes saved."""
+    import requests
+
+    http_session = requests.Session()
+    adapter = TimedAdapter(PayloadTimings(), 1)  # for wire and decoded sizes, with or without --report
+    http_session.mount("http://", adapter)
+    http_session.mount("https://", adapter)
+    if RECORDER is not None:
+        http_session.hooks["response"].append(RECORDER.on_response)
+    headers = make_headers(user_id, token)
+    try:
+        import brotli  # noqa: F401
+        encodings = ("identity", "gzip", "br")
+    except ImportError:
+        encodings = ("identity", "gzip")
+
+    print(f"\n[Payload] Response size and parse time per request pattern: ItemPaging {page_size}, "
+          f"Limit variants {','.join(map(str, limits))}, {passes} passes"
+          + ("" if "br" in encodings else " (br skipped: pip3 install brotli)"))
+    with probe_step("payload_audit"):
+        ctx = screen_context(http_session, base_url, headers, user_id, page_size)
+        patterns = payload_patterns(http_session, base_url, headers, ctx, crawl_types, crawl_fields)
+        results = []  # (where, label, path, [(change, measurement)])
+        for where, label, path in patterns:
+            base = measure_payload(http_session, base_url, headers, path, encodings, passes)
+            measured = [("as sent", base)] + [
+                (change, measure_payload(http_session, base_url, headers, variant, encodings, passes))
+                for change, variant in payload_variants(path, limits, base["items"] if base else 0)[1:]]
+            results.append((where, label, path, measured))
+
+    wire_columns = "".join(f"{encoding:>10}" for encoding in encodings)
+    print("\n  Sizes in KiB on the wire per Accept-Encoding; '-' means the server answered uncompressed.")
+    for where, label, path, measured in results:
+        print(f"\n  {where} / {label}: {path.replace(user_id, '{UserId}')}")
+        print(f"    {'change':<24}{'items':>6}{'body KiB':>10}{'B/item':>8}{wire_columns}{'parse ms':>10}{'fetch ms':>10}")
+        for change, m in measured:
+            if m is None:
+                print(f"    {change:<24}  request failed")
+                continue
+            wire = "".join(f"{'-' if m['wire'][e] is None else format(m['wire'][e] / 1024, '.1f'):>10}"
+                           for e in encodings)
+            per_item = f"{m['body'] / m['items']:.0f}" if m["items"] else "-"
+            print(f"    {change:<24}{m['items']:>6}{m['body'] / 1024:>10.1f}{per_item:>8}{wire}"
+                  f"{m['parse'] * 1000:>10.2f}{m['fetch'] * 1000:>10.1f}")
+
+    # Savings of each change against the same request as sent, summed over the patterns it applies to.
+    savings = {}
+    for _, _, _, measured in results:
+        base = measured[0][1]
+        if base is None:
+            continue
+        for change, m in measured[1:]:
+            if m is None:
+                continue
+            entry = savings.setdefault(change, {"requests": 0, "base": 0, "body": 0, "parse": 0.0, "gzip": 0})
+            entry["requests"] += 1
+            entry["base"] += base["body"]
+            entry["body"] += base["body"] - m["body"]
+            entry["parse"] += base["parse"] - m["parse"]
+            if base["wire"].get("gzip") is not None and m["wire"].get("gzip") is not None:
+                entry["gzip"] += base["wire"]["gzip"] - m["wire"]["gzip"]
+    print("\n  Changes ranked by decompressed bytes saved (what JSON.parse sees), one pass over the patterns:")
+    print(f"    {'change':<24}{'requests':>9}{'body saved':>14}{'%':>6}{'parse saved':>14}{'gzip saved':>13}")
+    for change, entry in sorted(savings.items(), key=lambda kv: kv[1]["body"], reverse=True):
+        share = entry["body"] / entry["base"] * 100 if entry["base"] else 0
+        print(f"    {change:<24}{entry['requests']:>9}{entry['body'] / 1024:>10.1f} KiB{share:>5.0f}%"
+              f"{entry['parse'] * 1000:>11.2f} ms{entry['gzip'] / 1024:>9.1f} KiB")
+    if any(change.startswith("Limit=") for change in savings):
+        print("    Limit changes also change how many items a page holds; compare B/item above.")
+
+    as_sent = [measured[0][1] for _, _, _, measured in results if measured[0][1] is not None]
+    for encoding in encodings[1:]:
+        honoured = [m for m in as_sent if m["wire"].get(encoding) is not None]
+        if not honoured:
+            print(f"  {encoding}: not offered by the server for any request")
+            continue
+        plain = sum(m["body"] for m in honoured)
+        packed = sum(m["wire"][encoding] for m in honoured)
+        print(f"  {encoding}: {len(honoured)}/{len(as_sent)} requests, {plain / 1024:.1f} -> {packed / 1024:.1f} KiB "
+              f"on the wire as sent" + (f" ({(1 - packed / plain) * 100:.0f}% less)" if plain else ""))
+
+
+# --- Warm start (--warm) ---
+
+class SessionCache:
+    """Device id, user id and access token per server and user, kept on disk between runs so a
+    scheduled probe reuses one server-side device instead of registering a new one every time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        with contextlib.suppress(OSError, ValueError):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def entry(self, base_url, username):
+        """The cache entry for this server and user, created with a fresh device id if missing."""
+        key = f"{base_url}|{username or ''}"
+        if key not in self.entries:
+            self.entries[key] = {"device_id": "test-" + uuid.uuid4().hex[:16]}
+        return self.entries[key]
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp = self.path + ".tmp"
+        # Access tokens are credentials: owner read/write only.
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(temp, self.path)
+
+
+def warm_authenticate(session, base_url, entry):
+    """Reuse a cached token. One GET /Sessions?DeviceId= both proves the token and shows whether the
+    server-side session still has our capabilities. Returns (user_id, token, capabilities_current);
+    (None, None, False) when the server answers 401 and a fresh login is needed."""
+    global SESSION_ID
+    user_id, token = entry["user_id"], entry["token"]
+    print(f"\n[Step 3] Reusing cached token {token[:8]}... for device {DEVICE_ID}")
+    resp = session.get(f"{base_url}/emby/Sessions?DeviceId={DEVICE_ID}&format=json",
+                       headers=make_headers(user_id, token), timeout=10)
+    if resp.status_code == 401:
+        print(f"  Token rejected (HTTP 401) — logging in again.")
+        return None, None, False
+    if resp.status_code != 200:
+        raise ProbeError(f"HTTP {resp.status_code} validating the cached token")
+    ours = next((s for s in resp.json() if s.get("DeviceId") == DEVICE_ID), None)
+    if ours is None:
+        print(f"  OK — Token valid; the server has no live session for this device yet.")
+        return user_id, token, False
+    SESSION_ID = ours.get("Id")
+    current = (ours.get("SupportsRemoteControl", False) == CAPABILITIES["SupportsMediaControl"]
+               and set(ours.get("PlayableMediaTypes") or []) == set(CAPABILITIES["PlayableMediaTypes"])
+               and set(ours.get("SupportedCommands") or []) == set(CAPABILITIES["SupportedCommands"]))
+    print(f"  OK — Token valid, session {SESSION_ID}" + (" with current capabilities." if current else "."))
+    return user_id, token, current
+
+
+# --- Fleet simulation (--clients N --ramp SECONDS) ---
+
+class ProbeError(Exception):
+    """A step failed the way the TV app would notice: bad status, missing data or timeout."""
+
+
+class VirtualTV:
+    """One simulated TV — the per-device counterpart of DEVICE_ID and SESSION_ID."""
+
+    def __init__(self, index):
+        self.index = index
+        self.device_id = f"test-{index:04d}-{uuid.uuid4().hex[:12]}"
+        self.user_id = None
+        self.token = None
+        self.session_id = None
+
+    def headers(self):
+        return make_headers(self.user_id, self.token, self.device_id)
+
+
+class FleetStats:
+    """Per-step latencies and failures collected from every virtual TV."""
+
+    def __init__(self):
+        self.latencies = {step: [] for step in STEP_NAMES}  # successful calls only
+        self.errors = {step: 0 for step in STEP_NAMES}
+        self.first_error = {}
+        self.completed = 0
+        self.aborted = 0
+
+    def record(self, step, elapsed, error=None):
+        if error is None:
+            self.latencies[step].append(elapsed)
+        else:
+            self.errors[step] += 1
+            self.first_error.setdefault(step, f"{type(error).__name__}: {error}")
+
+    def print_report(self, clients, ramp, wall):
+        print(f"\n=== Fleet report: {clients} clients, ramp {ramp:g}s, wall time {wall:.1f}s ===")
+        print(f"  Clients completed: {self.completed}, aborted in steps 1-4: {self.aborted}\n")
+        print(f"  {'Step':<24}{'calls':>7}{'errors':>8}{'err%':>7}"
+              f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+        for step in STEP_NAMES:
+            errors = self.errors[step]
+            calls = len(self.latencies[step]) + errors
+            if not calls:
+                continue
+            summary = latency_summary(self.latencies[step])
+            print(f"  {step:<24}{calls:>7}{errors:>8}{100 * errors / calls:>6.1f}%"
+                  f"{format_ms(summary['p50']):>9}{format_ms(summary['p95']):>9}"
+                  f"{format_ms(summary['p99']):>9}{format_ms(summary['max']):>9}")
+        if self.first_error:
+            print(f"\n  First error per step:")
+            for step in STEP_NAMES:
+                if step in self.first_error:
+                    print(f"    {step}: {self.first_error[step]}")
+
+
+@contextlib.asynccontextmanager
+async def fleet_step(stats, step):
+    """Time one step of one virtual TV; failures are recorded and re-raised."""
+    start = time.perf_counter()
+    try:
+        with probe_step(step):
+            yield
+    except Exception as e:
+        stats.record(step, time.perf_counter() - start, e)
+        raise
+    stats.record(step, time.perf_counter() - start)
+
+
+async def fleet_http(session, method, url, expect=(200,), **kwargs):
+    """Run one blocking requests call on the loop's executor and check its status code."""
+    resp = await asyncio.to_thread(session.request, method, url, timeout=10, **kwargs)
+    if resp.status_code not in expect:
+        raise ProbeError(f"HTTP {resp.status_code} from {method} {urlsplit(url).path}")
+    return resp
+
+
+async def fleet_authenticate(tv, session, base_url, username, password):
+    """Step 3 for one virtual TV: fills in its token, user id and session id."""
+    resp = await fleet_http(session, "POST", f"{base_url}/emby/Users/AuthenticateByName?format=json",
+                            data=json.dumps({"Username": username, "Pw": password}),
+                            headers=make_headers(device_id=tv.device_id))
+    data = resp.json()
+    tv.token = data.get("AccessToken")
+    tv.user_id = data["User"]["Id"]
+    tv.session_id = data.get("SessionInfo", {}).get("Id")
+    if not tv.token:
+        raise ProbeError("no AccessToken in response")
+
+
+async def wait_for_message(ws, message_type, timeout):
+    """Read socket frames until one with the given MessageType arrives, like RemoteControl.onMessage."""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ProbeError(f"no {message_type} message within {timeout}s")
+        try:
+            frame = await asyncio.wait_for(ws.recv(), remaining)
+        except asyncio.TimeoutError:
+            raise ProbeError(f"no {message_type} message within {timeout}s") from None
+        parsed = json.loads(frame)
+        if parsed.get("MessageType") == message_type:
+            return parsed
+
+
+async def fleet_remote_commands(tv, session, base_url, ws):
+    """Step 6 for one virtual TV: every remote command must arrive on its own socket."""
+    if not tv.session_id:
+        resp = await fleet_http(session, "GET", f"{base_url}/emby/Sessions?format=json", headers=tv.headers())
+        tv.session_id = next((s["Id"] for s in resp.json() if s.get("DeviceId") == tv.device_id), None)
+        if not tv.session_id:
+            raise ProbeError("no session found for this device")
+
+    commands = build_remote_commands(tv.session_id)
+    items_url = f"{base_url}/emby/Users/{tv.user_id}/Items?format=json&IncludeItemTypes=Movie,Episode&Recursive=true&Limit=1"
+    items = (await fleet_http(session, "GET", items_url, headers=tv.headers())).json().get("Items", [])
+    if items:
+        commands.insert(0, build_play_command(tv.session_id, items[0]))
+
+    for desc, method, path, body, expected_type in commands:
+        await fleet_http(session, method, base_url + path, expect=(200, 204), headers=tv.headers(),
+                         data=json.dumps(body) if body else None)
+        await wait_for_message(ws, expected_type, timeout=3)
+
+
+async def fleet_remote_control(tv, session, base_url, stats):
+    """Steps 5-6: keep the socket open like the TV does and deliver the remote commands over it."""
+    import websockets
+
+    try:
+        async with fleet_step(stats, "step5_websocket"):
+            ws = await asyncio.wait_for(
+                websockets.connect(socket_url(base_url, tv.token, tv.device_id), close_timeout=5, **socket_options()), 10)
+            await ws.send(json.dumps({"MessageType": "KeepAlive"}))
+    except Exception:
+        return  # already recorded; step 6 needs the socket
+
+    try:
+        async with fleet_step(stats, "step6_remote_commands"):
+            await fleet_remote_commands(tv, session, base_url, ws)
+    except Exception:
+        pass
+    finally:
+        await ws.close()
+
+
+async def fleet_quick_connect(tv, session, base_url):
+    headers = tv.headers()
+    resp = await fleet_http(session, "GET", f"{base_url}/emby/QuickConnect/Enabled", headers=headers)
+    if resp.json():
+        resp = await fleet_http(session, "POST", f"{base_url}/emby/QuickConnect/Initiate", headers=headers)
+        if not resp.json().get("Code"):
+            raise ProbeError("Quick Connect Initiate returned no code")
+
+
+async def fleet_syncplay(tv, session, base_url):
+    headers = tv.headers()
+    await fleet_http(session, "GET", f"{base_url}/emby/SyncPlay/List", headers=headers)
+    await fleet_http(session, "POST", f"{base_url}/emby/SyncPlay/New", expect=(200, 204), headers=headers,
+                     data=json.dumps({"GroupName": f"Test Group (Orsay fleet {tv.index})"}))
+    await fleet_http(session, "POST", f"{base_url}/emby/SyncPlay/Leave", expect=(200, 204), headers=headers)
+
+
+async def fleet_trickplay(tv, session, base_url):
+    items_url = f"{base_url}/emby/Users/{tv.user_id}/Items?format=json&IncludeItemTypes=Movie,Episode&Recursive=true&Limit=5&Fields=Trickplay"
+    await fleet_http(session, "GET", items_url, headers=tv.headers())
+
+
+async def fleet_client_flow(tv, session, base_url, username, password, stats, with_socket,
+                            authenticate=fleet_authenticate):
+    """Steps 1-9 for one virtual TV without output. A failure in steps 1-4 stops this TV,
+    the same way main() exits; later steps are independent."""
+    PROBE_DEVICE.set(tv.device_id)
+    try:
+        async with fleet_step(stats, "step1_connection"):
+            resp = await fleet_http(session, "GET", f"{base_url}/emby/System/Info/Public?format=json",
+                                    headers={"Content-Type": "application/json"})
+            info = resp.json()
+
+        async with fleet_step(stats, "step2_version"):
+            if parse_version(info.get("Version", "0.0.0")) < parse_version(REQUIRED_SERVER_VERSION):
+                raise ProbeError(f"server version {info.get('Version')} is older than {REQUIRED_SERVER_VERSION}")
+
+        async with fleet_step(stats, "step3_authenticate"):
+            await authenticate(tv, session, base_url, username, password)
+
+        async with fleet_step(stats, "step4_capabilities"):
+            await fleet_http(session, "POST", f"{base_url}/emby/Sessions/Capabilities/Full", expect=(200, 204),
+                             data=json.dumps(CAPABILITIES), headers=tv.headers())
+    except Exception:
+        stats.aborted += 1
+        return
+
+    if with_socket:
+        await fleet_remote_control(tv, session, base_url, stats)
+
+    for step, run in (
+        ("step7_quick_connect", fleet_quick_connect),
+        ("step8_syncplay", fleet_syncplay),
+        ("step9_trickplay", fleet_trickplay),
+    ):
+        try:
+            async with fleet_step(stats, step):
+                await run(tv, session, base_url)
+        except Exception:
+            pass  # already recorded
+    stats.completed += 1
+
+
+def run_fleet(base_url, username, password, clients, ramp):
+    """Run the full flow for `clients` virtual TVs, started evenly over `ramp` seconds."""
+    try:
+        import websockets  # noqa: F401
+        with_socket = True
+    except ImportError:
+        with_socket = False
+
+    print(f"=== Jellyfin Orsay TV Fleet Simulation ===")
+    print(f"Server:    {base_url}")
+    print(f"Client:    {CLIENT_NAME} {APP_VERSION}")
+    print(f"Clients:   {clients} virtual TVs, ramp {ramp:g}s")
+    if not with_socket:
+        print(f"  (Steps 5-6 SKIPPED — install websockets: pip3 install websockets)")
+
+    stats = FleetStats()
+
+    async def run_client(tv):
+        await asyncio.sleep(ramp * tv.index / clients)
+        session = make_pooled_session(1)
+        try:
+            await fleet_client_flow(tv, session, base_url, username, password, stats, with_socket)
+        finally:
+            session.close()
+
+    async def run_all():
+        # One worker per TV: each TV has at most one request in flight, like the TV's synchronous XHR.
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=clients))
+        await asyncio.gather(*(run_client(VirtualTV(i)) for i in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    stats.print_report(clients, ramp, time.perf_counter() - started)
+
+
+# --- Playback progress soak (--progress-soak) ---
+
+# Server.videoStarted / videoTime / videoPaused / videoStopped
+PROGRESS_REPORTS = {
+    "started": "/Sessions/Playing",
+    "progress": "/Sessions/Playing/Progress",
+    "paused": "/Sessions/Playing/Progress",
+    "stopped": "/Sessions/Playing/Stopped",
+}
+
+
+def progress_body(item_id, media_source_id, position_ticks, paused, play_method):
+    """The body the TV posts. Server.js concatenates ItemId, MediaSourceId and PlayMethod without
+    quotes, which is not valid JSON; this sends what it means to send."""
+    return json.dumps({
+        "QueueableMediaTypes": ["Video"], "CanSeek": True, "ItemId": item_id, "MediaSourceId": media_source_id,
+        "IsPaused": paused, "IsMuted": False, "PositionTicks": position_ticks, "PlayMethod": play_method,
+    })
+
+
+class SoakStats:
+    """Accept latency, errors and scheduler drift per report type, plus a rolling window for progress lines."""
+
+    def __init__(self):
+        self.latencies = {kind: [] for kind in PROGRESS_REPORTS}
+        self.errors = {kind: 0 for kind in PROGRESS_REPORTS}
+        self.first_error = None
+        self.drift = []
+        self.missed = 0
+        self.window = []  # (latency or None, drift) since the last progress line
+
+    def record(self, kind, latency, drift, error=None):
+        if error is None:
+            self.latencies[kind].append(latency)
+        else:
+            self.errors[kind] += 1
+            self.first_error = self.first_error or f"{kind}: {type(error).__name__}: {error}"
+        if drift is not None:
+            self.drift.append(drift)
+        self.window.append((None if error else latency, drift))
+
+    def print_window(self, elapsed, seconds, offered):
+        window, self.window = self.window, []
+        latencies = [latency for latency, _ in window if latency is not None]
+        errors = len(window) - len(latencies)
+        summary = latency_summary(latencies)
+        drift = latency_summary([d for _, d in window if d is not None])
+        print(f"  {elapsed:>6.0f}s{len(window) / seconds:>9.1f}{offered:>9.1f}{format_ms(summary['p50']):>9}"
+              f"{format_ms(summary['p99']):>9}{errors:>8}{100 * errors / max(len(window), 1):>6.1f}%"
+              f"{format_ms(drift['p99']):>10}")
+
+
+async def soak_session(tv, session, base_url, items, interval, deadline, stats, rng):
+    """One TV watching items back to back: started, a progress report every `interval` seconds on an
+    absolute schedule (so slow replies do not stretch it), occasional pauses, stopped."""
+    loop = asyncio.get_running_loop()
+    headers = tv.headers()
+
+    async def send(kind, item, position, drift, record=True):
+        sources = item.get("MediaSources") or [{}]
+        body = progress_body(item["Id"], sources[0].get("Id", item["Id"]), position,
+                             kind == "paused", "Transcode")
+        started = time.perf_counter()
+        try:
+            await fleet_http(session, "POST", base_url + "/emby" + PROGRESS_REPORTS[kind], expect=(200, 204),
+                             data=body, headers=headers)
+        except Exception as e:
+            if record:
+                stats.record(kind, time.perf_counter() - started, drift, e)
+        else:
+            if record:
+                stats.record(kind, time.perf_counter() - started, drift)
+
+    # Stagger the first tick so N sessions do not report in lockstep.
+    next_tick = loop.time() + rng.uniform(0, interval)
+    while loop.time() < deadline:
+        item = rng.choice(items)
+        runtime = item.get("RunTimeTicks") or 30 * 60 * 10_000_000
+        position = rng.randrange(runtime // 2)
+        ticks_left = rng.randint(5, 30)
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        await send("started", item, 0, None)
+        paused_for = 0
+        while ticks_left and loop.time() < deadline:
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            drift = loop.time() - next_tick
+            if drift >= interval:
+                # Fell a whole interval behind: skip the missed ticks rather than bursting to catch up.
+                skipped = int(drift // interval)
+                stats.missed += skipped
+                next_tick += skipped * interval
+            if paused_for:
+                paused_for -= 1
+                continue
+            position += int(interval * 10_000_000)
+            if rng.random() < 0.02:
+                paused_for = rng.randint(1, 5)
+                await send("paused", item, position, drift)
+            else:
+                await send("progress", item, position, drift)
+            ticks_left -= 1
+        # Every TV stops at the deadline at once; that burst is teardown, not load, so it is not recorded.
+        await send("stopped", item, position, None, record=not ticks_left)
+
+
+def run_progress_soak(base_url, username, password, sessions, ramp, duration, interval, window):
+    """Hold `sessions` playback sessions reporting progress for `duration` seconds."""
+    print(f"=== Jellyfin Orsay TV Playback Progress Soak ===")
+    print(f"Server:    {base_url}")
+    print(f"Sessions:  {sessions} playing TVs, ramp {ramp:g}s, progress every {interval:g}s, {duration:g}s run")
+    print(f"  (Server.js sends these bodies with unquoted ItemId/MediaSourceId/PlayMethod — invalid JSON;"
+          f" the soak sends valid JSON)")
+
+    stats = SoakStats()
+    tvs = [VirtualTV(i) for i in range(sessions)]
+    offered = sessions / interval
+
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=sessions))
+        http = {tv.device_id: make_pooled_session(1) for tv in tvs}
+        login_errors = []
+
+        async def login(tv):
+            await asyncio.sleep(ramp * tv.index / sessions)
+            PROBE_DEVICE.set(tv.device_id)
+            try:
+                with probe_step("soak_login"):
+                    await fleet_authenticate(tv, http[tv.device_id], base_url, username, password)
+            except Exception as e:
+                login_errors.append(f"{type(e).__name__}: {e}")
+
+        await asyncio.gather(*(login(tv) for tv in tvs))
+        ready = [tv for tv in tvs if tv.token]
+        print(f"\n  Logged in {len(ready)}/{sessions} TVs" + (f" — first error: {login_errors[0]}" if login_errors else ""))
+        if not ready:
+            return
+        resp = await fleet_http(http[ready[0].device_id], "GET",
+                                f"{base_url}/emby/Users/{ready[0].user_id}/Items?format=json&IncludeItemTypes=Movie,Episode"
+                                f"&Recursive=true&Limit=100&Fields=MediaSources", headers=ready[0].headers())
+        items = resp.json().get("Items") or []
+        if not items:
+            print(f"  SKIP — No video items in the library.")
+            return
+
+        print(f"\n  {'elapsed':>7}{'sent/s':>9}{'offered':>9}{'p50':>9}{'p99':>9}{'errors':>8}{'err%':>7}"
+              f"{'drift p99':>10}  (ms)")
+        deadline = loop.time() + duration
+
+        async def run_session(tv):
+            PROBE_DEVICE.set(tv.device_id)
+            with probe_step("soak_progress"):
+                await soak_session(tv, http[tv.device_id], base_url, items, interval, deadline, stats,
+                                   random.Random(tv.index))
+
+        async def progress_lines():
+            started = loop.time()
+            while True:
+                await asyncio.sleep(window)
+                stats.print_window(loop.time() - started, window, offered * len(ready) / sessions)
+
+        printer = asyncio.create_task(progress_lines())
+        await asyncio.gather(*(run_session(tv) for tv in ready))
+        printer.cancel()
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    wall = time.perf_counter() - started
+
+    sent = sum(len(v) for v in stats.latencies.values()) + sum(stats.errors.values())
+    if not sent:
+        return
+    errors = sum(stats.errors.values())
+    print(f"\n=== Soak report: {sent} reports in {wall:.0f}s, {errors} errors ({100 * errors / sent:.2f}%) ===\n")
+    print_latency_header("Accept latency (ms)")
+    for kind, path in PROGRESS_REPORTS.items():
+        if stats.latencies[kind] or stats.errors[kind]:
+            print_latency_row(f"{kind:<9}POST {path}", stats.latencies[kind])
+    print_latency_row("Scheduler drift", stats.drift)
+    if stats.first_error:
+        print(f"\n  First error: {stats.first_error}")
+    drift_p99 = percentile(stats.drift, 99) or 0
+    if stats.missed or drift_p99 > interval / 10:
+        print(f"\n  DRIFT — reports ran late (p99 {drift_p99 * 1000:.0f}ms, {stats.missed} ticks skipped): "
+              f"the client or the server's accept latency is limiting the rate, "
+              f"so the offered {offered:.0f} reports/s was not held.")
+    else:
+        print(f"\n  Held {offered:.1f} reports/s on schedule (drift p99 {drift_p99 * 1000:.1f}ms).")
+
+
+# --- WebSocket soak (--socket-soak) ---
+
+def rss_mb():
+    """Current resident set size; falls back to the peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def raise_fd_limit(needed):
+    """Raise the soft open-file limit towards `needed`; returns the resulting limit (None if unknown)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        with contextlib.suppress(ValueError, OSError):
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+    return soft
+
+
+class SocketSoakStats:
+    """Socket states across the soak, handshake latency and the reconnect storm timeline."""
+
+    def __init__(self):
+        self.open = 0
+        self.connecting = 0
+        self.waiting = 0  # in RemoteControl.scheduleReconnect's delay
+        self.gave_up = 0
+        self.failed = 0
+        self.first_error = None
+        self.keepalives = 0
+        self.accept = {"connect": [], "reconnect": [], "storm": []}
+        self.window = []
+        self.storm_started = None
+
+    def accepted(self, kind, seconds):
+        if self.storm_started is not None and kind == "reconnect":
+            kind = "storm"
+        self.accept[kind].append(seconds)
+        self.window.append(seconds)
+
+    def failure(self, error):
+        self.failed += 1
+        self.first_error = self.first_error or f"{type(error).__name__}: {error}"
+
+    def print_window(self, elapsed):
+        window, self.window = self.window, []
+        summary = latency_summary(window)
+        print(f"  {elapsed:>6.0f}s{self.open:>7}{self.connecting:>7}{self.waiting:>8}{self.gave_up:>8}"
+              f"{self.failed:>8}{self.keepalives:>11}{summary['count']:>9}{format_ms(summary['p99']):>9}")
+
+
+async def soak_socket(tv, base_url, stats, sockets, keepalive, delay, jitter, max_attempts, deadline, rng):
+    """RemoteControl.connect() for one TV until the deadline: KeepAlive every `keepalive` seconds
+    (or the ForceKeepAlive interval), and on close a reconnect after `delay` seconds, at most
+    `max_attempts` times in a row."""
+    import websockets
+
+    loop = asyncio.get_running_loop()
+    url = socket_url(base_url, tv.token, tv.device_id)
+    attempts = 0
+    kind = "connect"
+    while loop.time() < deadline:
+        stats.connecting += 1
+        started = time.perf_counter()
+        try:
+            # The TV's WebSocket has no protocol-level pings; only the KeepAlive messages below.
+            ws = await websockets.connect(url, ping_interval=None, close_timeout=1, open_timeout=30,
+                                          **socket_options())
+        except Exception as e:
+            stats.connecting -= 1
+            stats.failure(e)
+        else:
+            stats.connecting -= 1
+            stats.accepted(kind, time.perf_counter() - started)
+            kind, attempts = "reconnect", 0
+            stats.open += 1
+            sockets.add(ws)
+            try:
+                interval = keepalive
+                next_keepalive = loop.time() + interval
+                while True:
+                    now = loop.time()
+                    if now >= deadline:
+                        await ws.close()
+                        return
+                    if now >= next_keepalive:
+                        await ws.send('{"MessageType": "KeepAlive"}')
+                        stats.keepalives += 1
+                        next_keepalive += interval
+                        continue
+                    try:
+                        message = await asyncio.wait_for(ws.recv(), min(next_keepalive, deadline) - now)
+                    except asyncio.TimeoutError:
+                        continue
+                    with contextlib.suppress(ValueError):
+                        parsed = json.loads(message)
+                        if parsed.get("MessageType") == "ForceKeepAlive" and parsed.get("Data"):
+                            interval = parsed["Data"]  # RemoteControl.startKeepAlive(data) restarts the timer
+                            next_keepalive = loop.time() + interval
+            except websockets.ConnectionClosed:
+                pass
+            finally:
+                stats.open -= 1
+                sockets.discard(ws)
+        # onclose → scheduleReconnect()
+        if attempts >= max_attempts:
+            stats.gave_up += 1
+            return
+        attempts += 1
+        stats.waiting += 1
+        await asyncio.sleep(delay * (1 + rng.uniform(-jitter, jitter)))
+        stats.waiting -= 1
+
+
+def run_socket_soak(base_url, username, password, clients, ramp, duration, window, keepalive, delay, jitter,
+                    max_attempts, storm_at):
+    """Keep `clients` remote-control sockets open in one event loop, optionally dropping them all at once."""
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        print(f"[Socket soak] SKIPPED (install websockets: pip3 install websockets)")
+        return
+
+    limit = raise_fd_limit(clients * 2 + 256)
+    print(f"=== Jellyfin Orsay TV WebSocket Soak ===")
+    print(f"Server:    {base_url}")
+    print(f"Sockets:   {clients} TVs, ramp {ramp:g}s, {duration:g}s run, KeepAlive every {keepalive:g}s, "
+          f"reconnect after {delay:g}s" + (f" ±{jitter:.0%}" if jitter else "") + f" up to {max_attempts} times")
+    if limit is not None and limit < clients + 64:
+        print(f"  WARNING — open file limit is {limit}; raise it (ulimit -n) to hold {clients} sockets")
+
+    stats = SocketSoakStats()
+    sockets = set()
+    tvs = [VirtualTV(i) for i in range(clients)]
+    memory = {"before": rss_mb()}
+    storm = {}
+
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=min(clients, 64)))
+        http_session = make_pooled_session(min(clients, 64))
+        started = loop.time()
+        deadline = started + ramp + duration
+
+        async def run_tv(tv):
+            await asyncio.sleep(ramp * tv.index / clients)
+            PROBE_DEVICE.set(tv.device_id)
+            try:
+                with probe_step("soak_login"):
+                    await fleet_authenticate(tv, http_session, base_url, username, password)
+            except Exception as e:
+                stats.failure(e)
+                return
+            with probe_step("soak_socket"):
+                await soak_socket(tv, base_url, stats, sockets, keepalive, delay, jitter, max_attempts,
+                                  deadline, random.Random(tv.index))
+
+        async def monitor():
+            next_line = started + window
+            while True:
+                await asyncio.sleep(0.05)
+                now = loop.time()
+                if "open" not in memory and stats.open == clients:
+                    memory["open"] = rss_mb()
+                if storm_at is not None and "at" not in storm and now - started >= ramp + storm_at:
+                    storm.update(at=now, open=stats.open, gave_up=stats.gave_up)
+                    stats.storm_started = now
+                    print(f"  --- dropping {stats.open} sockets at once ---")
+                    for ws in list(sockets):
+                        ws.transport.abort()
+                # Settled once every dropped socket has reconnected or given up.
+                if "at" in storm and "settled" not in storm \
+                        and len(stats.accept["storm"]) + stats.gave_up - storm["gave_up"] >= storm["open"]:
+                    storm["settled"] = now
+                    stats.storm_started = None
+                    print(f"  --- reconnect storm settled in {now - storm['at']:.2f}s ---")
+                if now >= next_line:
+                    stats.print_window(now - started)
+                    next_line += window
+
+        print(f"\n  {'elapsed':>7}{'open':>7}{'conn':>7}{'backoff':>8}{'gaveup':>8}{'failed':>8}{'keepalives':>11}"
+              f"{'accepts':>9}{'p99 ms':>9}")
+        watcher = asyncio.create_task(monitor())
+        await asyncio.gather(*(run_tv(tv) for tv in tvs))
+        watcher.cancel()
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    wall = time.perf_counter() - started
+
+    print(f"\n=== Socket soak report: {clients} TVs, wall time {wall:.0f}s ===\n")
+    print_latency_header("Handshake accept latency (ms)")
+    print_latency_row("First connect", stats.accept["connect"])
+    print_latency_row("Reconnect (outside storm)", stats.accept["reconnect"])
+    if storm:
+        print_latency_row("Reconnect during storm", stats.accept["storm"])
+    print(f"\n  Failed connects: {stats.failed}, gave up after {max_attempts} attempts: {stats.gave_up}, "
+          f"KeepAlives sent: {stats.keepalives}")
+    if stats.first_error:
+        print(f"  First error: {stats.first_error}")
+    if storm:
+        settled = f"{storm['settled'] - storm['at']:.2f}s" if "settled" in storm else "did not settle before the end"
+        print(f"  Reconnect storm: {storm['open']} sockets dropped, settled in {settled}")
+    if "open" in memory and memory["before"] is not None:
+        per_socket = (memory["open"] - memory["before"]) * 1024 / clients
+        note = " (includes the in-process stand-in's side)" if "jellyfin_standin" in sys.modules else ""
+        print(f"  Client memory: {memory['open'] - memory['before']:.1f} MB for {clients} open sockets, "
+              f"{per_socket:.1f} KB per connection{note}")
+
+
+# --- SyncPlay fan-out (--syncplay-clients) ---
+
+SYNCPLAY_ROUNDS = ("Pause", "Unpause", "Seek")
+
+
+def parse_when(value):
+    """Jellyfin's ISO-8601 UTC timestamps (7 fractional digits) as an aware datetime, or None."""
+    if not value:
+        return None
+    match = re.match(r"(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?", value)
+    if not match:
+        return None
+    micros = int((match.group(2) or "0")[:6].ljust(6, "0"))
+    return datetime.strptime(match.group(1), "%Y-%m-%dT%H:%M:%S").replace(microsecond=micros, tzinfo=timezone.utc)
+
+
+async def syncplay_member_socket(tv, base_url, inbox):
+    """Open a member's socket and queue every SyncPlay message with its arrival time."""
+    import websockets
+
+    ws = await websockets.connect(socket_url(base_url, tv.token, tv.device_id), ping_interval=None, close_timeout=2,
+                                  **socket_options())
+
+    async def read():
+        with contextlib.suppress(websockets.ConnectionClosed):
+            async for message in ws:
+                arrived, wall = time.perf_counter(), datetime.now(timezone.utc)
+                with contextlib.suppress(ValueError):
+                    parsed = json.loads(message)
+                    if parsed.get("MessageType", "").startswith("SyncPlay"):
+                        inbox.put_nowait((parsed, arrived, wall))
+
+    return ws, asyncio.create_task(read())
+
+
+async def next_syncplay(inbox, message_type, predicate, timeout):
+    """Skip queued messages until one of message_type whose Data satisfies predicate arrives."""
+    deadline = time.monotonic() + timeout
+    while True:
+        parsed, arrived, wall = await asyncio.wait_for(inbox.get(), max(0.0, deadline - time.monotonic()))
+        if parsed.get("MessageType") == message_type and predicate(parsed.get("Data") or {}):
+            return parsed.get("Data") or {}, arrived, wall
+
+
+def run_syncplay_fanout(base_url, username, password, clients, rounds, interval):
+    """N TVs in one SyncPlay group; the first issues pause/unpause/seek and every member's receipt is timed."""
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        print(f"[SyncPlay fan-out] SKIPPED (install websockets: pip3 install websockets)")
+        return
+
+    print(f"=== Jellyfin Orsay TV SyncPlay Fan-out ===")
+    print(f"Server:    {base_url}")
+    print(f"Members:   {clients} TVs in one group, {rounds} rounds of {'/'.join(SYNCPLAY_ROUNDS)}")
+    print(f"  (The TV never calls SyncPlay.signalReady; members here post /SyncPlay/Ready after a Seek,"
+          f" as a player must for the group to leave Waiting)")
+
+    delivery = {command: [] for command in SYNCPLAY_ROUNDS}
+    spread = {command: [] for command in SYNCPLAY_ROUNDS}
+    request = {command: [] for command in SYNCPLAY_ROUNDS}
+    missed = {command: 0 for command in SYNCPLAY_ROUNDS}
+    after_when = []
+    pings = []
+    failures = {"login": [], "socket": [], "join": [], "ping": [], "command": [], "ready": []}
+
+    def keep(results, kind, *members):
+        """Members whose result is not an exception; the others are counted as `kind` failures."""
+        kept = []
+        for result, member in zip(results, zip(*members)):
+            if isinstance(result, BaseException):
+                failures[kind].append(f"{type(result).__name__}: {result}")
+            else:
+                kept.append((result, *member))
+        return kept
+
+    async def run_all():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=min(clients, 64)))
+        http_session = make_pooled_session(min(clients, 64))
+        tvs = [VirtualTV(i) for i in range(clients)]
+        logins = await asyncio.gather(*(fleet_authenticate(tv, http_session, base_url, username, password)
+                                        for tv in tvs), return_exceptions=True)
+        tvs = [tv for _, tv in keep(logins, "login", tvs)]
+        inboxes = [asyncio.Queue() for _ in tvs]
+        opened = await asyncio.gather(*(syncplay_member_socket(tv, base_url, inbox) for tv, inbox in zip(tvs, inboxes)),
+                                      return_exceptions=True)
+        members = keep(opened, "socket", tvs, inboxes)
+        sockets = [socket_pair for socket_pair, _, _ in members]
+        tvs = [tv for _, tv, _ in members]
+        inboxes = [inbox for _, _, inbox in members]
+        if not tvs:
+            print("\n  FAIL — No member could log in and open its socket")
+            return
+        leader = tvs[0]
+        try:
+            with probe_step("syncplay_join"):
+                try:
+                    await fleet_http(http_session, "POST", f"{base_url}/emby/SyncPlay/New", expect=(200, 204),
+                                     headers=leader.headers(), data=json.dumps({"GroupName": "Orsay fan-out"}))
+                    joined, _, _ = await next_syncplay(inboxes[0], "SyncPlayGroupUpdate",
+                                                       lambda d: d.get("Type") == "GroupJoined", 10)
+                except Exception as e:
+                    print(f"\n  FAIL — The leader could not create the group: {type(e).__name__}: {e}")
+                    return
+                group_id = joined.get("GroupId")
+
+                async def join(tv, inbox):
+                    await fleet_http(http_session, "POST", f"{base_url}/emby/SyncPlay/Join", expect=(200, 204),
+                                     headers=tv.headers(), data=json.dumps({"GroupId": group_id}))
+                    await next_syncplay(inbox, "SyncPlayGroupUpdate", lambda d: d.get("Type") == "GroupJoined", 10)
+
+                async def ping(tv):
+                    # SyncPlay.measurePing() right after joining
+                    started = time.perf_counter()
+                    await fleet_http(http_session, "POST", f"{base_url}/emby/SyncPlay/Ping", expect=(200, 204),
+                                     headers=tv.headers(), data=json.dumps({"Ping": 0}))
+                    pings.append(time.perf_counter() - started)
+
+                joins = await asyncio.gather(*(join(tv, inbox) for tv, inbox in zip(tvs[1:], inboxes[1:])),
+                                             return_exceptions=True)
+                # Members that failed to join get no group commands; leave them out of the delivery timings.
+                joined_members = [(leader, inboxes[0])] + [(tv, inbox) for _, tv, inbox in
+                                                            keep(joins, "join", tvs[1:], inboxes[1:])]
+                group_tvs = [tv for tv, _ in joined_members]
+                group_inboxes = [inbox for _, inbox in joined_members]
+                keep(await asyncio.gather(*(ping(tv) for tv in group_tvs), return_exceptions=True), "ping", group_tvs)
+            print(f"\n  Group {group_id}: {len(group_tvs)} of {clients} members joined")
+
+            position = 0
+            for round_number in range(rounds):
+                command = SYNCPLAY_ROUNDS[round_number % len(SYNCPLAY_ROUNDS)]
+                for inbox in group_inboxes:
+                    while not inbox.empty():
+                        inbox.get_nowait()
+                body = None
+                if command == "Seek":
+                    position += 30 * 10_000_000  # GuiPlayer's +30 s skip
+                    body = json.dumps({"PositionTicks": position})
+                with probe_step(f"syncplay_{command.lower()}"):
+                    sent = time.perf_counter()
+                    try:
+                        await fleet_http(http_session, "POST", f"{base_url}/emby/SyncPlay/{command}",
+                                         expect=(200, 204), headers=leader.headers(), data=body)
+                    except Exception as e:
+                        failures["command"].append(f"{command}: {type(e).__name__}: {e}")
+                        await asyncio.sleep(interval)
+                        continue
+                    request[command].append(time.perf_counter() - sent)
+                    arrivals = await asyncio.gather(
+                        *(next_syncplay(inbox, "SyncPlayCommand", lambda d: d.get("Command") == command, 5)
+                          for inbox in group_inboxes), return_exceptions=True)
+                received = [a for a in arrivals if not isinstance(a, Exception)]
+                missed[command] += len(arrivals) - len(received)
+                delivery[command] += [arrived - sent for _, arrived, _ in received]
+                if len(received) > 1:
+                    spread[command].append(max(a for _, a, _ in received) - min(a for _, a, _ in received))
+                for data, _, wall in received:
+                    when = parse_when(data.get("When"))
+                    if when is not None and command == "Unpause":
+                        after_when.append((wall - when).total_seconds())
+                if command == "Seek":
+                    ready = json.dumps({"When": datetime.now(timezone.utc).isoformat(), "PositionTicks": position,
+                                        "IsPlaying": False, "PlaylistItemId": "0"})
+                    readies = await asyncio.gather(*(fleet_http(http_session, "POST", f"{base_url}/emby/SyncPlay/Ready",
+                                                                expect=(200, 204), headers=tv.headers(), data=ready)
+                                                     for tv in group_tvs), return_exceptions=True)
+                    keep(readies, "ready", group_tvs)
+                await asyncio.sleep(interval)
+            return True
+        finally:
+            with contextlib.suppress(Exception):
+                await asyncio.gather(*(fleet_http(http_session, "POST", f"{base_url}/emby/SyncPlay/Leave",
+                                                  expect=(200, 204), headers=tv.headers()) for tv in tvs))
+            for ws, reader in sockets:
+                await ws.close()
+                reader.cancel()
+
+    completed = asyncio.run(run_all())
+    for kind, errors in failures.items():
+        if errors:
+            print(f"  FAILED {kind}: {len(errors)} (first: {errors[0]})")
+    if not completed:
+        return
+
+    print()
+    print_latency_header("SyncPlay timings (ms)")
+    print_latency_row("SyncPlay/Ping round trip", pings)
+    for command in SYNCPLAY_ROUNDS:
+        if not request[command]:
+            continue
+        print_latency_row(f"{command}: leader POST", request[command])
+        print_latency_row(f"{command}: delivery to each member", delivery[command])
+        print_latency_row(f"{command}: spread first→last member", spread[command])
+    if after_when:
+        late = [seconds for seconds in after_when if seconds > 0]
+        print(f"\n  Unpause: {len(late)}/{len(after_when)} deliveries arrived after the scheduled When "
+              f"(worst {max(after_when) * 1000:.0f}ms; assumes synchronised clocks — the TV never sets timeDiff)")
+    lost = sum(missed.values())
+    if lost:
+        print(f"\n  WARNING — {lost} member deliveries not received within 5s: "
+              + ", ".join(f"{c} {n}" for c, n in missed.items() if n))
+
+
+# --- Server sweep and LAN discovery (--sweep / --discover) ---
+
+DISCOVERY_PORT = 7359
+DISCOVERY_MESSAGE = b"Who is JellyfinServer?"
+
+
+def expand_targets(specs):
+    """Server URLs for each target, as GuiPage_NewServer builds them: a bare host gets http:// and
+    port 8096, a URL is used as-is, and a CIDR range expands to every host address in it."""
+    import ipaddress
+
+    for spec in specs:
+        spec = spec.strip()
+        if not spec:
+            continue
+        if "://" in spec:
+            yield spec.rstrip("/")
+            continue
+        if "/" in spec:
+            network = ipaddress.ip_network(spec, strict=False)
+            hosts = network.hosts() if network.num_addresses > 2 else iter(network)
+            for host in hosts:
+                yield f"http://{host}:8096"
+            continue
+        yield f"http://{spec}" if re.search(r":\d+$", spec) else f"http://{spec}:8096"
+
+
+def discover_servers(address, port, timeout):
+    """Jellyfin's UDP discovery: broadcast the question and collect every answer until timeout."""
+    found = {}
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.settimeout(0.2)
+        started = time.perf_counter()
+        sock.sendto(DISCOVERY_MESSAGE, (address, port))
+        while time.perf_counter() - started < timeout:
+            try:
+                data, sender = sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            with contextlib.suppress(ValueError):
+                reply = json.loads(data)
+                url = (reply.get("Address") or f"http://{sender[0]}:8096").rstrip("/")
+                found[url] = {"name": reply.get("Name"), "id": reply.get("Id"), "from": sender[0],
+                              "elapsed": time.perf_counter() - started}
+    return found
+
+
+class SweepCache:
+    """Probe results keyed by server URL, kept for `ttl` seconds in a JSON file."""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        if ttl > 0:
+            with contextlib.suppress(OSError, ValueError):
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+
+    def get(self, url):
+        entry = self.entries.get(url)
+        if entry and time.time() - entry["checked"] < self.ttl:
+            return entry
+        return None
+
+    def put(self, url, result):
+        self.entries[url] = dict(result, checked=time.time())
+
+    def save(self):
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        fresh = {url: entry for url, entry in self.entries.items() if now - entry["checked"] < self.ttl}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(fresh, f)
+        os.replace(temp, self.path)
+
+
+def probe_server(http_session, url, timeout):
+    """Server.testConnectionSettings() for one URL, returning a cacheable result dict."""
+    started = time.perf_counter()
+    try:
+        resp = http_session.get(f"{url}/emby/System/Info/Public?format=json",
+                                headers={"Content-Type": "application/json"}, timeout=timeout)
+    except Exception as e:
+        return {"ok": False, "error": type(e).__name__, "ms": round((time.perf_counter() - started) * 1000, 1)}
+    elapsed = round((time.perf_counter() - started) * 1000, 1)
+    if resp.status_code != 200:
+        return {"ok": False, "error": f"HTTP {resp.status_code}", "ms": elapsed}
+    try:
+        info = resp.json()
+    except ValueError:
+        return {"ok": False, "error": "not a Jellyfin server", "ms": elapsed}
+    version = info.get("Version", "0.0.0")
+    return {
+        "ok": True, "ms": elapsed, "name": info.get("ServerName"), "id": info.get("Id"), "version": version,
+        "compatible": parse_version(version) >= parse_version(REQUIRED_SERVER_VERSION),
+        # ServerVersion.js compares version strings, so e.g. 10.10.x fails on the TV
+        "tv_accepts": version >= REQUIRED_SERVER_VERSION,
+    }
+
+
+def run_sweep(targets, discover, discover_address, discover_port, concurrency, timeout, cache_path, ttl):
+    """Probe many servers at once (plus any found by UDP discovery), skipping ones cached within ttl."""
+    print(f"=== Jellyfin Orsay Server Sweep ===")
+    urls = list(dict.fromkeys(expand_targets(targets)))
+    discovered = {}
+    if discover:
+        print(f"\n[Discovery] UDP '{DISCOVERY_MESSAGE.decode()}' to {discover_address}:{discover_port}")
+        try:
+            discovered = discover_servers(discover_address, discover_port, 2.0)
+        except OSError as e:
+            print(f"  FAIL — {e}")
+        for url, found in discovered.items():
+            print(f"  {found['from']:<16} {found['name'] or '?':<24} {url}  ({found['elapsed'] * 1000:.0f}ms)")
+        if not discovered:
+            print(f"  No servers answered.")
+        urls += [url for url in discovered if url not in urls]
+    if not urls:
+        return
+
+    cache = SweepCache(cache_path, ttl)
+    pending = [url for url in urls if cache.get(url) is None]
+    print(f"\n[Sweep] {len(urls)} targets, {len(urls) - len(pending)} cached (TTL {ttl:g}s), "
+          f"probing {len(pending)} with {concurrency} workers, timeout {timeout:g}s")
+
+    started = time.perf_counter()
+    http_session = make_pooled_session(4)
+    with probe_step("sweep"), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for url, result in zip(pending, pool.map(partial(probe_server, http_session, timeout=timeout), pending)):
+            cache.put(url, result)
+    wall = time.perf_counter() - started
+    cache.save()
+
+    results = [(url, cache.get(url) or cache.entries[url], url not in pending) for url in urls]
+    up = [(url, r, cached) for url, r, cached in results if r["ok"]]
+    print(f"\n  {'server':<36}{'ms':>8}  {'name':<24}{'version':<10}{'TV':<4}")
+    for url, r, cached in up:
+        tv = "ok" if r["tv_accepts"] else ("BUG" if r["compatible"] else "old")
+        print(f"  {url[:35]:<36}{r['ms']:>8.1f}  {(r['name'] or '?')[:23]:<24}{r['version']:<10}{tv:<4}"
+              + ("  (cached)" if cached else ""))
+    down = [(url, r, cached) for url, r, cached in results if not r["ok"]]
+    if down and len(down) <= 20:
+        for url, r, cached in down:
+            print(f"  {url[:35]:<36}{r['ms']:>8.1f}  {r['error']}" + ("  (cached)" if cached else ""))
+    errors = {}
+    for _, r, _ in down:
+        errors[r["error"]] = errors.get(r["error"], 0) + 1
+    print(f"\n  {len(up)} server(s) up, {len(down)} down"
+          + (f" ({', '.join(f'{n} {e}' for e, n in sorted(errors.items()))})" if errors else "")
+          + f"; swept in {wall:.2f}s")
+    if any(r["compatible"] and not r["tv_accepts"] for _, r, _ in up):
+        print(f"  BUG: the TV's string version compare (ServerVersion.js) rejects these compatible servers.")
+
+
+# --- Widget download storm (--widget-load) ---
+
+def parse_widgetlist(text):
+    """(download URL, advertised zip size) from widgetlist.xml."""
+    download = re.search(r"<download>([^<]+)</download>", text)
+    size = re.search(r'<compression size="(\d+)"', text)
+    if download is None or size is None:
+        raise ProbeError("widgetlist.xml has no " + ("<download>" if download is None else "<compression size>"))
+    return download.group(1).strip(), int(size.group(1))
+
+
+def fetch_widget(session, widgetlist_url, etag=None):
+    """What a TV does on a widget sync: read widgetlist.xml, then download the zip it points at.
+    Returns (zip bytes received, zip size advertised, zip ETag, status)."""
+    resp = session.get(widgetlist_url, timeout=30)
+    resp.raise_for_status()
+    download, advertised = parse_widgetlist(resp.text)
+    with session.get(download, timeout=60, stream=True,
+                     headers={"If-None-Match": etag} if etag else None) as zip_resp:
+        received = sum(len(chunk) for chunk in zip_resp.iter_content(1 << 16))
+        return received, advertised, zip_resp.headers.get("ETag"), zip_resp.status_code
+
+
+def check_widget_ranges(session, widgetlist_url):
+    """Resume and revalidation answers a TV relies on after an interrupted download; returns failures."""
+    received, size, etag, _ = fetch_widget(session, widgetlist_url)
+    download, _ = parse_widgetlist(session.get(widgetlist_url, timeout=30).text)
+    failures = []
+    checks = [
+        ({"Range": f"bytes={size // 2}-"}, 206, size - size // 2),
+        ({"Range": "bytes=-100"}, 206, 100),
+        ({"Range": f"bytes={size}-"}, 416, None),
+        ({"If-None-Match": etag or '"none"'}, 304, 0),
+        ({"Range": "bytes=0-9", "If-Range": '"stale"'}, 200, size),
+    ]
+    if received != size:
+        failures.append(f"full download returned {received} of {size} bytes")
+    for headers, status, length in checks:
+        resp = session.get(download, headers=headers, timeout=30)
+        if resp.status_code != status or (length is not None and len(resp.content) != length):
+            failures.append(f"{headers}: HTTP {resp.status_code}, {len(resp.content)} bytes "
+                            f"(expected {status}" + (f", {length} bytes)" if length is not None else ")"))
+    return failures
+
+
+def run_widget_load(widget_url, tvs, ramp, rounds, template, optimize=False):
+    """Simulate `tvs` TVs refetching the widget at once (started over `ramp` seconds), `rounds` times."""
+    stop = server = package = None
+    if widget_url is None:
+        import tempfile
+        import orsay_widget_server
+
+        template = template or orsay_widget_server.DEFAULT_TEMPLATE
+        with tempfile.TemporaryDirectory(prefix="orsay-bundle-") as build_root:
+            if optimize:
+                import orsay_bundle
+
+                orsay_bundle.build_optimized(template, build_root)
+                template = build_root
+            package = orsay_widget_server.WidgetPackage(template)
+        widget_url, server, stop = orsay_widget_server.start_in_thread(package)
+    widgetlist_url = widget_url.rstrip("/") + ("" if widget_url.endswith(".xml") else "/widgetlist.xml")
+
+    print("=== Jellyfin Orsay Widget Download Storm ===")
+    print(f"Server:    {widgetlist_url}" + (" (in-process)" if server else ""))
+    if package:
+        print(f"Widget:    {package.widget_id} v{package.version}{' (optimized)' if optimize else ''}, {package.file_count} files, "
+              f"{package.zip.size / 1024:.0f} KiB zip (built in {package.build_seconds * 1000:.0f} ms)")
+    print(f"TVs:       {tvs} per round, ramp {ramp:g}s, {rounds} round(s)")
+
+    import requests
+
+    raise_fd_limit(tvs * 3 + 256)  # client and in-process server sockets
+    check_session = make_pooled_session(1)
+    try:
+        failures = check_widget_ranges(check_session, widgetlist_url)
+    except (requests.RequestException, ProbeError) as e:
+        print(f"\n  FAIL — Could not fetch the widget: {type(e).__name__}: {e}")
+        if stop:
+            stop()
+        return
+    finally:
+        check_session.close()
+    print(f"\n  Range/ETag checks: " + ("OK" if not failures else f"{len(failures)} FAILED"))
+    for failure in failures:
+        print(f"    - {failure}")
+
+    rounds_done, errors, etags = [], [], set()
+    received_total = [0]
+
+    async def run_tv(index, etag, times):
+        await asyncio.sleep(ramp * index / tvs)
+        session = make_pooled_session(1)
+        started = time.perf_counter()
+        try:
+            received, size, zip_etag, status = await asyncio.to_thread(fetch_widget, session, widgetlist_url, etag)
+            if status == 200 and received != size:
+                raise ProbeError(f"short download: {received} of {size} bytes")
+            if status not in (200, 304):
+                raise ProbeError(f"HTTP {status} for the zip")
+            received_total[0] += received
+            etags.add(zip_etag)
+            times.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            session.close()
+
+    async def run_all():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=tvs))
+        for round_index in range(rounds):
+            # Later rounds model TVs that kept the zip and revalidate it with its ETag.
+            etag = next(iter(etags)) if round_index and len(etags) == 1 else None
+            times, received_before, started = [], received_total[0], time.perf_counter()
+            await asyncio.gather(*(run_tv(i, etag, times) for i in range(tvs)))
+            elapsed = time.perf_counter() - started
+            rounds_done.append(("revalidate" if etag else "full download", times, elapsed))
+            received = (received_total[0] - received_before) / 2 ** 20
+            print(f"  Round {round_index + 1}: {len(times)}/{tvs} TVs in {elapsed:.2f}s, {len(times) / elapsed:.1f} served/s, "
+                  f"{received:.1f} MiB ({received / elapsed:.0f} MiB/s)"
+                  + (f" via {'sendfile' if server.sendfile else 'mmap copy'}" if server else ""))
+
+    print()
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    wall = time.perf_counter() - started
+
+    completed = sum(len(times) for _, times, _ in rounds_done)
+    print(f"\n  {completed} downloads completed, {len(errors)} failed, "
+          f"{received_total[0] / 2 ** 20:.1f} MiB received in {wall:.2f}s ({completed / wall:.1f} served/s)\n")
+    print_latency_header("Completion time (widgetlist.xml + zip)")
+    for index, (label, times, _) in enumerate(rounds_done):
+        print_latency_row(f"round {index + 1}: {label}", times)
+    if server:
+        print(f"\n  Server responses: " + ", ".join(f"HTTP {status} ×{count}" for status, count in sorted(server.counts.items())))
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"  Peak RSS:         {peak:.0f} MiB" + (" (client and in-process server)" if server else ""))
+    if errors:
+        print(f"  First error:      {errors[0]}")
+    if stop:
+        stop()
+
+
+# --- Record and replay (--record / --replay) ---
+
+RECORDER = None  # TrafficRecorder when --record is given
+
+# Identifiers that differ between the recorded run and a replay, swapped for per-device placeholders.
+CAPTURE_PATTERNS = [
+    (re.compile(r"(?i)(api_key=)[^&\s\"]+"), r"\1{token}"),
+    (re.compile(r'(Token=")[^"]*(")'), r"\1{token}\2"),
+    (re.compile(r"(?i)(/Users/)[0-9a-f]{32}"), r"\1{user_id}"),
+    (re.compile(r"(?i)(/Sessions/)[0-9a-f]{32}"), r"\1{session_id}"),
+    (re.compile(r'("Username":\s*)"[^"]*"'), r'\1"{username}"'),
+    (re.compile(r'("Pw":\s*)"[^"]*"'), r'\1"{password}"'),
+]
+# Library ids a replay maps onto items that exist on the target server.
+ITEM_ID_PATTERN = re.compile(
+    r'(?i)((?:/Items/|/Videos/|ItemIds=|MediaSourceId=|ParentId=|"ItemId":\s*"|"MediaSourceId":\s*"))([0-9a-f]{32})')
+
+
+def carries_token(headers):
+    """True when a request sends an access token in any of the headers Jellyfin accepts."""
+    if headers.get("X-MediaBrowser-Token") or headers.get("X-Emby-Token"):
+        return True
+    return any("Token=" in (headers.get(name) or "") for name in ("Authorization", "X-Emby-Authorization"))
+
+
+class TrafficRecorder:
+    """Writes every HTTP exchange and WebSocket frame as one JSON line (gzip if PATH ends in .gz)
+    with its offset from the start of the run. Secrets and run-specific ids become placeholders."""
+
+    def __init__(self, path, run_info):
+        import gzip
+
+        self.path = path
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.count = 0
+        self.sockets = 0
+        self.stream = (gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz")
+                       else open(path, "w", encoding="utf-8"))
+        self._write(dict(run_info, k="capture", version=1, started=datetime.now(timezone.utc).isoformat()))
+
+    def _write(self, event):
+        with self.lock:
+            self.stream.write(json.dumps(event, separators=(",", ":")) + "\n")
+            self.count += 1
+
+    def template(self, text, device_id):
+        if not text:
+            return text
+        for pattern, replacement in CAPTURE_PATTERNS:
+            text = pattern.sub(replacement, text)
+        return text.replace(device_id, "{device_id}") if device_id else text
+
+    def on_response(self, resp, *args, **kwargs):
+        """requests response hook installed by make_pooled_session()."""
+        request = resp.request
+        device = PROBE_DEVICE.get() or DEVICE_ID
+        body = request.body.decode("utf-8", "replace") if isinstance(request.body, bytes) else request.body
+        parts = urlsplit(request.url)
+        elapsed = resp.elapsed.total_seconds()
+        self._write({
+            "t": round(time.perf_counter() - self.started - elapsed, 4), "k": "http", "dev": device,
+            "step": PROBE_STEP.get(), "m": request.method,
+            "u": self.template(parts.path + (f"?{parts.query}" if parts.query else ""), device),
+            "auth": carries_token(request.headers),
+            "b": self.template(body, device), "s": resp.status_code, "d": round(elapsed, 4),
+            "n": len(resp.content) if not kwargs.get("stream") else None,
+        })
+
+    def socket_event(self, conn, kind, payload=None):
+        device = PROBE_DEVICE.get() or DEVICE_ID
+        event = {"t": round(time.perf_counter() - self.started, 4), "k": f"ws_{kind}", "dev": device, "c": conn}
+        if payload is not None:
+            event["p"] = self.template(payload if isinstance(payload, str) else payload.decode("utf-8", "replace"),
+                                       device)
+        self._write(event)
+
+    def close(self):
+        with self.lock:
+            self.stream.close()
+        print(f"\nCapture written to {self.path} ({self.count} events)")
+
+
+def socket_options():
+    """Extra websockets.connect() arguments: a recording connection class when --record is on."""
+    if RECORDER is None:
+        return {}
+    from websockets.asyncio.client import ClientConnection
+
+    class RecordingConnection(ClientConnection):
+        async def handshake(self, *args, **kwargs):
+            await super().handshake(*args, **kwargs)
+            with RECORDER.lock:
+                RECORDER.sockets += 1
+                self.capture_id = RECORDER.sockets
+            RECORDER.socket_event(self.capture_id, "open", self.request.path)
+
+        async def send(self, message, *args, **kwargs):
+            RECORDER.socket_event(getattr(self, "capture_id", 0), "send", message)
+            return await super().send(message, *args, **kwargs)
+
+        async def recv(self, *args, **kwargs):
+            message = await super().recv(*args, **kwargs)
+            RECORDER.socket_event(getattr(self, "capture_id", 0), "recv", message)
+            return message
+
+        def connection_lost(self, exc):
+            if hasattr(self, "capture_id"):
+                RECORDER.socket_event(self.capture_id, "close")
+            super().connection_lost(exc)
+
+    return {"create_connection": RecordingConnection}
+
+
+def load_capture(path):
+    import gzip
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("k") != "capture":
+        raise ProbeError(f"{path} is not a capture written by --record")
+    return lines[0], lines[1:]
+
+
+def endpoint_template(method, url):
+    """GET /Users/{user_id}/Items style label for grouping replayed requests."""
+    path = urlsplit(url).path
+    path = re.sub(r"(?i)/[0-9a-f]{32}(?=/|$)", "/{id}", path)
+    path = re.sub(r"/\d+(?=\.|/|$)", "/{n}", path)
+    return f"{method} {path}"
+
+
+class ReplayTV(VirtualTV):
+    """A replayed device: the recorded placeholders resolved for this run."""
+
+    def __init__(self, index, username, password):
+        super().__init__(index)
+        self.username = username
+        self.password = password
+
+    def fill(self, text, items):
+        if not text:
+            return text
+        if items:
+            text = ITEM_ID_PATTERN.sub(lambda m: m.group(1) + items[int(m.group(2), 16) % len(items)], text)
+        for name, value in (("{token}", self.token), ("{user_id}", self.user_id), ("{session_id}", self.session_id),
+                            ("{device_id}", self.device_id), ("{username}", self.username),
+                            ("{password}", self.password)):
+            text = text.replace(name, value or "")
+        return text
+
+
+def run_replay(base_url, capture_path, username, password, speed):
+    """Play a capture back against base_url: one task per recorded device, events in their recorded order,
+    spaced as recorded (speed 1), faster (speed > 1) or back to back (speed 0)."""
+    info, events = load_capture(capture_path)
+    devices = list(dict.fromkeys(event["dev"] for event in events))
+    span = max((event["t"] for event in events), default=0)
+    http_events = [event for event in events if event["k"] == "http"]
+    print("=== Jellyfin Orsay Capture Replay ===")
+    print(f"Capture:   {capture_path} ({info.get('started', '?')}, recorded against {info.get('server', '?')})")
+    print(f"Target:    {base_url}")
+    print(f"Events:    {len(http_events)} HTTP, {len(events) - len(http_events)} WebSocket, {len(devices)} device(s), "
+          f"{span:.1f}s recorded, speed " + ("max" if not speed else f"{speed:g}x"))
+
+    results = {}  # endpoint -> [(latency, status, recorded status, recorded latency)]
+    socket_counts = {"sent": 0, "received": 0, "recorded_received": 0, "failed": 0}
+    errors = []
+
+    async def run_all():
+        import websockets
+
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=min(len(devices) * 2, 64)))
+        http_session = make_pooled_session(min(len(devices) * 2, 64))
+        items = []
+        started = loop.time()
+
+        async def ensure_login(tv):
+            if tv.token is None:
+                await fleet_authenticate(tv, http_session, base_url, username, password)
+
+        async def load_items(tv):
+            # Library ids from the capture are mapped onto items that exist on the target.
+            if items:
+                return
+            resp = await fleet_http(http_session, "GET", f"{base_url}/emby/Users/{tv.user_id}/Items?format=json"
+                                    f"&Recursive=true&IncludeItemTypes=Movie,Episode&Limit=500", headers=tv.headers())
+            items.extend(item["Id"] for item in resp.json().get("Items", []))
+
+        async def replay_device(index, device):
+            tv = ReplayTV(index, username, password)
+            PROBE_DEVICE.set(tv.device_id)
+            sockets, readers = {}, []
+            for event in (e for e in events if e["dev"] == device):
+                if speed:
+                    await asyncio.sleep(max(0.0, started + event["t"] / speed - loop.time()))
+                try:
+                    if event["k"] == "http":
+                        url = event["u"]
+                        if "AuthenticateByName" in url:
+                            tv.token = None
+                        elif event.get("auth") or "{token}" in url:
+                            await ensure_login(tv)
+                            await load_items(tv)
+                        headers = tv.headers() if tv.token else make_headers(device_id=tv.device_id)
+                        sent = time.perf_counter()
+                        resp = await fleet_http(http_session, event["m"], base_url + tv.fill(url, items),
+                                                expect=range(600), headers=headers,
+                                                data=tv.fill(event.get("b"), items))
+                        latency = time.perf_counter() - sent
+                        if "AuthenticateByName" in url and resp.status_code == 200:
+                            data = resp.json()
+                            tv.token, tv.user_id = data.get("AccessToken"), data["User"]["Id"]
+                            tv.session_id = data.get("SessionInfo", {}).get("Id")
+                            await load_items(tv)
+                        results.setdefault(endpoint_template(event["m"], url), []).append(
+                            (latency, resp.status_code, event["s"], event["d"]))
+                    elif event["k"] == "ws_open":
+                        await ensure_login(tv)
+                        url = base_url.replace("https://", "wss://").replace("http://", "ws://") + tv.fill(event["p"], items)
+                        ws = await websockets.connect(url, ping_interval=None, close_timeout=2)
+                        sockets[event["c"]] = ws
+
+                        async def drain(ws=ws):
+                            with contextlib.suppress(websockets.ConnectionClosed):
+                                async for _ in ws:
+                                    socket_counts["received"] += 1
+
+                        readers.append(asyncio.create_task(drain()))
+                    elif event["k"] == "ws_send" and event["c"] in sockets:
+                        await sockets[event["c"]].send(tv.fill(event["p"], items))
+                        socket_counts["sent"] += 1
+                    elif event["k"] == "ws_recv":
+                        socket_counts["recorded_received"] += 1
+                    elif event["k"] == "ws_close" and event["c"] in sockets:
+                        await sockets.pop(event["c"]).close()
+                except Exception as e:
+                    if event["k"].startswith("ws"):
+                        socket_counts["failed"] += 1
+                    errors.append(f"{event['k']} {event.get('u', '')[:60]}: {type(e).__name__}: {e}")
+            for ws in sockets.values():
+                await ws.close()
+            for reader in readers:
+                reader.cancel()
+
+        with probe_step("replay"):
+            await asyncio.gather(*(replay_device(i, device) for i, device in enumerate(devices)))
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    wall = time.perf_counter() - started
+
+    replayed = sum(len(v) for v in results.values())
+    print(f"\n  Replayed {replayed} requests in {wall:.2f}s ({replayed / wall:.1f} req/s; "
+          f"recorded {span:.2f}s, {len(http_events) / max(span, 1e-9):.1f} req/s)\n")
+    print(f"  {'Endpoint':<52}{'count':>6}{'p50':>9}{'p95':>9}{'max':>9}{'rec p50':>9}{'status≠':>9}")
+    for endpoint in sorted(results, key=lambda e: -len(results[e])):
+        rows = results[endpoint]
+        summary = latency_summary([r[0] for r in rows])
+        recorded = latency_summary([r[3] for r in rows])
+        mismatched = sum(1 for r in rows if r[1] != r[2])
+        print(f"  {endpoint[:51]:<52}{len(rows):>6}{format_ms(summary['p50']):>9}{format_ms(summary['p95']):>9}"
+              f"{format_ms(summary['max']):>9}{format_ms(recorded['p50']):>9}{mismatched:>9}")
+    if socket_counts["sent"] or socket_counts["recorded_received"]:
+        print(f"\n  WebSocket: {socket_counts['sent']} frames sent, {socket_counts['received']} received "
+              f"(recorded {socket_counts['recorded_received']}), {socket_counts['failed']} failures")
+    if errors:
+        print(f"\n  {len(errors)} replay error(s), first: {errors[0]}")
+
+
+# --- Synthetic monitoring daemon (--monitor) ---
+
+MONITOR_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def metric_labels(**labels):
+    """Prometheus/OpenMetrics label set with values escaped."""
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MonitorCycle:
+    """FleetStats-compatible sink for one run of the flow against one server."""
+
+    def __init__(self):
+        self.results = []  # (step, seconds, error)
+        self.aborted = self.completed = 0
+
+    def record(self, step, elapsed, error=None):
+        self.results.append((step, elapsed, error))
+
+
+class MonitorMetrics:
+    """Step latencies per server: cumulative histograms and failure counters for rate() queries,
+    plus quantiles over the last `retention` seconds. Memory is bounded: fixed buckets, and
+    window samples older than the retention (or beyond max_samples) are dropped."""
+
+    BUCKETS = tuple(bound / 1000 for bound in HISTOGRAM_BUCKETS_MS)
+
+    def __init__(self, retention, max_samples=10_000):
+        from collections import deque
+
+        self.retention = retention
+        self.window = {}       # (server, step) -> deque of (monotonic time, seconds)
+        self.buckets = {}      # (server, step) -> [count per bucket, +Inf last]
+        self.sums = {}
+        self.failures = {}
+        self.servers = {}      # server -> {"up", "cycle_seconds", "last_cycle", "logins"}
+        self.new_window = lambda: deque(maxlen=max_samples)
+
+    def observe(self, server, cycle, logins):
+        now = time.monotonic()
+        for step, seconds, error in cycle.results:
+            key = (server, step)
+            self.window.setdefault(key, self.new_window()).append((now, seconds))
+            counts = self.buckets.setdefault(key, [0] * (len(self.BUCKETS) + 1))
+            counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            self.sums[key] = self.sums.get(key, 0.0) + seconds
+            self.failures[key] = self.failures.get(key, 0) + (error is not None)
+        self.servers[server] = {
+            "up": 0 if cycle.aborted else 1,
+            "cycle_seconds": sum(seconds for _, seconds, _ in cycle.results),
+            "last_cycle": time.time(),
+            "logins": logins,
+        }
+
+    def render(self, openmetrics=False):
+        """Text exposition; OpenMetrics when the scraper asks for it, Prometheus 0.0.4 otherwise."""
+        cutoff = time.monotonic() - self.retention
+        for samples in self.window.values():
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+
+        lines = []
+
+        def family(name, kind, help_text):
+            exposed = name[:-6] if openmetrics and kind == "counter" and name.endswith("_total") else name
+            lines.append(f"# HELP {exposed} {help_text}")
+            lines.append(f"# TYPE {exposed} {kind}")
+
+        family("orsay_probe_up", "gauge", "1 if the last cycle got through steps 1-4")
+        for server, state in self.servers.items():
+            lines.append(f"orsay_probe_up{metric_labels(server=server)} {state['up']}")
+        family("orsay_probe_cycle_duration_seconds", "gauge", "Summed step time of the last cycle")
+        for server, state in self.servers.items():
+            lines.append(f"orsay_probe_cycle_duration_seconds{metric_labels(server=server)} {state['cycle_seconds']:.6f}")
+        family("orsay_probe_last_cycle_timestamp_seconds", "gauge", "Unix time the last cycle finished")
+        for server, state in self.servers.items():
+            lines.append(f"orsay_probe_last_cycle_timestamp_seconds{metric_labels(server=server)} {state['last_cycle']:.3f}")
+        family("orsay_probe_logins_total", "counter", "AuthenticateByName calls; cached tokens are reused otherwise")
+        for server, state in self.servers.items():
+            lines.append(f"orsay_probe_logins_total{metric_labels(server=server)} {state['logins']}")
+
+        family("orsay_probe_step_duration_seconds", "histogram", "Time per probe step, failed attempts included")
+        for (server, step), counts in self.buckets.items():
+            cumulative = 0
+            for bound, count in zip(self.BUCKETS + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"orsay_probe_step_duration_seconds_bucket{metric_labels(server=server, step=step, le=le)} "
+                             f"{cumulative}")
+            lines.append(f"orsay_probe_step_duration_seconds_count{metric_labels(server=server, step=step)} {cumulative}")
+            lines.append(f"orsay_probe_step_duration_seconds_sum{metric_labels(server=server, step=step)} "
+                         f"{self.sums[(server, step)]:.6f}")
+        family("orsay_probe_step_failures_total", "counter", "Probe steps that failed the way the TV would notice")
+        for (server, step), count in self.failures.items():
+            lines.append(f"orsay_probe_step_failures_total{metric_labels(server=server, step=step)} {count}")
+
+        family("orsay_probe_step_window_seconds", "gauge",
+               f"Step time quantiles over the last {self.retention:g}s")
+        for (server, step), samples in self.window.items():
+            values = [seconds for _, seconds in samples]
+            for quantile in MONITOR_QUANTILES:
+                value = percentile(values, quantile * 100)
+                if value is not None:
+                    lines.append(f"orsay_probe_step_window_seconds"
+                                 f"{metric_labels(server=server, step=step, quantile=f'{quantile:g}')} {value:.6f}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(metrics, host, port):
+    """Minimal HTTP/1.1 endpoint for GET /metrics on the daemon's event loop."""
+
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and urlsplit(parts[1]).path == "/metrics":
+                openmetrics = "application/openmetrics-text" in headers.get("accept", "")
+                body = metrics.render(openmetrics).encode()
+                content_type = ("application/openmetrics-text; version=1.0.0; charset=utf-8" if openmetrics
+                                else "text/plain; version=0.0.4; charset=utf-8")
+                status = "200 OK"
+            else:
+                body, content_type, status = b"Not Found\n", "text/plain", "404 Not Found"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def monitor_authenticate(tv, session, base_url, username, password):
+    """Step 3 for the daemon: keep the token from earlier cycles while /Sessions accepts it, log in
+    again on 401. Returns True when a login was needed."""
+    if tv.token:
+        resp = await asyncio.to_thread(session.get, f"{base_url}/emby/Sessions?DeviceId={tv.device_id}&format=json",
+                                       headers=tv.headers(), timeout=10)
+        if resp.status_code == 200:
+            return False
+        if resp.status_code != 401:
+            raise ProbeError(f"HTTP {resp.status_code} validating the token")
+        tv.token = None
+    await fleet_authenticate(tv, session, base_url, username, password)
+    return True
+
+
+def run_monitor(targets, username, password, interval, jitter, host, port, retention, cycles):
+    """Repeat steps 1-9 against every target on a jittered schedule, serving the results as metrics."""
+    try:
+        import websockets  # noqa: F401
+        with_socket = True
+    except ImportError:
+        with_socket = False
+
+    metrics = MonitorMetrics(retention)
+    print("=== Jellyfin Orsay TV Synthetic Monitor ===")
+    print(f"Servers:   {', '.join(targets)}")
+    print(f"Schedule:  steps 1-9 every {interval:g}s ±{jitter * 100:.0f}%"
+          + ("" if with_socket else ", steps 5-6 skipped (pip3 install websockets)"))
+
+    async def monitor_server(index, base_url):
+        tv = VirtualTV(index)  # one device per server for the daemon's lifetime
+        session = make_pooled_session(1)
+        rng = random.Random()
+        logins = 0
+        next_run = time.monotonic() + rng.uniform(0, min(interval, 5))  # spread the first cycles
+        cycle_number = 0
+        while not cycles or cycle_number < cycles:
+            await asyncio.sleep(max(0, next_run - time.monotonic()))
+            cycle_number += 1
+            cycle = MonitorCycle()
+            relogged = []
+
+            async def authenticate(tv, session, base_url, username, password):
+                relogged.append(await monitor_authenticate(tv, session, base_url, username, password))
+
+            await fleet_client_flow(tv, session, base_url, username, password, cycle, with_socket,
+                                    authenticate=authenticate)
+            logins += sum(relogged)
+            metrics.observe(base_url, cycle, logins)
+            failed = [f"{step} ({type(error).__name__}: {error})" for step, _, error in cycle.results if error]
+            print(f"{datetime.now():%H:%M:%S} {base_url} "
+                  f"{'FAIL' if failed else 'OK'} {sum(r[1] for r in cycle.results) * 1000:.0f} ms"
+                  + (f" — {'; '.join(failed)}" if failed else ""), flush=True)
+            next_run += interval * (1 + rng.uniform(-jitter, jitter))
+        session.close()
+
+    async def run_all():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=len(targets) * 2 + 4))
+        try:
+            listener = await serve_metrics(metrics, host, port)
+        except OSError as e:
+            print(f"FAIL — cannot bind metrics port {port}: {e.strerror or e}")
+            return False
+        bound = listener.sockets[0].getsockname()  # the real port when --metrics-port is 0
+        print(f"Metrics:   http://{host}:{bound[1]}/metrics (window quantiles over {retention:g}s)", flush=True)
+        try:
+            await asyncio.gather(*(monitor_server(i, target) for i, target in enumerate(targets)))
+        finally:
+            listener.close()
+        return True
+
+    try:
+        if not asyncio.run(run_all()):
+            sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test Jellyfin server connection (mimics Samsung Orsay TV app)")
+    parser.add_argument("--server", help="Jellyfin server URL (e.g. https://your-server.com)")
+    parser.add_argument("--username", default=None, help="Username for authentication (optional)")
+    parser.add_argument("--password", default=None, help="Password for authentication (optional)")
+    parser.add_argument("--clients", type=int, default=1,
+                        help="Simulate N virtual TVs running steps 1-9 concurrently (requires --username)")
+    parser.add_argument("--ramp", type=float, default=0,
+                        help="Spread the --clients start over this many seconds (default 0: power-on storm)")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Run independent steps 4-9 concurrently over a shared keep-alive connection pool")
+    parser.add_argument("--pool-size", type=int, default=4,
+                        help="Maximum pooled connections per host with --parallel (default 4)")
+    parser.add_argument("--warm", action="store_true",
+                        help="Reuse a cached device id and access token for this server and user; log in again only on 401")
+    parser.add_argument("--session-cache", default=os.path.join(CACHE_DIR, "sessions.json"),
+                        help="Token and device id cache used by --warm")
+    parser.add_argument("--report", metavar="PATH",
+                        help="Time every request (DNS, connect, TLS, first byte, transfer) and write a "
+                             "report: NDJSON if PATH ends in .ndjson, otherwise one JSON document")
+    bench = parser.add_argument_group("command benchmark", "REST→WebSocket remote command delivery latency")
+    bench.add_argument("--command-bench", action="store_true",
+                       help="After authentication, benchmark remote command delivery instead of steps 5-9")
+    bench.add_argument("--bench-commands", type=int, default=300, help="Number of commands to send (default 300)")
+    bench.add_argument("--bench-concurrency", type=int, default=8,
+                       help="Commands in flight at once (default 8); also caps in-flight requests with --bench-rate")
+    bench.add_argument("--bench-rate", type=float, default=0,
+                       help="Send at this fixed rate (commands/s) instead of as fast as --bench-concurrency allows")
+    crawl = parser.add_argument_group("library crawl", "Page through the whole recursive library like the TV's list screens")
+    crawl.add_argument("--crawl", action="store_true", help="After authentication, crawl the library instead of steps 4-9")
+    crawl.add_argument("--page-size", default="150",
+                       help="Comma-separated page sizes to compare (TV ItemPaging options: 100,150,200,300,500)")
+    crawl.add_argument("--crawl-parallel", type=int, default=4, help="Pages fetched at once (default 4)")
+    crawl.add_argument("--crawl-types", default="Movie,Series,Episode,MusicAlbum,Audio",
+                       help="IncludeItemTypes for the crawl")
+    crawl.add_argument("--crawl-fields", default="ParentId,SortName,Overview,Genres,RunTimeTicks",
+                       help="Fields requested per item (default matches the TV's A-Z lists)")
+    images = parser.add_argument_group("artwork benchmark", "Fetch the artwork the TV shows for a page of items")
+    images.add_argument("--images", action="store_true", help="After authentication, run the artwork benchmark instead of steps 4-9")
+    images.add_argument("--image-items", type=int, default=100, help="Items whose artwork is fetched (default 100)")
+    images.add_argument("--image-workers", type=int, default=8, help="Concurrent image downloads (default 8)")
+    images.add_argument("--image-passes", type=int, default=2, help="Passes over the same images; later passes hit the cache (default 2)")
+    images.add_argument("--image-cache", default=os.path.join(CACHE_DIR, "artwork"), help="On-disk artwork cache directory")
+    images.add_argument("--image-cache-mb", type=int, default=256, help="Cache size limit before LRU eviction (default 256)")
+    trick = parser.add_argument_group("trickplay seek", "Scrub through an item fetching trickplay sprite sheets like Trickplay.js")
+    trick.add_argument("--trickplay-seek", action="store_true", help="After authentication, run the seek simulation instead of steps 4-9")
+    trick.add_argument("--prefetch", default="0,1,2", help="Comma-separated prefetch windows (sheets ahead) to compare (default 0,1,2)")
+    trick.add_argument("--seeks", type=int, default=60, help="Seeks per run (default 60)")
+    trick.add_argument("--seek-pattern", choices=("scrub", "random"), default="scrub",
+                       help="scrub: step forward like holding FF; random: jump anywhere (default scrub)")
+    trick.add_argument("--seek-step", type=float, default=30, help="Seconds per scrub step (default 30)")
+    trick.add_argument("--seek-dwell", type=float, default=0.25, help="Seconds between seeks, e.g. key repeat (default 0.25)")
+    trick.add_argument("--sprite-cache", type=int, default=8, help="Sprite sheets kept in memory (default 8)")
+    trick.add_argument("--bandwidth-kbps", type=float, default=0, help="Throttle sprite downloads to this link speed (default off)")
+    playback = parser.add_argument_group("playback", "HLS transcode startup and realtime throughput, as the TV's player requests it")
+    playback.add_argument("--playback", action="store_true", help="After authentication, run the HLS playback probe instead of steps 4-9")
+    playback.add_argument("--streams", type=int, default=1, help="Concurrent transcodes, one item each (default 1)")
+    playback.add_argument("--segments", type=int, default=10, help="Segments fetched per stream (default 10)")
+    playback.add_argument("--video-bitrate", type=int, default=10000000,
+                          help="VideoBitrate requested, as in Server.getStreamUrl (default 10000000)")
+    screens = parser.add_argument_group("screen profile", "UI blocking time of each screen's synchronous request chain")
+    screens.add_argument("--screens", action="store_true",
+                         help="After authentication, replay the getContent() chain of each GUI page instead of steps 4-9")
+    screens.add_argument("--screen-passes", type=int, default=5, help="Times each screen is opened (default 5)")
+    screens.add_argument("--screen-set", action="append", default=[], metavar="PARAM=VALUE",
+                         help="Rewrite a query parameter in every screen request, e.g. Limit=50 or "
+                              "fields=SortName; PARAM= drops it (repeatable). --page-size sets ItemPaging")
+    search = parser.add_argument_group("search", "Type-ahead SearchHints with overlapping requests and stale responses dropped")
+    search.add_argument("--search", action="store_true",
+                        help="After authentication, type search queries a key at a time instead of steps 4-9")
+    search.add_argument("--search-queries", default=None,
+                        help="Comma-separated queries to type (default: random movie and series names)")
+    search.add_argument("--search-count", type=int, default=5, help="Library names typed when --search-queries is not given (default 5)")
+    search.add_argument("--debounce", default="enter,0,150,300",
+                        help="Comma-separated debounce delays in ms to compare; 'enter' searches only the whole "
+                             "query, as the TV does today (default enter,0,150,300)")
+    search.add_argument("--key-delay", type=float, default=400,
+                        help="Mean ms between key presses on the IME keypad, ±50%% (default 400)")
+    search.add_argument("--search-users", type=int, default=1, help="Users typing at the same time (default 1)")
+    guide = parser.add_argument_group("tv guide", "LiveTv/Programs fetched as channel batches x time window, in parallel")
+    guide.add_argument("--guide", action="store_true",
+                       help="After authentication, fetch the Live TV guide grid instead of steps 4-9")
+    guide.add_argument("--guide-batch", default="7,25,100,all",
+                       help="Comma-separated channelIds per request; 'all' is one request, as the TV does (default 7,25,100,all)")
+    guide.add_argument("--guide-window", default="3,6,24",
+                       help="Comma-separated guide window lengths in hours; the TV asks for 24 (default 3,6,24)")
+    guide.add_argument("--guide-parallel", type=int, default=4, help="Batch requests in flight (default 4)")
+    guide.add_argument("--guide-passes", type=int, default=3, help="Times each combination is fetched (default 3)")
+    audit = parser.add_argument_group("direct play audit", "Which items the TV direct plays or transcodes, "
+                                                           "using GuiPlayer_Transcoding's rules (uses --page-size)")
+    audit.add_argument("--direct-play-audit", action="store_true",
+                       help="After authentication, classify every movie and episode instead of steps 4-9")
+    audit.add_argument("--tv-models", default="D,E,F,H,HU",
+                       help="Comma-separated model years (Main.getModelYear: D, E, F, B, H, HU; default D,E,F,H,HU)")
+    audit.add_argument("--max-bitrate", type=float, default=60, help="The TV's Max Bitrate setting in Mb/s (default 60)")
+    audit.add_argument("--aac-to-dolby", action="store_true",
+                       help="Dolby Digital and AAC-to-Dolby settings on (AAC audio is then always transcoded)")
+    audit.add_argument("--audit-parallel", type=int, default=4, help="Library pages in flight (default 4)")
+    audit.add_argument("--audit-viewers", type=int, default=10,
+                       help="Concurrent viewers for the transcode load estimate (default 10)")
+    audit.add_argument("--audit-top", type=int, default=10, help="Worst offenders listed (default 10)")
+    payload = parser.add_argument_group("payload audit", "Wire size, decompressed size and parse time of the TV's "
+                                                         "requests per Accept-Encoding and query trimming")
+    payload.add_argument("--payload-audit", action="store_true",
+                         help="After authentication, fetch every request pattern of the screens in several variants "
+                              "instead of steps 4-9 (uses --page-size, --crawl-types and --crawl-fields)")
+    payload.add_argument("--payload-limits", default="10,25,50,100",
+                         help="Comma-separated Limit values tried on list requests (default 10,25,50,100)")
+    payload.add_argument("--payload-passes", type=int, default=3, help="Fetches per variant and encoding (default 3)")
+    soak = parser.add_argument_group("progress soak", "Concurrent playing TVs posting Sessions/Playing progress reports")
+    soak.add_argument("--progress-soak", type=int, metavar="SESSIONS",
+                      help="Log in SESSIONS virtual TVs (spread over --ramp) and have each report playback progress")
+    soak.add_argument("--duration", type=float, default=300, help="Soak length in seconds after login (default 300)")
+    soak.add_argument("--progress-interval", type=float, default=4,
+                      help="Seconds between Server.videoTime reports per TV (default 4: every 8th player time update)")
+    soak.add_argument("--soak-window", type=float, default=10, help="Seconds per progress line (default 10)")
+    sockets = parser.add_argument_group("socket soak", "Long-lived RemoteControl sockets with keep-alive and reconnect "
+                                                      "(uses --ramp, --duration, --soak-window)")
+    sockets.add_argument("--socket-soak", type=int, metavar="SOCKETS",
+                         help="Log in SOCKETS virtual TVs and hold one remote-control socket open for each")
+    sockets.add_argument("--keepalive-interval", type=float, default=30,
+                         help="Seconds between KeepAlive messages until the server sends ForceKeepAlive (default 30)")
+    sockets.add_argument("--reconnect-delay", type=float, default=5,
+                         help="Seconds before reconnecting a closed socket, as in RemoteControl.scheduleReconnect (default 5)")
+    sockets.add_argument("--reconnect-jitter", type=float, default=0,
+                         help="Randomise the reconnect delay by ± this fraction (default 0, like the TV)")
+    sockets.add_argument("--max-reconnects", type=int, default=10, help="Reconnect attempts before giving up (default 10)")
+    sockets.add_argument("--storm-at", type=float, default=None,
+                         help="Seconds after the ramp at which every socket is dropped at once, to time the reconnect storm")
+    syncplay = parser.add_argument_group("SyncPlay fan-out", "Group command delivery to every member's socket")
+    syncplay.add_argument("--syncplay-clients", type=int, metavar="N",
+                          help="Put N virtual TVs in one SyncPlay group and time pause/unpause/seek delivery to each")
+    syncplay.add_argument("--syncplay-rounds", type=int, default=30,
+                          help="Commands issued by the first member, cycling pause/unpause/seek (default 30)")
+    syncplay.add_argument("--syncplay-interval", type=float, default=0.5, help="Seconds between commands (default 0.5)")
+    sweep = parser.add_argument_group("server sweep", "Probe many servers, CIDR ranges and LAN discovery answers")
+    sweep.add_argument("--sweep", metavar="TARGETS",
+                       help="Comma-separated servers (URL, host[:port] or CIDR range) to probe instead of --server; "
+                            "@FILE reads one target per line")
+    sweep.add_argument("--discover", action="store_true",
+                       help=f"Broadcast Jellyfin's UDP discovery on port {DISCOVERY_PORT} and probe every server that answers")
+    sweep.add_argument("--discover-address", default="255.255.255.255",
+                       help="Discovery destination, e.g. a subnet broadcast address (default 255.255.255.255)")
+    sweep.add_argument("--sweep-concurrency", type=int, default=64, help="Servers probed at once (default 64)")
+    sweep.add_argument("--sweep-timeout", type=float, default=2, help="Per-server timeout in seconds (default 2)")
+    sweep.add_argument("--sweep-ttl", type=float, default=300,
+                       help="Reuse results younger than this many seconds; 0 disables the cache (default 300)")
+    sweep.add_argument("--sweep-cache", default=os.path.join(CACHE_DIR, "sweep.json"), help="Sweep result cache file")
+    widget = parser.add_argument_group("widget download storm",
+                                       "Many TVs fetching widgetlist.xml and the widget zip at once (orsay_widget_server.py)")
+    widget.add_argument("--widget-load", type=int, metavar="TVS", default=0,
+                        help="Simulate TVS TVs downloading the widget at once instead of probing a Jellyfin server")
+    widget.add_argument("--widget-url", default=None,
+                        help="Widget server to load (default: build the widget and serve it in-process)")
+    widget.add_argument("--widget-template", default=None,
+                        help="Template directory for the in-process widget server (default: the installer's Template)")
+    widget.add_argument("--widget-optimize", action="store_true",
+                        help="Serve the optimized template built by orsay_bundle.py in-process")
+    widget.add_argument("--widget-rounds", type=int, default=1,
+                        help="Download rounds; rounds after the first revalidate with the zip's ETag (default 1)")
+    capture = parser.add_argument_group("record and replay", "Capture a run's traffic and play it back as a benchmark")
+    capture.add_argument("--record", metavar="PATH",
+                         help="Save every HTTP exchange and WebSocket frame with timing (gzip if PATH ends in .gz); "
+                              "tokens, ids and the password are stored as placeholders")
+    capture.add_argument("--replay", metavar="PATH",
+                         help="Play a --record capture against --server/--standin instead of running the probe "
+                              "(logs in with --username/--password)")
+    capture.add_argument("--replay-speed", type=float, default=1,
+                         help="1 keeps the recorded timing, 2 runs twice as fast, 0 sends back to back (default 1)")
+    monitor = parser.add_argument_group("synthetic monitor", "Run the flow on a schedule and serve the results "
+                                                             "as Prometheus/OpenMetrics metrics")
+    monitor.add_argument("--monitor", metavar="TARGETS", nargs="?", const="",
+                         help="Repeat steps 1-9 against --server/--standin and any comma-separated TARGETS "
+                              "(@FILE reads one URL per line) until interrupted")
+    monitor.add_argument("--interval", type=float, default=60, help="Seconds between cycles per server (default 60)")
+    monitor.add_argument("--interval-jitter", type=float, default=0.1,
+                         help="Random ± fraction of --interval added to each wait (default 0.1)")
+    monitor.add_argument("--metrics-host", default="127.0.0.1", help="Metrics listen address (default 127.0.0.1)")
+    monitor.add_argument("--metrics-port", type=int, default=9464, help="Metrics listen port (default 9464)")
+    monitor.add_argument("--retention", type=float, default=900,
+                         help="Seconds of samples behind the window quantiles (default 900)")
+    monitor.add_argument("--monitor-cycles", type=int, default=0, help="Stop after this many cycles per server (default 0: never)")
+    standin = parser.add_argument_group("stand-in server", "Run against a local offline Jellyfin stand-in (jellyfin_standin.py)")
+    standin.add_argument("--standin", action="store_true", help="Start the stand-in in-process and use it as --server")
+    args, _ = parser.parse_known_args()
+    if args.standin:
+        import jellyfin_standin
+        jellyfin_standin.add_arguments(standin, prefix="standin-")
+    args = parser.parse_args()
+
+    if args.standin:
+        base_url, _ = jellyfin_standin.start_in_thread(jellyfin_standin.config_from_args(args, prefix="standin-"),
+                                                       discovery_port=DISCOVERY_PORT if args.discover else None)
+    elif args.server:
+        base_url = args.server.rstrip("/")
+    elif args.sweep or args.discover or args.widget_load or args.monitor:
+        base_url = None
+    else:
+        parser.error("one of --server, --standin, --sweep, --discover, --monitor TARGETS or --widget-load is required")
+
+    if args.clients > 1 and not args.username:
+        parser.error("--clients requires --username")
+    if args.progress_soak and not args.username:
+        parser.error("--progress-soak requires --username")
+    if args.socket_soak and not args.username:
+        parser.error("--socket-soak requires --username")
+    if args.syncplay_clients and not args.username:
+        parser.error("--syncplay-clients requires --username")
+    if args.replay and not args.username:
+        parser.error("--replay requires --username")
+    if args.monitor is not None and not args.username:
+        parser.error("--monitor requires --username")
+    if args.trickplay_seek and args.seeks < 1:
+        parser.error("--seeks must be at least 1")
+
+    global DEVICE_ID, RECORDER, REPORT
+    warm = None
+    if args.warm and base_url:
+        cache = SessionCache(args.session_cache)
+        warm = cache, cache.entry(base_url, args.username)
+        DEVICE_ID = warm[1]["device_id"]
+    if args.report:
+        REPORT = ProbeReport(args.report, {
+            "server": base_url, "client": CLIENT_NAME, "version": APP_VERSION,
+            "device_id": DEVICE_ID, "clients": args.clients,
+        })
+    if args.record:
+        RECORDER = TrafficRecorder(args.record, {"server": base_url, "client": CLIENT_NAME, "app": APP_VERSION})
+    try:
+        if args.widget_load:
+            run_widget_load(args.widget_url, args.widget_load, args.ramp, args.widget_rounds, args.widget_template,
+                            args.widget_optimize)
+        elif args.replay:
+            run_replay(base_url, args.replay, args.username, args.password or "", args.replay_speed)
+        elif args.monitor is not None:
+            targets = []
+            if args.monitor.startswith("@"):
+                with open(args.monitor[1:], encoding="utf-8") as f:
+                    targets = [line.split("#", 1)[0].strip() for line in f]
+            elif args.monitor:
+                targets = args.monitor.split(",")
+            targets = ([base_url] if base_url else []) + [target.strip().rstrip("/") for target in targets if target.strip()]
+            run_monitor(targets, args.username, args.password or "", args.interval, args.interval_jitter,
+                        args.metrics_host, args.metrics_port, args.retention, args.monitor_cycles)
+        elif args.sweep or args.discover:
+            targets = []
+            if args.sweep and args.sweep.startswith("@"):
+                with open(args.sweep[1:], encoding="utf-8") as f:
+                    targets = [line.split("#", 1)[0] for line in f]
+            elif args.sweep:
+                targets = args.sweep.split(",")
+            if base_url:
+                targets.append(base_url)
+            run_sweep(targets, args.discover, args.discover_address, DISCOVERY_PORT, args.sweep_concurrency,
+                      args.sweep_timeout, args.sweep_cache, args.sweep_ttl)
+        elif args.progress_soak:
+            run_progress_soak(base_url, args.username, args.password or "", args.progress_soak, args.ramp,
+                              args.duration, args.progress_interval, args.soak_window)
+        elif args.socket_soak:
+            run_socket_soak(base_url, args.username, args.password or "", args.socket_soak, args.ramp, args.duration,
+                            args.soak_window, args.keepalive_interval, args.reconnect_delay, args.reconnect_jitter,
+                            args.max_reconnects, args.storm_at)
+        elif args.syncplay_clients:
+            run_syncplay_fanout(base_url, args.username, args.password or "", args.syncplay_clients,
+                                args.syncplay_rounds, args.syncplay_interval)
+        elif args.clients > 1:
+            run_fleet(base_url, args.username, args.password or "", args.clients, args.ramp)
+        else:
+            run_connection_test(args, base_url, warm)
+    finally:
+        if REPORT is not None:
+            REPORT.print_summary()
+            REPORT.close()
+        if RECORDER is not None:
+            RECORDER.close()
+
+
+def run_connection_test(args, base_url, warm=None):
+    """The single-device flow: steps 1-9 (or a benchmark mode after authentication).
+    warm is (SessionCache, entry) with --warm."""
+    session = make_pooled_session(args.pool_size)
+    PROBE_DEVICE.set(DEVICE_ID)
+
+    print(f"=== Jellyfin Orsay TV App Connection Test ===")
+    print(f"Server:    {base_url}")
+    print(f"Client:    {CLIENT_NAME} {APP_VERSION}")
+    print(f"DeviceId:  {DEVICE_ID}")
+
+    # Step 1: Test connection (public endpoint, no auth needed)
+    with probe_step("step1_connection"):
+        info = step1_test_connection(session, base_url)
+    if info is None:
+        print("\nConnection failed. The TV app would show an error and return to the server entry page.")
+        sys.exit(1)
+
+    # Step 2: Check version
+    if not step2_check_version(info):
+        print("\nVersion check failed. The TV app would show: 'Please update it and restart the app'")
+        sys.exit(1)
+
+    # Step 3+: Authentication (optional)
+    if args.username:
+        password = args.password or ""
+        user_id = token = None
+        capabilities_current = False
+        with probe_step("step3_authenticate"):
+            if warm and warm[1].get("token"):
+                try:
+                    user_id, token, capabilities_current = warm_authenticate(session, base_url, warm[1])
+                except ProbeError as e:
+                    print(f"  FAIL — {e}")
+                    sys.exit(1)
+            if not token:
+                user_id, token = step3_authenticate(session, base_url, args.username, password)
+        if not token:
+            print("\nAuthentication failed. The TV app would return to the user selection page.")
+            sys.exit(1)
+        if warm:
+            warm[1].update(user_id=user_id, token=token)
+            warm[0].save()
+
+        def post_capabilities():
+            if capabilities_current:
+                print(f"\n[Step 4] Skipped — the server session already has these capabilities (--warm).")
+                return
+            with probe_step("step4_capabilities"):
+                step4_post_capabilities(session, base_url, user_id, token)
+
+        if args.command_bench:
+            post_capabilities()
+            run_command_bench(base_url, user_id, token, args.bench_commands, args.bench_concurrency, args.bench_rate)
+        elif args.crawl:
+            page_sizes = [int(size) for size in args.page_size.split(",")]
+            run_crawl(base_url, user_id, token, page_sizes, args.crawl_parallel, args.crawl_types, args.crawl_fields)
+        elif args.images:
+            run_image_bench(base_url, user_id, token, args.image_items, args.image_workers, args.image_passes,
+                            args.image_cache, args.image_cache_mb)
+        elif args.trickplay_seek:
+            run_trickplay_seek(base_url, user_id, token, [int(w) for w in args.prefetch.split(",")], args.seeks,
+                               args.seek_pattern, args.seek_step, args.seek_dwell, args.sprite_cache, args.bandwidth_kbps)
+        elif args.playback:
+            run_playback(base_url, user_id, token, args.streams, args.segments, args.video_bitrate)
+        elif args.screens:
+            overrides = [tuple(override.split("=", 1)) for override in args.screen_set]
+            run_screen_profile(base_url, user_id, token, args.screen_passes, int(args.page_size.split(",")[0]),
+                               overrides)
+        elif args.search:
+            queries = [query for query in (args.search_queries or "").split(",") if query.strip()]
+            debounces = [None if value.strip() == "enter" else float(value) / 1000 for value in args.debounce.split(",")]
+            run_search_bench(base_url, user_id, token, queries, args.search_count, debounces, args.key_delay / 1000,
+                             args.search_users)
+        elif args.guide:
+            batch_sizes = [0 if value.strip() == "all" else int(value) for value in args.guide_batch.split(",")]
+            run_guide_bench(base_url, user_id, token, batch_sizes, [float(w) for w in args.guide_window.split(",")],
+                            args.guide_parallel, args.guide_passes)
+        elif args.direct_play_audit:
+            models = [model.strip().upper() for model in args.tv_models.split(",") if model.strip()]
+            run_playback_audit(base_url, user_id, token, models, args.max_bitrate, args.aac_to_dolby,
+                               int(args.page_size.split(",")[0]), args.audit_parallel, args.audit_viewers,
+                               args.audit_top)
+        elif args.payload_audit:
+            run_payload_audit(base_url, user_id, token, int(args.page_size.split(",")[0]),
+                              [int(limit) for limit in args.payload_limits.split(",")], args.payload_passes,
+                              args.crawl_types, args.crawl_fields)
+        elif args.parallel:
+            run_pipeline(session, base_url, user_id, token, capabilities_current)
+        else:
+            # Step 4: Post capabilities
+            post_capabilities()
 
-        # Step 5: WebSocket
-        step5_test_websocket(base_url, token)
+            # Step 5: WebSocket
+            step5_test_websocket(base_url, token)
 
-        # Step 6: Remote commands
-        step6_test_remote_commands(session, base_url, user_id, token)
+            # Step 6: Remote commands
+            with probe_step("step6_remote_commands"):
+                step6_test_remote_commands(session, base_url, user_id, token)
 
-        # Step 7: Quick Connect
-        step7_test_quick_connect(session, base_url, user_id, token)
+            # Step 7: Quick Connect
+            with probe_step("step7_quick_connect"):
+                step7_test_quick_connect(session, base_url, user_id, token)
 
-        # Step 8: SyncPlay
-        step8_test_syncplay(session, base_url, user_id, token)
+            # Step 8: SyncPlay
+            with probe_step("step8_syncplay"):
+                step8_test_syncplay(session, base_url, user_id, token)
 
-        # Step 9: Trickplay
-        step9_test_trickplay(session, base_url, user_id, token)
+            # Step 9: Trickplay
+            with probe_step("step9_trickplay"):
+                step9_test_trickplay(session, base_url, user_id, token)
     else:
         print("\n[Steps 3-9] Skipped — pass --username to test authentication, capabilities, WebSocket, commands, Quick Connect, SyncPlay, and Trickplay.")
 